@@ -0,0 +1,103 @@
+"""
+Render farm coordinator: HTTP API through which workers on other machines register, lease
+jobs from the render queue, heartbeat and report results. Leases are the queue rows' worker
+and heartbeat: a worker that stops heartbeating loses its jobs to the next lease request.
+
+    POST /api/farm/workers                       register {"name", "host", "slots", "targets"}
+    GET  /api/farm/workers                       registered workers, liveness, running jobs
+    POST /api/farm/lease                         {"worker", "targets"} -> {"job": {...} | null}
+    POST /api/farm/jobs/{queue_id}/heartbeat     {"worker", "stage", "progress", "telemetry"} -> {"stop"}
+    POST /api/farm/jobs/{queue_id}/complete      {"worker", "result"}
+    POST /api/farm/jobs/{queue_id}/fail          {"worker", "error"}
+    POST /api/farm/jobs/{queue_id}/cancelled     {"worker"}
+    POST /api/farm/jobs/{queue_id}/release       {"worker"}
+
+Requests must carry `X-Farm-Token` when settings.json sets `farm_token`; without a token only
+loopback clients are let in. main.py puts its queue and cancel endpoints behind the same check.
+"""
+import json
+import logging
+import ipaddress
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request
+
+from app.services.render_queue import HEARTBEAT_TIMEOUT, get_render_queue
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _farm_token() -> Optional[str]:
+    try:
+        with open(BASE_DIR / "settings.json", "r") as f:
+            return json.load(f).get("farm_token") or None
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _is_loopback(host: Optional[str]) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def authorize(request: Request, x_farm_token: Optional[str] = Header(None)):
+    """Dependency for endpoints that hand out or change jobs."""
+    expected = _farm_token()
+    if expected:
+        if x_farm_token != expected:
+            raise HTTPException(status_code=401, detail="Invalid farm token")
+    elif not _is_loopback(request.client.host if request.client else None):
+        raise HTTPException(status_code=403, detail="Set farm_token in settings.json to accept remote requests")
+
+
+router = APIRouter(prefix="/api/farm", dependencies=[Depends(authorize)])
+
+
+@router.post("/workers")
+def register_worker(body: dict = Body(...)):
+    get_render_queue().register_worker(body["name"], body.get("host"), body.get("slots", 1), body.get("targets"))
+    print(f"🖥️  Render worker joined: {body['name']} ({body.get('slots', 1)} slot(s))")
+    return {"lease_timeout": HEARTBEAT_TIMEOUT}
+
+
+@router.get("/workers")
+def list_workers():
+    return {"workers": get_render_queue().list_workers()}
+
+
+@router.post("/lease")
+def lease_job(body: dict = Body(...)):
+    queue = get_render_queue()
+    # Expired leases go back to the queue before anything is handed out
+    queue.requeue_stale()
+    return {"job": queue.claim(body["worker"], body.get("targets"))}
+
+
+@router.post("/jobs/{queue_id}/heartbeat")
+def heartbeat(queue_id: int, body: dict = Body(...)):
+    stop = get_render_queue().heartbeat(queue_id, body.get("stage"), body.get("progress"), body.get("telemetry"), worker=body["worker"])
+    return {"stop": stop}
+
+
+@router.post("/jobs/{queue_id}/{outcome}")
+def finish_job(queue_id: int, outcome: str, body: dict = Body(...)):
+    queue = get_render_queue()
+    if outcome == "complete":
+        held = queue.complete(queue_id, body.get("result"), worker=body["worker"])
+    elif outcome == "fail":
+        held = queue.fail(queue_id, body.get("error") or "Worker failed", worker=body["worker"])
+    elif outcome == "cancelled":
+        held = queue.mark_cancelled(queue_id, worker=body["worker"])
+    elif outcome == "release":
+        held = queue.release(queue_id, worker=body["worker"])
+    else:
+        raise HTTPException(status_code=404, detail=f"Unknown outcome '{outcome}'")
+    if not held:
+        # The lease expired and the job was handed to another worker; its result wins
+        logger.warning(f"Ignoring {outcome} of queue entry {queue_id} from {body['worker']}: lease lost")
+    return {"accepted": held}
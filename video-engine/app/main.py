@@ -1,20 +1,24 @@
 import os
 import sys
+import time
 import uuid
+import subprocess
 import requests
 import asyncio
 import logging
 from pathlib import Path
 from nicegui import ui, app
 from app.ui_components import State, settings_drawer, generator_panel, log_terminal, content_editor_panel, job_history_panel
-from app.workflow import VideoWorkflow
-from app.services.llm import GeminiService
-from app.services.tts import ElevenLabsService
+from app.services.container import get_services
 from app.services.krea import KreaService
 from app.services.cms import CmsService
 from app.utils.slug import slugify
-import yaml
-import json
+from app.services.jobs import JobCancelled, cancel_job
+from app.services.render_queue import INTERACTIVE_PRIORITY, get_render_queue
+from app.farm import authorize, router as farm_router
+from app.services.warmup import get_warmup
+from fastapi import Depends
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -42,6 +46,13 @@ app.add_static_files('/outputs', str(OUTPUTS_DIR))
 
 state = State(DATA_DIR)
 
+# Log labels for the pipeline stages a render worker reports
+STAGE_LABELS = {
+    "content": "Content", "audio": "Audio", "transcribe": "Transcription", "captions": "Captions",
+    "download": "Source Video", "crop": "[Step 9] Video Crop & Loop", "mix": "[Step 10] Music & Voice Mix",
+    "final": "[Step 11] Final Render (Crop + Mix + VFX, single pass)",
+}
+
 class NiceGUIOutputWrapper:
     def __init__(self, state_obj):
         self.state = state_obj
@@ -73,7 +84,7 @@ async def start_content_generation(topic: str, template: str):
     
     try:
         state.update_job(job_id, progress=30)
-        llm = GeminiService()
+        llm = get_services().get("llm")
         content = await asyncio.to_thread(llm.generate_content, topic)
         state.update_job(job_id, progress=35)
         
@@ -124,7 +135,7 @@ async def regenerate_content():
     
     try:
         state.update_job(job_id, progress=30)
-        llm = GeminiService()
+        llm = get_services().get("llm")
         content = await asyncio.to_thread(llm.generate_content, topic)
         state.update_job(job_id, progress=80)
         state.content.update(content)
@@ -143,7 +154,7 @@ async def regenerate_content():
     ui.navigate.to('/')
 
 async def start_source_download():
-    """Download the source video specified in state.content['youtube_URL']."""
+    """Download the source video specified in state.content['youtube_URL'] (on a render worker)."""
     yt_url = state.content.get("youtube_URL")
     if not yt_url:
         ui.notify("No YouTube URL provided", type='warning')
@@ -151,23 +162,14 @@ async def start_source_download():
         
     state.is_processing = True
     state.logs += f"\n📥 Downloading source video from {yt_url}...\n"
-    
-    # Capture stdout/stderr
-    original_stdout = sys.stdout
-    original_stderr = sys.stderr
-    sys.stdout = NiceGUIOutputWrapper(state)
-    sys.stderr = sys.stdout
 
     try:
-        workflow = VideoWorkflow(BASE_DIR)
-        topic = state.content.get("topic", "source")
-        prefix = slugify(topic)
-        path, res = await asyncio.to_thread(workflow.download_video, yt_url, filename_prefix=prefix + "_source")
+        content = await run_on_worker(state.current_job_id, "download")
         # Standardized field name: video_file holds the source video
-        state.content["video_file"] = path.name
+        state.content["video_file"] = content["video_file"]
         state.update_job(state.current_job_id, content=state.content)
-        ui.notify(f"Source video downloaded: {path.name}", type='positive')
-        state.logs += f"✅ Source video ready: {path.name} ({res})\n"
+        ui.notify(f"Source video downloaded: {content['video_file']}", type='positive')
+        state.logs += f"✅ Source video ready: {content['video_file']}\n"
         ui.navigate.to('/')
     except Exception as e:
         logger.error(f"Download failed: {e}")
@@ -175,8 +177,68 @@ async def start_source_download():
         ui.notify(f"Download failed: {str(e)}", type='negative')
     finally:
         state.is_processing = False
-        sys.stdout = original_stdout
-        sys.stderr = original_stderr
+
+# Seconds a wizard step waits for a live render worker (one taking `target`) before giving up
+WORKER_WAIT = 30.0
+
+
+async def _worker_available(queue, target: str) -> bool:
+    workers = await asyncio.to_thread(queue.list_workers)
+    return any(w["alive"] and (not w["targets"] or target in w["targets"]) for w in workers)
+
+
+async def run_on_worker(job_id: str, target: str, template: str = None) -> dict:
+    """
+    Runs the pipeline up to `target` on a render worker (ahead of batch renders) and follows
+    it through the queue, logging stages as they start. Returns the job's updated content.
+    The UI process itself never runs Whisper or FFmpeg. Fails (and cancels the entry) when
+    no live worker can take the job for WORKER_WAIT seconds, instead of waiting forever.
+    """
+    queue = get_render_queue()
+    no_worker = f"No render worker is running for '{target}' (check render_workers in settings.json or start `poetry run worker`)"
+    deadline = time.monotonic() + WORKER_WAIT
+    while not await _worker_available(queue, target):
+        # The worker started with the app may still be registering
+        if time.monotonic() > deadline:
+            raise RuntimeError(no_worker)
+        await asyncio.sleep(1.0)
+
+    payload = {
+        "topic": state.content.get("topic"),
+        "template": template or state.content.get("template", "default"),
+        "youtube_URL": state.content.get("youtube_URL"),
+        "content": state.content,
+    }
+    queue_id = await asyncio.to_thread(queue.enqueue, job_id, payload, INTERACTIVE_PRIORITY, target)
+    logged, waiting = set(), False
+    last_worker_seen, last_check = time.monotonic(), time.monotonic()
+    while True:
+        await asyncio.sleep(1.0)
+        entry = await asyncio.to_thread(queue.entry, queue_id)
+        if entry["status"] in ("queued", "running") and time.monotonic() - last_check >= 5.0:
+            # Workers that crash stop being "alive" after the heartbeat timeout
+            last_check = time.monotonic()
+            if await _worker_available(queue, target):
+                last_worker_seen = last_check
+            elif last_check - last_worker_seen > WORKER_WAIT:
+                await asyncio.to_thread(queue.cancel, job_id)
+                raise RuntimeError(no_worker)
+        if entry["status"] == "queued" and not waiting:
+            waiting = True
+            state.logs += "⏳ Waiting for a render worker...\n"
+        stage, _, status = (entry["stage"] or "").partition(":")
+        if stage and status == "started" and stage not in logged:
+            logged.add(stage)
+            state.logs += f"📍 {STAGE_LABELS.get(stage, stage)} Stage...\n"
+        if entry["status"] == "running" and entry["telemetry"]:
+            # Live FFmpeg telemetry (fps, speed, ETA) for the progress indicator
+            state.update_job(job_id, telemetry=entry["telemetry"])
+        if entry["status"] == "completed":
+            return entry["result"]["content"]
+        if entry["status"] == "failed":
+            raise RuntimeError(entry["error"] or "Render worker failed")
+        if entry["status"] == "cancelled":
+            raise JobCancelled(job_id)
 
 async def start_final_generation(topic: str, template: str, target_step: int = 11):
     """
@@ -186,131 +248,166 @@ async def start_final_generation(topic: str, template: str, target_step: int = 1
     job_id = state.current_job_id
     if not job_id:
         job_id = state.add_job(f"Video: {topic}")
+    if not state.content.get("youtube_URL"):
+        ui.notify('Source video (YouTube URL) is mandatory', type='warning')
+        return
     
     state.is_processing = True
     state.logs += f"\n🚀 Starting Production Phase (Target: Step {target_step}) for: {topic}...\n"
-    
-    slug = slugify(topic)
-    outputs_dir = OUTPUTS_DIR
-    
-    # Capture stdout/stderr
-    original_stdout = sys.stdout
-    original_stderr = sys.stderr
-    sys.stdout = NiceGUIOutputWrapper(state)
-    sys.stderr = sys.stdout
+    state.update_job(job_id, status="processing")
 
     try:
-        workflow = VideoWorkflow(BASE_DIR)
-        yt_url = state.content.get("youtube_URL")
-        if not yt_url:
-             raise ValueError("Source video (YouTube URL) is mandatory")
-
-        # Define file paths based on slug
-        audio_path = outputs_dir / f"{slug}.mp3"
-        subtitle_words = outputs_dir / f"{slug}_words.json"
-        source_video = outputs_dir / f"{slug}_source.mp4"
-        cropped_video = outputs_dir / f"{slug}_cropped.mp4"
-        mixed_video = outputs_dir / f"{slug}_mixed.mp4"
-        final_video = outputs_dir / f"{slug}_final.mp4"
-        ass_path = outputs_dir / f"{slug}_captions.ass"
-
-        # Step 2: Audio (Ensure it exists)
-        if not audio_path.exists():
-             state.logs += "📍 Preparing Audio Stage...\n"
-             await asyncio.to_thread(workflow.step_audio_gen, state.content, audio_path)
-        state.content["voice_file"] = audio_path.name
-
-        # Step 3: Transcribe (Ensure it exists and is valid)
-        if not subtitle_words.exists() or subtitle_words.stat().st_size == 0:
-             state.logs += "📍 Preparing Transcription Stage...\n"
-             words = await asyncio.to_thread(workflow.step_transcribe, audio_path, subtitle_words)
-        else:
-             import json
-             try:
-                 with open(subtitle_words) as f:
-                      words = json.load(f)
-             except Exception as e:
-                 state.logs += "📍 Transcription file corrupted, regenerating...\n"
-                 words = await asyncio.to_thread(workflow.step_transcribe, audio_path, subtitle_words)
-        state.content["subtitle_file"] = subtitle_words.name
-
-        # Step 4: Download (Ensure it exists)
-        actual_source = None
-        for f in outputs_dir.glob(f"{slug}_source*"):
-             actual_source = f
-             break
-        
-        if not actual_source:
-             if not yt_url:
-                  raise ValueError("Source video (YouTube URL) is mandatory")
-             state.logs += "📍 Preparing Source Video Stage...\n"
-             actual_source = await asyncio.to_thread(workflow.step_video_download, yt_url, slug)
-        
-        state.content["video_file"] = actual_source.name
-
         # --- GRANULAR PRODUCTION LOGIC ---
+        # Steps 9 and 10 are previews; the final render (11) decodes the source once
+        # and does Crop + Mix + VFX in a single pass without the preview files.
+        # A render worker runs the stage DAG: it downloads the source while TTS/Whisper run,
+        # and only runs what the target needs (artifacts with a valid sidecar are reused).
+        targets = {9: "crop", 10: "mix"}
+        content = await run_on_worker(job_id, targets.get(target_step, "final"), template)
+        state.content.update(content)
 
         # Step 9: Crop
-        if target_step >= 9:
-             state.logs += "📍 [Step 9] Video Crop & Loop Stage...\n"
-             await asyncio.to_thread(workflow.step_video_crop, actual_source, audio_path, cropped_video, None)
-             state.content["processed_video"] = cropped_video.name
+        if target_step in (9, 10):
              state.update_job(job_id, progress=60, content=state.content)
              if target_step == 9:
                   state.current_step = 9 # Stay for preview
                   ui.notify('Cropping complete!', type='positive')
 
         # Step 10: Music Mix
-        if target_step >= 10:
-             state.logs += "📍 [Step 10] Music & Voice Mix Stage...\n"
-             # Load template
-             template_path = BASE_DIR / "templates" / f"{template}.yaml"
-             with open(template_path, "r") as f:
-                 template_data = yaml.safe_load(f)
-                 
-             music_file = state.content.get("bg_music") or (template_data['music']['file'] if 'music' in template_data else "lofi.mp3")
-             bg_music_path = BASE_DIR / "assets" / "music" / music_file
-             
-             await asyncio.to_thread(workflow.step_music_merge, cropped_video, audio_path, mixed_video, bg_music_path, None)
-             state.content["merged_audio"] = mixed_video.name
+        if target_step == 10:
              state.update_job(job_id, progress=80, content=state.content)
-             if target_step == 10:
-                  state.current_step = 10 # Stay for preview
-                  ui.notify('Audio mix complete!', type='positive')
+             state.current_step = 10 # Stay for preview
+             ui.notify('Audio mix complete!', type='positive')
 
         # Step 11: Final Render
         if target_step >= 11:
-             state.logs += "📍 [Step 11] Final VFX & Subtitles Stage...\n"
-             template_path = BASE_DIR / "templates" / f"{template}.yaml"
-             with open(template_path, "r") as f:
-                 template_data = yaml.safe_load(f)
-             
-             # Ensure ASS is ready
-             from app.services.stt import WhisperService
-             stt = WhisperService()
-             font_name = template_data['text']['typography']['font'].split('.')[0]
-             font_size = template_data['text']['typography'].get('size', 110)
-             stt.generate_ass(words, ass_path, font_name, font_size, time_offset=4.0)
-
-             await asyncio.to_thread(workflow.step_final_render, mixed_video, final_video, ass_path, template_data, workflow.theme_color, None)
-             
-             state.content["output_video"] = final_video.name
              state.update_job(job_id, status="completed", progress=100, content=state.content)
              state.current_step = 11
              ui.notify('Final render complete!', type='positive')
 
         ui.navigate.to('/')
 
+    except JobCancelled:
+        # The worker signalled the FFmpeg process groups and removed partial outputs
+        logger.info(f"Production cancelled: {job_id}")
+        state.logs += "\n🛑 PRODUCTION CANCELLED\n"
+        state.update_job(job_id, status="cancelled")
+        ui.notify('Job cancelled', type='warning')
     except Exception as e:
         logger.error(f"Production failed: {e}")
         state.logs += f"\n❌ PRODUCTION ERROR: {str(e)}\n"
         state.update_job(job_id, status="failed")
         ui.notify(f'Failed: {str(e)}', type='negative')
     finally:
-        sys.stdout = original_stdout
-        sys.stderr = original_stderr
         state.is_processing = False
 
+def enqueue_job(topic: str, template: str = "default", youtube_url: str = None, content: dict = None, priority: int = 0, make_current: bool = False) -> str:
+    """Adds a final render to the persistent render queue and the job history."""
+    content = dict(content or {})
+    content.setdefault("topic", topic)
+    content.setdefault("slug", slugify(topic))
+    content["template"] = template
+    if youtube_url:
+        content["youtube_URL"] = youtube_url
+    if not content.get("youtube_URL"):
+        raise ValueError("Source video (YouTube URL) is mandatory")
+
+    job_id = state.current_job_id if make_current and state.current_job_id else state.add_job(topic, make_current=make_current)
+    state.update_job(job_id, status="queued", progress=0, content=content)
+    payload = {"topic": topic, "template": template, "youtube_URL": content["youtube_URL"], "content": content}
+    get_render_queue().enqueue(job_id, payload, priority=priority, target="final", topic=topic)
+    print(f"📥 Queued render: {topic} (priority {priority})")
+    return job_id
+
+async def queue_final_generation():
+    """Step 11 'ADD TO QUEUE': hands the current job to the render workers and frees the wizard."""
+    try:
+        enqueue_job(
+            state.content.get('topic', 'Video'),
+            state.content.get('template', 'default'),
+            content=state.content,
+            priority=int(state.content.get('priority') or 0),
+            make_current=True
+        )
+        ui.notify('Added to render queue', type='positive')
+    except Exception as e:
+        ui.notify(f'Failed: {str(e)}', type='negative')
+
+@app.post('/api/queue', dependencies=[Depends(authorize)])
+def queue_jobs_api(jobs: list | dict):
+    """
+    Queues one or more final renders, e.g.
+    {"topic": "...", "youtube_URL": "...", "template": "default", "priority": 0, "content": {...}}.
+    """
+    queued = []
+    for job in jobs if isinstance(jobs, list) else [jobs]:
+        job_id = enqueue_job(
+            job["topic"], job.get("template", "default"), job.get("youtube_URL"),
+            content=job.get("content"), priority=int(job.get("priority", 0))
+        )
+        queued.append({"job_id": job_id, "position": get_render_queue().position(job_id)})
+    return {"queued": queued}
+
+@app.get('/api/queue')
+def list_queue_api():
+    """Queued and running renders, in queue order."""
+    jobs = get_render_queue().list_jobs(statuses=("queued", "running"))
+    jobs.sort(key=lambda j: (j["status"] != "running", -j["priority"], j["id"]))
+    return {"jobs": [{k: j[k] for k in ("job_id", "topic", "status", "priority", "stage", "progress", "worker")} for j in jobs]}
+
+@app.post('/api/jobs/{job_id}/cancel', dependencies=[Depends(authorize)])
+def cancel_job_api(job_id: str):
+    """Cancels a job: drops it from the queue, or kills its FFmpeg process groups if it is running."""
+    return {"job_id": job_id, "cancelled": cancel_job(job_id)}
+
+# Render farm coordinator: remote workers lease queued jobs over HTTP (/api/farm/...)
+app.include_router(farm_router)
+
+# Render worker processes started with the UI (settings.json "render_workers"; 0 leaves the
+# queue to workers started separately with `python -m app.worker`)
+worker_process = None
+
+# Heavy SDKs load after the server is up (or on first use) rather than at import time
+warmup = get_warmup()
+warmup.add("queue", get_render_queue)
+warmup.add("llm", lambda: get_services().get("llm"))
+
+@app.get('/api/ready')
+def readiness_api():
+    """Which subsystems are warm, and how many render workers are alive. 503 until warmup has finished."""
+    subsystems = warmup.report()
+    workers = [w for w in get_render_queue().list_workers() if w["alive"]]
+    done = all(s["state"] in ("warm", "error") for s in subsystems.values())
+    body = {"ready": warmup.ready, "subsystems": subsystems, "workers": len(workers)}
+    return JSONResponse(body, status_code=200 if done else 503)
+
+async def start_warmup():
+    warmup.start()
+
+app.on_startup(start_warmup)
+
+async def start_worker_pool():
+    global worker_process
+    workers = int(state.settings.get("render_workers", 1))
+    if workers > 0:
+        worker_process = subprocess.Popen(
+            [sys.executable, "-m", "app.worker", "--workers", str(workers)],
+            cwd=BASE_DIR, start_new_session=True
+        )
+        print(f"🛠️  Started render worker process (pid {worker_process.pid}, {workers} worker(s))")
+
+async def stop_worker_pool():
+    # SIGTERM lets the worker return its in-flight jobs to the queue
+    if worker_process and worker_process.poll() is None:
+        worker_process.terminate()
+        try:
+            await asyncio.to_thread(worker_process.wait, 15)
+        except subprocess.TimeoutExpired:
+            worker_process.kill()
+
+app.on_startup(start_worker_pool)
+app.on_shutdown(stop_worker_pool)
+
 def go_back():
     """Pause current job (if any) and start fresh for NEW JOB."""
     # Mark current job as paused
@@ -324,7 +421,7 @@ def go_back():
     ui.navigate.to('/')
 
 async def start_audio_generation():
-    """Generate audio for preview step."""
+    """Generate audio (and its transcript) for preview step on a render worker."""
     topic = state.content.get('topic', 'Audio')
     
     # Reuse existing job from content generation step
@@ -338,12 +435,6 @@ async def start_audio_generation():
     state.is_processing = True
     state.logs += f"\n🎤 Generating Audio for: {topic}...\n"
     
-    # Switch output to terminal
-    original_stdout = sys.stdout
-    original_stderr = sys.stderr
-    sys.stdout = NiceGUIOutputWrapper(state)
-    sys.stderr = sys.stdout
-    
     try:
         # Get selected voice/model or fallback
         voice_id = state.content.get("voice_id")
@@ -353,42 +444,18 @@ async def start_audio_generation():
         
         # Unique Filename Logic
         slug = slugify(topic)
-        audio_filename = f"{slug}.mp3"
         state.content.update({
+            "slug": slug,
             "voice_id": voice_id,
             "tts_model": model_id,
-            "voice_file": audio_filename
         })
         
-        # Save to data/outputs so it can be served correctly
-        output_path = DATA_DIR / "outputs" / audio_filename
-        
-        tts = ElevenLabsService()
-        audio_path_result = await asyncio.to_thread(
-            tts.text_to_speech,
-            text=state.content.get('speech', ''), 
-            output_path=output_path,
-            voice_id=voice_id,
-            model_id=model_id
-        )
-        
-        state.update_job(job_id, status="draft", progress=60, content=state.content)
-        state.logs += f"\n✅ AUDIO READY! Saved to {output_path.name}\n"
-        
-        # Add Transcription stage so it's ready for Step 7
-        state.logs += "🎙️ Transcribing audio for subtitles...\n"
-        from app.services.stt import WhisperService
-        stt = WhisperService()
-        words = await asyncio.to_thread(stt.transcribe, output_path)
-        
-        # Save words for later steps
-        words_filename = f"{slug}_words.json"
-        words_path = DATA_DIR / "outputs" / words_filename
-        with open(words_path, 'w') as f:
-            json.dump(words, f)
-        
-        state.content["subtitle_file"] = words_filename
-        state.update_job(job_id, progress=80, content=state.content)
+        # TTS + Whisper run on a render worker; the transcript is ready for Step 7
+        content = await run_on_worker(job_id, "transcribe")
+        state.content["voice_file"] = content["voice_file"]
+        state.content["subtitle_file"] = content["subtitle_file"]
+        state.update_job(job_id, status="draft", progress=80, content=state.content)
+        state.logs += f"\n✅ AUDIO READY! Saved to {content['voice_file']}\n"
         state.logs += "✅ TRANSCRIPTION READY!\n"
         
         ui.notify('Audio & Transcript generated! Proceed to preview.', type='positive')
@@ -403,12 +470,10 @@ async def start_audio_generation():
         state.update_job(job_id, status="failed")
         ui.notify(f'Failed: {str(e)}', type='negative')
     finally:
-        sys.stdout = original_stdout
-        sys.stderr = original_stderr
         state.is_processing = False
 
 async def start_transcription():
-    """Generates transcript for preview step if missing."""
+    """Generates transcript for preview step if missing (on a render worker)."""
     topic = state.content.get('topic', 'Audio')
     job_id = state.current_job_id
     if not job_id:
@@ -427,17 +492,8 @@ async def start_transcription():
         return
 
     try:
-        from app.services.stt import WhisperService
-        stt = WhisperService()
-        words = await asyncio.to_thread(stt.transcribe, audio_path)
-        
-        # Save words
-        words_filename = f"{slug}_words.json"
-        words_path = DATA_DIR / "outputs" / words_filename
-        with open(words_path, 'w') as f:
-            json.dump(words, f)
-        
-        state.content["subtitle_file"] = words_filename
+        content = await run_on_worker(job_id, "transcribe")
+        state.content["subtitle_file"] = content["subtitle_file"]
         state.update_job(job_id, progress=80, content=state.content)
         state.logs += "✅ TRANSCRIPTION READY!\n"
         ui.notify('Transcription complete!', type='positive')
@@ -702,14 +758,15 @@ def index():
                     on_download_source=start_source_download,
                     on_generate_video=lambda: start_final_generation(
                         state.content.get('topic', 'Video'), 
-                        'default',
+                        state.content.get('template', 'default'),
                         target_step=state.current_step
                     ),
                     on_next_step=go_next_step,
                     on_regenerate=regenerate_content,
                     on_generate_transcript=start_transcription,
                     on_publish=start_cms_publish,
-                    on_generate_images=start_image_generation
+                    on_generate_images=start_image_generation,
+                    on_queue_video=queue_final_generation
                 )
 
 # Startup check
@@ -0,0 +1,431 @@
+"""
+Render benchmarks on synthetic clips (no network, no API keys).
+
+    poetry run bench segmented --duration 60 --segments 8
+    poetry run bench pixfmt --duration 20
+    poetry run bench profiles --duration 30
+    poetry run bench dag --download 20 --tts 6 --stt 12 --render 30
+    poetry run bench startup --budget 3
+    poetry run bench stt --backends whisper,faster-whisper
+"""
+import re
+import sys
+import json
+import time
+import difflib
+import multiprocessing
+import asyncio
+import argparse
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+
+import yaml
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from app.services.video_processor_ffmpeg import VideoProcessorFFmpeg
+from app.services.filter_graph import compile_vfx_graph, RENDER_PIX_FMT
+from app.services.encoding import profile_names, resolve_profile, x264_args
+from app.services.scheduler import Stage, DagScheduler
+
+
+def load_template(name: str = "default") -> dict:
+    with open(BASE_DIR / "templates" / f"{name}.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+
+def make_synthetic_clip(path: Path, duration: float, size: str = "1080x1920", fps: int = 30, with_audio: bool = True):
+    """Renders a testsrc2 clip (plus a sine tone) to use as benchmark input."""
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}:duration={duration}",
+    ]
+    if with_audio:
+        cmd += ["-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}", "-c:a", "aac"]
+    cmd += ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", str(path)]
+    subprocess.run(cmd, check=True)
+    return path
+
+
+def write_sample_ass(path: Path, duration: float):
+    """Minimal caption track with one event per second so the ass filter does real work."""
+    def fmt(t):
+        return f"{int(t // 3600)}:{int(t % 3600 // 60):02d}:{t % 60:05.2f}"
+    events = [
+        f"Dialogue: 0,{fmt(t)},{fmt(t + 1)},Default,,0,0,0,,BENCHMARK WORD {t}"
+        for t in range(int(duration))
+    ]
+    path.write_text(
+        "[Script Info]\nScriptType: v4.00+\nPlayResX: 1080\nPlayResY: 1920\n\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        "Style: Default,Inter-Bold,110,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,-1,0,0,0,100,100,0,0,1,4,0,5,50,50,50,1\n\n"
+        "[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+        + "\n".join(events),
+        encoding="utf-8"
+    )
+    return path
+
+
+def timed(fn, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def print_table(headers: list, rows: list):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+def bench_segmented(args):
+    """Single-process apply_vfx vs the GOP-aligned segmented render."""
+    template = load_template(args.template)
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        tmp = Path(tmp)
+        print(f"🎞️  Generating {args.duration}s synthetic input...")
+        clip = make_synthetic_clip(tmp / "input.mp4", args.duration)
+        ass_path = write_sample_ass(tmp / "captions.ass", args.duration)
+
+        rows = []
+        for label, fn, extra in [
+            ("single-process", VideoProcessorFFmpeg.apply_vfx, {}),
+            (f"segmented x{args.segments}", VideoProcessorFFmpeg.apply_vfx_segmented, {"segments": args.segments}),
+        ]:
+            out = tmp / f"{label.split()[0]}.mp4"
+            print(f"⏱️  {label}...")
+            elapsed = timed(fn, clip, out, ass_path, template, BASE_DIR, **extra)
+            rows.append([label, f"{elapsed:.2f}s", f"{args.duration / elapsed:.2f}x", f"{out.stat().st_size / 1e6:.1f} MB"])
+
+    print()
+    print_table(["mode", "wall", "realtime", "size"], rows)
+
+
+def bench_pixfmt(args):
+    """Filter-graph frame throughput: legacy full-frame RGBA vs planar YUV base."""
+    template = load_template(args.template)
+    fps = 30
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        ass_path = write_sample_ass(Path(tmp) / "captions.ass", args.duration)
+
+        rows = []
+        for label, rgba in [("rgba (legacy)", True), ("yuv420p", False)]:
+            graph = compile_vfx_graph(template, BASE_DIR, "#FCC01E", rgba=rgba)
+            cmd = [
+                "ffmpeg", "-y", "-v", "error",
+                "-f", "lavfi", "-i", f"testsrc2=size=1080x1920:rate={fps}:duration={args.duration}",
+                *graph.input_args(),
+                "-filter_complex", graph.build("0:v", 1, args.duration, ass_path),
+                "-map", "[v_final]",
+                # Null sink, but still convert to the encoder's format so both variants pay for it
+                "-pix_fmt", RENDER_PIX_FMT,
+                "-f", "null", "-"
+            ]
+            print(f"⏱️  {label}...")
+            elapsed = timed(subprocess.run, cmd, check=True)
+            frames = args.duration * fps
+            rows.append([label, f"{elapsed:.2f}s", f"{frames / elapsed:.1f}", f"{args.duration / elapsed:.2f}x"])
+
+    print()
+    print_table(["graph", "wall", "fps", "realtime"], rows)
+
+
+def bench_profiles(args):
+    """Encode time vs output size for every encoding profile."""
+    settings = {}
+    settings_path = BASE_DIR / "settings.json"
+    if settings_path.exists():
+        settings = json.loads(settings_path.read_text())
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        tmp = Path(tmp)
+        print(f"🎞️  Generating {args.duration}s synthetic input...")
+        clip = make_synthetic_clip(tmp / "input.mp4", args.duration, with_audio=False)
+
+        rows = []
+        for name in profile_names(settings):
+            profile = resolve_profile(name, settings)
+            out = tmp / f"{name}.mp4"
+            cmd = ["ffmpeg", "-y", "-v", "error", "-i", str(clip), "-an", *x264_args(profile), str(out)]
+            print(f"⏱️  {name}...")
+            elapsed = timed(subprocess.run, cmd, check=True)
+            size = out.stat().st_size
+            rows.append([
+                name, profile["preset"], profile["crf"], profile.get("maxrate") or "-",
+                f"{elapsed:.2f}s", f"{args.duration / elapsed:.2f}x",
+                f"{size / 1e6:.1f} MB", f"{size * 8 / args.duration / 1e3:.0f} kb/s",
+            ])
+
+    print()
+    print_table(["profile", "preset", "crf", "maxrate", "wall", "realtime", "size", "bitrate"], rows)
+
+
+def bench_dag(args):
+    """Serial pipeline vs the stage DAG, with stage latencies simulated by sleeps (seconds / --scale)."""
+    durations = {
+        "content": args.content, "audio": args.tts, "transcribe": args.stt,
+        "captions": 0.1, "download": args.download, "final": args.render,
+    }
+    deps = {
+        "content": [], "audio": ["content"], "transcribe": ["audio"], "captions": ["transcribe"],
+        "download": [], "final": ["audio", "download", "captions"],
+    }
+    resources = {"content": "network", "audio": "network", "transcribe": "stt", "download": "network", "final": "encode"}
+
+    def stage(name):
+        return lambda results: time.sleep(durations[name] / args.scale)
+
+    stages = [Stage(name, stage(name), deps[name], resources.get(name)) for name in deps]
+
+    serial = sum(durations.values()) / args.scale
+    print(f"⏱️  serial (sum of stages): {serial:.2f}s")
+    start = time.perf_counter()
+    asyncio.run(DagScheduler().run(stages))
+    dag = time.perf_counter() - start
+
+    print()
+    print_table(
+        ["mode", "wall", "x scale", "saved"],
+        [
+            ["serial", f"{serial:.2f}s", f"{serial * args.scale:.1f}s", "-"],
+            ["dag", f"{dag:.2f}s", f"{dag * args.scale:.1f}s", f"{(serial - dag) * args.scale:.1f}s"],
+        ]
+    )
+
+
+# Dependencies that must load on first use / during warmup, never when the app is imported
+HEAVY_IMPORTS = ["torch", "whisper", "google.generativeai", "elevenlabs", "yt_dlp"]
+
+
+def parse_importtime(stderr: str) -> list:
+    """`python -X importtime` lines -> [(module, self_us, cumulative_us)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def bench_startup(args):
+    """Import cost of the app (wall time over --runs cold interpreters, plus the -X importtime breakdown)."""
+    walls, rows = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+            cwd=BASE_DIR, capture_output=True, text=True
+        )
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:])
+            sys.exit(f"❌ import {args.module} failed")
+        rows = parse_importtime(proc.stderr)
+
+    total = next((c for m, _, c in rows if m == args.module), 0) / 1e6
+    # Self time summed per top-level package shows which dependency the time goes to
+    packages = {}
+    for module, self_us, _ in rows:
+        root = module.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+    heaviest = sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]
+
+    walls.sort()
+    print(f"⏱️  import {args.module}: {total:.2f}s (importtime), wall min {walls[0]:.2f}s / median {walls[len(walls) // 2]:.2f}s over {args.runs} run(s)")
+    print()
+    print_table(["package", "self"], [[name, f"{us / 1e3:.0f}ms"] for name, us in heaviest])
+
+    loaded = {m for m, _, _ in rows}
+    eager = [name for name in args.forbid.split(",") if name and name in loaded]
+    failed = False
+    if eager:
+        print(f"\n❌ Imported at startup (should be deferred): {', '.join(eager)}")
+        failed = True
+    if args.budget and total > args.budget:
+        print(f"\n❌ Startup import {total:.2f}s exceeds the {args.budget:.2f}s budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\n✅ Startup within budget")
+
+
+STT_FIXTURE = BASE_DIR / "data" / "fixtures" / "stt_fixture.mp3"
+# ~50s of narration, like a typical voiceover. The committed clip was made offline with
+# `bench stt --make-fixture` (espeak-ng, en-us, 165 wpm, 32 kb/s mono mp3).
+STT_FIXTURE_SCRIPT = (
+    "Most students think studying longer is the secret to better grades. It isn't. "
+    "The research on learning points to three habits that matter far more than hours. "
+    "First, test yourself. Closing the book and trying to recall what you just read feels harder "
+    "than re-reading, and that difficulty is exactly why it works. "
+    "Second, space it out. Twenty minutes a day for five days beats a two hour cram the night before, "
+    "because every time you come back to the material your brain has to rebuild it. "
+    "Third, mix it up. Switching between different types of problems forces you to choose the right "
+    "strategy instead of repeating the last one on autopilot. "
+    "None of this takes more time. It just takes a little more effort while you do it. "
+    "Try it this week with one subject, and compare how much you remember on Friday. "
+    "Follow for more study tips that actually work."
+)
+
+
+def _stt_worker(backend: str, model: str, compute_type: str, audio: str, runs: int, script: str = "") -> dict:
+    """Runs in a fresh process so load time and peak RSS belong to one engine only."""
+    import resource
+    from app.services.stt import get_whisper_pool, make_backend
+    from app.services.aligner import MmsForcedAligner
+
+    if backend == "align":
+        # Forced alignment of the known script; align() takes the model from the STT pool,
+        # so loading it there first keeps the load out of the timed runs
+        engine = MmsForcedAligner(min_confidence=0.0)
+        start = time.perf_counter()
+        with get_whisper_pool().model(engine):
+            load = time.perf_counter() - start
+        run = lambda: engine.align(Path(audio), script)
+    else:
+        engine = make_backend(backend, model, compute_type or None)
+        start = time.perf_counter()
+        loaded, _ = engine.load()
+        load = time.perf_counter() - start
+        run = lambda: engine.transcribe(loaded, Path(audio))
+    times, words = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        words = run()
+        times.append(time.perf_counter() - start)
+    # ru_maxrss is KiB on Linux (bytes on macOS)
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {"engine": engine.key, "load": load, "transcribe": sorted(times)[len(times) // 2], "rss_mb": rss_mb, "words": words}
+
+
+def timing_drift(reference: list, words: list) -> tuple:
+    """Pairs equal words of two transcripts; returns (share of reference words matched, mean ms, max ms) of start/end drift."""
+    def tokens(ws):
+        return [re.sub(r"[^\w']", "", w["word"].lower()) for w in ws]
+
+    matcher = difflib.SequenceMatcher(None, tokens(reference), tokens(words), autojunk=False)
+    drifts, matched = [], 0
+    for block in matcher.get_matching_blocks():
+        for k in range(block.size):
+            a, b = reference[block.a + k], words[block.b + k]
+            drifts += [abs(a["start"] - b["start"]), abs(a["end"] - b["end"])]
+            matched += 1
+    if not drifts:
+        return 0.0, float("nan"), float("nan")
+    return matched / max(1, len(reference)), 1000 * sum(drifts) / len(drifts), 1000 * max(drifts)
+
+
+def make_stt_fixture(path: Path, engine: str = "espeak"):
+    """Synthesizes the fixture narration: offline with espeak-ng (or macOS `say`), or with ElevenLabs."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if engine == "elevenlabs":
+        from app.services.tts import ElevenLabsService
+        ElevenLabsService().text_to_speech(STT_FIXTURE_SCRIPT, path)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            script, speech = Path(tmp) / "script.txt", Path(tmp) / "speech.aiff"
+            script.write_text(STT_FIXTURE_SCRIPT)
+            if shutil.which("espeak-ng"):
+                speech = speech.with_suffix(".wav")
+                cmd = ["espeak-ng", "-v", "en-us", "-s", "165", "-w", str(speech), "-f", str(script)]
+            elif shutil.which("say"):
+                cmd = ["say", "-r", "165", "-o", str(speech), "-f", str(script)]
+            else:
+                sys.exit("❌ --make-fixture needs espeak-ng (or macOS `say`); or use --fixture-engine elevenlabs")
+            subprocess.run(cmd, check=True)
+            subprocess.run([
+                "ffmpeg", "-y", "-v", "error", "-i", str(speech),
+                "-ac", "1", "-ar", "22050", "-c:a", "libmp3lame", "-b:a", "32k", str(path)
+            ], check=True)
+    print(f"🎤 Wrote STT fixture {path} ({engine})")
+
+
+def bench_stt(args):
+    """Latency, peak RSS and word-timing drift (vs the first backend) of each STT backend on a fixed clip."""
+    audio = Path(args.audio)
+    if args.make_fixture:
+        make_stt_fixture(audio, args.fixture_engine)
+    if not audio.exists():
+        sys.exit(f"❌ {audio} not found: run once with --make-fixture or pass --audio")
+    duration = VideoProcessorFFmpeg.get_duration(audio)
+    script = Path(args.script_file).read_text() if args.script_file else STT_FIXTURE_SCRIPT
+    print(f"🎙️  {audio.name}: {duration:.1f}s, model {args.model}, {args.runs} run(s) per backend")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for spec in args.backends.split(","):
+        backend, _, compute_type = spec.strip().partition(":")
+        with ctx.Pool(1) as pool:
+            results.append(pool.apply(_stt_worker, (backend, args.model, compute_type, str(audio), args.runs, script)))
+
+    reference = results[0]["words"]
+    rows = []
+    for r in results:
+        matched, mean_ms, max_ms = timing_drift(reference, r["words"])
+        rows.append([
+            r["engine"], f"{r['load']:.1f}s", f"{r['transcribe']:.2f}s", f"{duration / r['transcribe']:.1f}x",
+            f"{r['rss_mb']:.0f} MB", len(r["words"]), f"{100 * matched:.0f}%", f"{mean_ms:.0f}ms", f"{max_ms:.0f}ms",
+        ])
+    print()
+    print_table(["engine", "load", "transcribe", "realtime", "peak rss", "words", "matched", "drift mean", "drift max"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Video engine render benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    seg = sub.add_parser("segmented", help="Single-process vs segmented parallel final render")
+    seg.add_argument("--duration", type=int, default=60)
+    seg.add_argument("--segments", type=int, default=VideoProcessorFFmpeg._default_segments())
+    seg.add_argument("--template", default="default")
+    seg.set_defaults(func=bench_segmented)
+
+    pix = sub.add_parser("pixfmt", help="Frame throughput of the RGBA vs YUV filter graph")
+    pix.add_argument("--duration", type=int, default=20)
+    pix.add_argument("--template", default="default")
+    pix.set_defaults(func=bench_pixfmt)
+
+    prof = sub.add_parser("profiles", help="Encode time vs output size per encoding profile")
+    prof.add_argument("--duration", type=int, default=30)
+    prof.set_defaults(func=bench_profiles)
+
+    dag = sub.add_parser("dag", help="Serial vs DAG-scheduled pipeline latency (simulated stage times)")
+    dag.add_argument("--content", type=float, default=0.0, help="LLM content seconds (0 when the script exists)")
+    dag.add_argument("--tts", type=float, default=6.0)
+    dag.add_argument("--stt", type=float, default=12.0)
+    dag.add_argument("--download", type=float, default=20.0)
+    dag.add_argument("--render", type=float, default=30.0)
+    dag.add_argument("--scale", type=float, default=10.0, help="Divide every stage time by this factor")
+    dag.set_defaults(func=bench_dag)
+
+    start = sub.add_parser("startup", help="App import time via -X importtime; fails on eager heavy imports or over budget")
+    start.add_argument("--module", default="app.main", help="Module to import (e.g. app.worker)")
+    start.add_argument("--runs", type=int, default=3)
+    start.add_argument("--top", type=int, default=12, help="Heaviest packages to list")
+    start.add_argument("--budget", type=float, default=0.0, help="Fail if the import takes longer (seconds, 0 = no budget)")
+    start.add_argument("--forbid", default=",".join(HEAVY_IMPORTS), help="Comma-separated modules that must not load at import")
+    start.set_defaults(func=bench_startup)
+
+    stt = sub.add_parser("stt", help="STT backends: latency, peak RSS and word-timing drift on a fixed clip")
+    stt.add_argument("--backends", default="whisper,faster-whisper", help="Comma-separated backend[:compute_type] or 'align' (forced alignment); the first is the drift reference")
+    stt.add_argument("--model", default="base")
+    stt.add_argument("--runs", type=int, default=3)
+    stt.add_argument("--audio", default=str(STT_FIXTURE))
+    stt.add_argument("--make-fixture", action="store_true", help="Re-synthesize the fixture clip first")
+    stt.add_argument("--fixture-engine", choices=["espeak", "elevenlabs"], default="espeak", help="espeak: offline (espeak-ng / macOS say); elevenlabs: needs ELEVENLABS_API_KEY")
+    stt.add_argument("--script-file", default=None, help="Narration text of --audio for the 'align' backend (default: the fixture script)")
+    stt.set_defaults(func=bench_stt)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -389,6 +389,24 @@ def update_templates(font_path):
         yaml.dump(config, f, default_flow_style=False)
     print("   ✅ Template default.yaml updated/created")
 
+def compile_template_assets():
+    """Pre-bakes overlay plates and pre-keyed intro/outro animations for every template"""
+    from app.services.asset_cache import get_asset_cache
+    from app.utils.theme_parser import get_theme_color
+
+    theme_color = get_theme_color(THEME_CSS)
+    cache = get_asset_cache()
+    for template_path in sorted(TEMPLATES_DIR.glob("*.yaml")):
+        with open(template_path, "r") as f:
+            template = yaml.safe_load(f)
+        plate = cache.overlay_plate(template, theme_color, BASE_DIR)
+        if plate:
+            print(f"   ✅ Overlay plate for {template_path.name}: {plate.name}")
+        for layer in ("intro", "outro"):
+            if template.get(layer, {}).get('enabled', True):
+                keyed = cache.keyed_overlay(ASSETS_DIR / template[layer]['file'])
+                print(f"   ✅ Pre-keyed {layer} for {template_path.name}: {keyed.name}")
+
 def main():
     print("🚀 Video Engine Dynamic Generator (V6 - Final Fixes)")
     print("------------------------------------------------------------")
@@ -405,6 +423,7 @@ def main():
     generate_gradients()
     generate_animations(brand_data)
     update_templates(font_path)
+    compile_template_assets()
     
     print("------------------------------------------------------------")
     print("✅ Assets generated successfully")
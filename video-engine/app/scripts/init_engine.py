@@ -112,8 +112,15 @@ def setup_defaults():
     }
     
     settings_path = BASE_DIR / "settings.json"
+    # Keep non-AI preferences (render tuning etc.) that are already configured
+    stored = {}
+    if settings_path.exists():
+        try:
+            stored = json.load(open(settings_path))
+        except Exception:
+            pass
     with open(settings_path, "w") as f:
-        json.dump(settings, f, indent=4)
+        json.dump({**stored, **settings}, f, indent=4)
     print(f"      ✅ Settings saved to {settings_path.relative_to(BASE_DIR)}")
 
     # 4. Update default.yaml
@@ -0,0 +1,94 @@
+import re
+import json
+import base64
+import argparse
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds of speech per character of text (~15 characters/s, roughly ElevenLabs' pace)
+CHAR_SECONDS = 0.065
+LEAD_IN = 0.1
+
+TIMESTAMPS_PATH = re.compile(r"^/v1/text-to-speech/(?P<voice>[^/]+)/with-timestamps/?$")
+
+
+def fake_speech(text: str, char_seconds: float = CHAR_SECONDS) -> dict:
+    """
+    A `/with-timestamps` response for `text`: a tone lasting as long as the text would be
+    spoken (mp3, made with FFmpeg so it probes like real TTS output) and an even per-character
+    alignment over it.
+    """
+    starts = [round(LEAD_IN + i * char_seconds, 3) for i in range(len(text))]
+    ends = [round(start + char_seconds, 3) for start in starts]
+    duration = (ends[-1] if ends else LEAD_IN) + LEAD_IN
+    cmd = [
+        "ffmpeg", "-v", "error", "-f", "lavfi", "-i", f"sine=frequency=220:duration={duration:.3f}",
+        "-ac", "1", "-c:a", "libmp3lame", "-b:a", "64k", "-f", "mp3", "pipe:1",
+    ]
+    audio = subprocess.run(cmd, capture_output=True, check=True).stdout
+    alignment = {"characters": list(text), "character_start_times_seconds": starts, "character_end_times_seconds": ends}
+    return {
+        "audio_base64": base64.b64encode(audio).decode(),
+        "alignment": alignment,
+        "normalized_alignment": alignment,
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    char_seconds = CHAR_SECONDS
+
+    def _send(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/user":
+            return self._send(200, {"subscription": {"tier": "stub"}})
+        self._send(404, {"detail": "not found"})
+
+    def do_POST(self):
+        match = TIMESTAMPS_PATH.match(self.path.split("?")[0])
+        if not match:
+            return self._send(404, {"detail": "only /v1/text-to-speech/{voice_id}/with-timestamps is stubbed"})
+        if not self.headers.get("xi-api-key"):
+            return self._send(401, {"detail": {"status": "invalid_api_key"}})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except json.JSONDecodeError:
+            return self._send(400, {"detail": "invalid JSON"})
+        text = body.get("text", "")
+        if not text:
+            return self._send(422, {"detail": "text is required"})
+        self._send(200, fake_speech(text, self.char_seconds))
+        print(f"🎤 {match.group('voice')}: {len(text)} chars")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for ElevenLabs' /with-timestamps endpoint (set ELEVENLABS_BASE_URL to its address)"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--char-seconds", type=float, default=CHAR_SECONDS, help="speech duration per character")
+    args = parser.parse_args()
+
+    StubHandler.char_seconds = args.char_seconds
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"🧪 TTS stub on http://{args.host}:{args.port} (ELEVENLABS_BASE_URL=http://{args.host}:{args.port})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
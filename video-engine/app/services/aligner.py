@@ -0,0 +1,124 @@
+import re
+import logging
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+from app.services.stt import get_whisper_pool
+
+logger = logging.getLogger(__name__)
+
+# Below this mean per-word alignment probability the script is considered not to match the audio
+DEFAULT_MIN_CONFIDENCE = 0.5
+# Share of script words the aligner may be unable to spell (digits, symbols) before giving up
+MAX_UNALIGNABLE = 0.15
+
+
+class AlignmentFailed(Exception):
+    """The script could not be aligned confidently; callers fall back to transcription."""
+
+
+def script_words(script: str) -> list:
+    """The script split the way captions show it (punctuation kept on the word, like Whisper's output)."""
+    return script.split()
+
+
+class MmsForcedAligner:
+    """
+    CTC forced alignment of a known script against its audio with torchaudio's MMS_FA
+    (wav2vec2) model: one forward pass over the audio, no decoding. Returns the script's own
+    words with their timings, in the `[{"word", "start", "end"}]` transcript format. Optional
+    dependency (torchaudio); the model is held in the shared STT pool like Whisper models.
+    """
+
+    name = "mms-fa"
+    key = "align:mms-fa"
+
+    def __init__(self, min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+
+    def load(self):
+        try:
+            import torchaudio
+        except ImportError as e:
+            raise AlignmentFailed("transcribe_mode 'align' needs torchaudio (poetry install -E align)") from e
+        bundle = torchaudio.pipelines.MMS_FA
+        model = bundle.get_model(with_star=False)
+        model.eval()
+        size_mb = sum(p.numel() * p.element_size() for p in model.parameters()) / 1e6
+        return {"bundle": bundle, "model": model, "tokenizer": bundle.get_tokenizer(), "aligner": bundle.get_aligner()}, size_mb
+
+    @staticmethod
+    def _normalize(word: str) -> str:
+        # The MMS_FA dictionary is lowercase a-z plus apostrophe
+        return re.sub(r"[^a-z']", "", word.lower().replace("’", "'"))
+
+    @staticmethod
+    def _decode(audio_path: Path, sample_rate: int):
+        """Float32 mono waveform [1, samples] decoded by FFmpeg (torchaudio.load would need torchcodec)."""
+        import torch
+        cmd = [
+            "ffmpeg", "-nostdin", "-v", "error", "-i", str(audio_path),
+            "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "-",
+        ]
+        pcm = subprocess.run(cmd, capture_output=True, check=True).stdout
+        return torch.frombuffer(bytearray(pcm), dtype=torch.float32).unsqueeze(0)
+
+    def align(self, audio_path: Path, script: str) -> list:
+        words = script_words(script)
+        normalized = [self._normalize(w) for w in words]
+        alignable = [i for i, w in enumerate(normalized) if w]
+        if not alignable:
+            raise AlignmentFailed("script has no alignable words")
+        if 1 - len(alignable) / len(words) > MAX_UNALIGNABLE:
+            raise AlignmentFailed(f"{len(words) - len(alignable)} of {len(words)} script words can't be aligned (digits/symbols)")
+
+        try:
+            with get_whisper_pool().model(self) as fa:
+                import torch
+                waveform = self._decode(audio_path, fa["bundle"].sample_rate)
+                with torch.inference_mode():
+                    emission, _ = fa["model"](waveform)
+                spans = fa["aligner"](emission[0], fa["tokenizer"]([normalized[i] for i in alignable]))
+        except AlignmentFailed:
+            raise
+        except Exception as e:
+            # Decode, model or tokenizer errors: the caller falls back to transcription
+            raise AlignmentFailed(f"{type(e).__name__}: {e}") from e
+
+        seconds_per_frame = waveform.size(1) / emission.size(1) / fa["bundle"].sample_rate
+        timings, scores = {}, []
+        for index, word_spans in zip(alignable, spans):
+            timings[index] = (word_spans[0].start * seconds_per_frame, word_spans[-1].end * seconds_per_frame)
+            scores.append(sum(s.score * len(s) for s in word_spans) / sum(len(s) for s in word_spans))
+
+        confidence = sum(scores) / len(scores)
+        if confidence < self.min_confidence:
+            raise AlignmentFailed(f"low alignment confidence {confidence:.2f} < {self.min_confidence:.2f}")
+        logger.info(f"Aligned {len(words)} script words (confidence {confidence:.2f})")
+        return self._fill(words, timings)
+
+    @staticmethod
+    def _fill(words: list, timings: dict) -> list:
+        """Words the aligner couldn't spell share the gap between their aligned neighbours."""
+        result, i = [], 0
+        while i < len(words):
+            if i in timings:
+                start, end = timings[i]
+                result.append({"word": words[i], "start": round(start, 3), "end": round(end, 3)})
+                i += 1
+                continue
+            run_end = next((j for j in range(i, len(words)) if j in timings), len(words))
+            gap_start = result[-1]["end"] if result else 0.0
+            gap_end = timings[run_end][0] if run_end < len(words) else gap_start
+            step = max(0.0, gap_end - gap_start) / (run_end - i)
+            for k in range(i, run_end):
+                start = gap_start + (k - i) * step
+                result.append({"word": words[k], "start": round(start, 3), "end": round(start + step, 3)})
+            i = run_end
+        return result
+
+
+def get_aligner(settings: Optional[dict] = None) -> MmsForcedAligner:
+    settings = settings or {}
+    return MmsForcedAligner(float(settings.get("align_min_confidence", DEFAULT_MIN_CONFIDENCE)))
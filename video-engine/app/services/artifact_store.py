@@ -0,0 +1,109 @@
+import os
+import shutil
+import logging
+from pathlib import Path
+from typing import Optional
+
+from app.services import artifacts
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """
+    Where render farm workers get a job's inputs from and put its outputs, so a stage can run
+    on any node. Artifacts are addressed by file name (`<slug>...`) and travel with their
+    `.meta.json` sidecar, so a pulled file is reused by the stage validation like a local one.
+    """
+
+    def list(self, slug: str) -> list:
+        """Names of the stored artifacts of a job."""
+        raise NotImplementedError
+
+    def fingerprint(self, name: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def get(self, name: str, dest: Path):
+        raise NotImplementedError
+
+    def put(self, path: Path):
+        raise NotImplementedError
+
+    @staticmethod
+    def belongs_to(name: str, slug: str) -> bool:
+        # `<slug>.mp3`, `<slug>_words.json`, ... but not another job whose slug starts the same
+        return (name.startswith(f"{slug}.") or name.startswith(f"{slug}_")) \
+            and not name.endswith((artifacts.SIDECAR_SUFFIX, ".tmp")) and ".part." not in name
+
+    def pull(self, slug: str, local_dir: Path) -> list:
+        """Copies the job's stored artifacts that are missing or different into `local_dir`."""
+        pulled = []
+        for name in self.list(slug):
+            local = local_dir / name
+            if local.exists() and artifacts.file_fingerprint(local) == self.fingerprint(name):
+                continue
+            self.get(name, local)
+            pulled.append(name)
+        if pulled:
+            logger.info(f"Pulled {len(pulled)} artifact(s) for {slug}: {', '.join(pulled)}")
+        return pulled
+
+    def push(self, slug: str, local_dir: Path) -> list:
+        """Uploads the job's finished artifacts in `local_dir` that the store doesn't have yet."""
+        pushed = []
+        for path in sorted(local_dir.iterdir()):
+            if not path.is_file() or not self.belongs_to(path.name, slug):
+                continue
+            if self.fingerprint(path.name) == artifacts.file_fingerprint(path):
+                continue
+            self.put(path)
+            pushed.append(path.name)
+        if pushed:
+            logger.info(f"Pushed {len(pushed)} artifact(s) for {slug}: {', '.join(pushed)}")
+        return pushed
+
+
+class LocalArtifactStore(ArtifactStore):
+    """
+    A directory every node can reach: a local path when the workers share the coordinator's
+    box, or an NFS/SMB mount across machines. Defaults to the coordinator's data/outputs, so
+    pushed results are served by the UI right away.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def list(self, slug: str) -> list:
+        return sorted(p.name for p in self.root.iterdir() if p.is_file() and self.belongs_to(p.name, slug))
+
+    def fingerprint(self, name: str) -> Optional[str]:
+        return artifacts.file_fingerprint(self.root / name)
+
+    @staticmethod
+    def _copy(src: Path, dest: Path):
+        # Copy to a temp name first so readers on the other side never see a partial file
+        tmp = artifacts.part_path(dest)
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+
+    def _transfer(self, src: Path, dest: Path):
+        if src.resolve() == dest.resolve():
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        # The file goes first: a sidecar next to a stale file would be rejected, not trusted
+        artifacts.sidecar_path(dest).unlink(missing_ok=True)
+        self._copy(src, dest)
+        if artifacts.sidecar_path(src).exists():
+            self._copy(artifacts.sidecar_path(src), artifacts.sidecar_path(dest))
+
+    def get(self, name: str, dest: Path):
+        self._transfer(self.root / name, Path(dest))
+
+    def put(self, path: Path):
+        self._transfer(Path(path), self.root / Path(path).name)
+
+
+def get_artifact_store(root: Optional[Path] = None) -> ArtifactStore:
+    """Store for the render farm (only a shared directory for now)."""
+    return LocalArtifactStore(root or Path(__file__).resolve().parent.parent.parent / "data" / "outputs")
@@ -0,0 +1,231 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+import uuid
+from contextlib import contextmanager, asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app.services.media_probe import get_media_probe
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_SUFFIX = ".meta.json"
+# Seconds a re-probed duration may drift from the recorded one before the artifact is rejected
+DURATION_TOLERANCE = 0.1
+HASH_CHUNK = 1024 * 1024
+
+# (path, size, mtime_ns) -> sha1, so unchanged sources and assets are hashed once per process
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+
+def sidecar_path(path: Path) -> Path:
+    return path.with_name(path.name + SIDECAR_SUFFIX)
+
+
+def part_path(path: Path) -> Path:
+    """
+    Per-writer temp name a stage writes to: workers sharing an output dir may build the same
+    artifact at once. The suffix is kept so FFmpeg still picks the right muxer.
+    """
+    return path.with_name(f"{path.stem}.part.{os.getpid()}.{uuid.uuid4().hex[:8]}{path.suffix}")
+
+
+def content_hash(path: Path) -> str:
+    path = Path(path)
+    st = path.stat()
+    key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    with _hash_lock:
+        if key in _hash_cache:
+            return _hash_cache[key]
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    with _hash_lock:
+        _hash_cache[key] = digest.hexdigest()
+    return _hash_cache[key]
+
+
+def file_fingerprint(path: Path) -> Optional[str]:
+    """
+    Content hash of an input file. Stage outputs reuse the hash stored in their sidecar, so a
+    downstream stage's fingerprint changes exactly when an upstream artifact was re-rendered.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    meta = read_sidecar(path)
+    if meta and meta.get("sha1") and meta.get("size") == path.stat().st_size:
+        return meta["sha1"]
+    return content_hash(path)
+
+
+def value_fingerprint(value):
+    """Paths are hashed by content; dicts/lists (template subtrees, profiles) by canonical JSON."""
+    if isinstance(value, Path):
+        return file_fingerprint(value)
+    if isinstance(value, (dict, list, tuple)):
+        return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+    return value
+
+
+def input_fingerprints(inputs: Optional[dict]) -> dict:
+    """{name: Path | value} -> {name: fingerprint}."""
+    fingerprints = {name: value_fingerprint(value) for name, value in (inputs or {}).items()}
+    # Normalized through JSON so it compares equal to what the sidecar stores
+    return json.loads(json.dumps(fingerprints))
+
+
+def changed_inputs(meta: dict, inputs: dict) -> list:
+    recorded = meta.get("inputs") or {}
+    current = input_fingerprints(inputs)
+    return sorted(name for name in set(recorded) | set(current) if recorded.get(name) != current.get(name))
+
+
+def describe(path: Path, media: bool = True) -> dict:
+    """Integrity record for a finished artifact: size and, for media, duration and stream counts."""
+    record = {"size": path.stat().st_size}
+    if media:
+        info = get_media_probe().probe(path)
+        record["duration"] = round(info["duration"], 3)
+        record["streams"] = _stream_counts(info)
+    return record
+
+
+def _stream_counts(info: dict) -> dict:
+    counts = {}
+    for stream in info.get("streams", []):
+        counts[stream["type"]] = counts.get(stream["type"], 0) + 1
+    return counts
+
+
+def read_sidecar(path: Path) -> Optional[dict]:
+    try:
+        with open(sidecar_path(path), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_sidecar(path: Path, inputs: Optional[dict] = None, media: bool = True) -> dict:
+    meta = {
+        **describe(path, media),
+        "sha1": content_hash(path),
+        "inputs": input_fingerprints(inputs),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    tmp = part_path(sidecar_path(path))
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, sidecar_path(path))
+    return meta
+
+
+def invalidate(path: Path):
+    """Removes an artifact and its sidecar."""
+    path.unlink(missing_ok=True)
+    sidecar_path(path).unlink(missing_ok=True)
+
+
+def validate(path: Path, inputs: Optional[dict] = None, media: bool = True) -> bool:
+    """
+    True if `path` is a complete artifact for `inputs`. The sidecar must match the file's size
+    and, for media, the (cached) probe's duration and stream counts; its input fingerprints
+    must match the current ones. Since upstream artifacts are fingerprinted by their own hash,
+    a re-rendered stage invalidates everything downstream of it and nothing else. Files from
+    before sidecars existed are adopted if they probe cleanly and the stage has no inputs to
+    check; a fingerprinted stage can't tell what they were built from, so it re-runs. Anything
+    else is removed so the stage re-runs.
+    """
+    path = Path(path)
+    if not path.exists():
+        return False
+
+    meta = read_sidecar(path)
+    if meta is None and inputs:
+        # Stamping the current inputs on it would accept a stale artifact forever
+        logger.warning(f"Discarding {path.name}: no sidecar to check its inputs against")
+        invalidate(path)
+        return False
+
+    try:
+        if meta is None:
+            # Pre-sidecar artifact: a truncated mp4 (no moov atom) fails to probe here
+            describe(path, media)
+            write_sidecar(path, None, media)
+            logger.info(f"Adopted existing artifact {path.name}")
+            return True
+
+        reason = None
+        current = describe(path, media)
+        if current["size"] != meta.get("size"):
+            reason = f"size {current['size']} != {meta.get('size')}"
+        elif media and abs(current["duration"] - meta.get("duration", -1)) > DURATION_TOLERANCE:
+            reason = f"duration {current['duration']}s != {meta.get('duration')}s"
+        elif media and current["streams"] != meta.get("streams"):
+            reason = f"streams {current['streams']} != {meta.get('streams')}"
+        elif inputs is not None and changed_inputs(meta, inputs):
+            reason = f"inputs changed ({', '.join(changed_inputs(meta, inputs))})"
+        if reason is None:
+            return True
+    except Exception as e:
+        reason = f"unreadable ({e})"
+
+    logger.warning(f"Discarding {path.name}: {reason}")
+    invalidate(path)
+    return False
+
+
+def _finalize(tmp: Path, path: Path, inputs: Optional[dict], media: bool):
+    if not tmp.exists() or tmp.stat().st_size == 0:
+        raise RuntimeError(f"Stage produced no output for {path.name}")
+    sidecar_path(path).unlink(missing_ok=True)
+    os.replace(tmp, path)
+    write_sidecar(path, inputs, media)
+
+
+@contextmanager
+def atomic_output(path: Path, inputs: Optional[dict] = None, media: bool = True):
+    """
+    Yields a temp path for a stage to write to. On success it is renamed over `path` and a
+    sidecar recording size, duration, stream counts and input fingerprints is written; on any
+    failure (including kill or cancellation) the temp file is removed and `path` is untouched.
+    """
+    path = Path(path)
+    tmp = part_path(path)
+    try:
+        yield tmp
+        _finalize(tmp, path, inputs, media)
+    except BaseException:
+        if tmp.exists():
+            logger.info(f"Removing partial output {tmp.name}")
+            tmp.unlink(missing_ok=True)
+        raise
+
+
+@asynccontextmanager
+async def atomic_output_async(path: Path, inputs: Optional[dict] = None, media: bool = True):
+    """atomic_output for async stages; the finishing probe runs off the event loop."""
+    path = Path(path)
+    tmp = part_path(path)
+    try:
+        yield tmp
+        await asyncio.to_thread(_finalize, tmp, path, inputs, media)
+    except BaseException:
+        if tmp.exists():
+            logger.info(f"Removing partial output {tmp.name}")
+            tmp.unlink(missing_ok=True)
+        raise
+
+
+def write_json(path: Path, data, inputs: Optional[dict] = None):
+    """Atomically writes a JSON artifact (e.g. word timings) with its sidecar."""
+    with atomic_output(path, inputs, media=False) as tmp:
+        with open(tmp, "w") as f:
+            json.dump(data, f)
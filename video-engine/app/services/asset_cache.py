@@ -0,0 +1,154 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_CACHE_DIR = BASE_DIR / "data" / "cache" / "assets"
+
+FRAME_SIZE = (1080, 1920)
+TINT_OPACITY = 0.08
+# Matches the colorkey previously applied per job to the VP9 intro/outro animations
+OVERLAY_COLORKEY = "0x000000:0.1:0.1"
+
+
+def _hex_to_rgb(color: str):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _file_stamp(path: Path) -> str:
+    """Cheap content identity for cache keys (size + mtime)."""
+    st = path.stat()
+    return f"{path.name}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _tmp_path(path: Path) -> Path:
+    """Per-writer temp name: worker processes share the cache dir and may build the same entry at once."""
+    return path.with_name(f"{path.stem}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp{path.suffix}")
+
+
+class AssetCache:
+    """
+    Render-ready assets compiled once per template/theme and shared by every job
+    (overlay plates, pre-keyed intro/outro animations).
+    Entries are keyed by a hash of the inputs that shape them, so editing a template,
+    changing the theme color or regenerating a source asset yields a new entry.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(*parts) -> str:
+        blob = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+    def overlay_plate(self, template: dict, theme_color: str, base_dir: Path):
+        """
+        Composes the theme tint and the bottom/top gradients into a single 1080x1920 RGBA
+        plate so the render graph does one overlay instead of three full-frame blends.
+        Honors `tint.enabled` / `tint.opacity` and `gradient.enabled`; returns None when
+        the template disables every static layer.
+        """
+        tint = template.get('tint', {})
+        tint_opacity = float(tint.get('opacity', TINT_OPACITY)) if tint.get('enabled', True) else 0.0
+        gradient = template.get('gradient', {})
+        gradient_enabled = gradient.get('enabled', True)
+        if not tint_opacity and not gradient_enabled:
+            return None
+
+        assets_dir = base_dir / "assets"
+        gradient_bottom = assets_dir / gradient.get('file', "overlays/gradient-bottom.png")
+        gradient_top = assets_dir / "overlays/gradient-top.png"
+        gradient_stamps = [_file_stamp(gradient_bottom), _file_stamp(gradient_top)] if gradient_enabled else []
+
+        key = self._key("plate", gradient, tint_opacity, theme_color.upper(), gradient_stamps)
+        plate_path = self.cache_dir / f"plate_{key}.png"
+        if plate_path.exists():
+            return plate_path
+
+        with self._lock:
+            if plate_path.exists():
+                return plate_path
+            logger.info(f"Compiling overlay plate for theme {theme_color} -> {plate_path.name}")
+
+            r, g, b = _hex_to_rgb(theme_color)
+            plate = Image.new("RGBA", FRAME_SIZE, (r, g, b, round(255 * tint_opacity)))
+
+            if gradient_enabled:
+                with Image.open(gradient_bottom) as grad_b:
+                    grad_b = grad_b.convert("RGBA")
+                    plate.alpha_composite(grad_b, (0, FRAME_SIZE[1] - grad_b.height))
+                with Image.open(gradient_top) as grad_t:
+                    grad_t = grad_t.convert("RGBA")
+                    plate.alpha_composite(grad_t, (FRAME_SIZE[0] - grad_t.width, 0))
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = _tmp_path(plate_path)
+            try:
+                plate.save(tmp_path)
+                tmp_path.replace(plate_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+        return plate_path
+
+    def keyed_overlay(self, source_path: Path, pix_fmt: str = "yuva420p") -> Path:
+        """
+        Decodes an intro/outro animation once, applies the black colorkey, converts it to
+        the render pixel format and trims it to its probed length. The result is stored as
+        lossless HuffYUV (ffvhuff), which is far cheaper to decode than VP9, so jobs
+        overlay it directly without any per-frame keying.
+        """
+        from app.services.media_probe import get_media_probe
+
+        key = self._key("keyed", _file_stamp(source_path), pix_fmt, OVERLAY_COLORKEY)
+        keyed_path = self.cache_dir / f"{source_path.stem}_{key}.mkv"
+        if keyed_path.exists():
+            return keyed_path
+
+        with self._lock:
+            if keyed_path.exists():
+                return keyed_path
+            duration = get_media_probe().get_duration(source_path)
+            logger.info(f"Pre-keying {source_path.name} ({duration:.2f}s) -> {keyed_path.name}")
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = _tmp_path(keyed_path)
+            cmd = [
+                "ffmpeg", "-y", "-v", "error",
+                "-i", str(source_path),
+                "-t", str(duration),
+                "-vf", f"format=rgba,colorkey={OVERLAY_COLORKEY},format={pix_fmt}",
+                "-an",
+                "-c:v", "ffvhuff",
+                str(tmp_path)
+            ]
+            try:
+                subprocess.run(cmd, check=True, capture_output=True)
+                tmp_path.replace(keyed_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+        return keyed_path
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_asset_cache() -> AssetCache:
+    """Process-wide asset cache under data/cache/assets."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = AssetCache()
+    return _default_cache
@@ -0,0 +1,153 @@
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Iterable
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+class ServiceContainer:
+    """
+    Lazily built, reused service instances. A service is constructed on first use and kept
+    until something it was built from changes: settings.json, the environment variables
+    (secrets) it reads, or other watched files (theme.css). `.env` is re-read when the
+    settings drawer rewrites it, so workers pick up new API keys without a restart.
+    """
+
+    def __init__(self, base_dir: Path = BASE_DIR):
+        self.base_dir = Path(base_dir)
+        self.settings_path = self.base_dir / "settings.json"
+        self.env_path = self.base_dir / ".env"
+        # name -> (factory, env keys, watched files)
+        self._factories = {}
+        # name -> (signature, instance)
+        self._instances = {}
+        self._env_mtime = self._mtime(self.env_path)
+        self._lock = threading.RLock()
+        # Per-service locks so a slow constructor doesn't block the others
+        self._build_locks = {}
+
+    @staticmethod
+    def _mtime(path: Path):
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def register(self, name: str, factory: Callable, env: Iterable[str] = (), settings: bool = False, files: Iterable[Path] = ()):
+        """`factory(base_dir)` builds the service; it is rebuilt when `env` values, settings.json (if `settings`) or `files` change."""
+        with self._lock:
+            watched = tuple(files) + ((self.settings_path,) if settings else ())
+            self._factories[name] = (factory, tuple(env), watched)
+            self._build_locks[name] = threading.Lock()
+            self._instances.pop(name, None)
+
+    def _refresh_env(self):
+        mtime = self._mtime(self.env_path)
+        if mtime != self._env_mtime:
+            self._env_mtime = mtime
+            if mtime is not None:
+                load_dotenv(self.env_path, override=True)
+                logger.info("Reloaded .env")
+
+    def _signature(self, name: str):
+        _, env, files = self._factories[name]
+        return tuple(os.getenv(key) for key in env), tuple(self._mtime(path) for path in files)
+
+    def get(self, name: str):
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Unknown service '{name}'")
+            self._refresh_env()
+            signature = self._signature(name)
+            cached = self._instances.get(name)
+            if cached and cached[0] == signature:
+                return cached[1]
+        with self._build_locks[name]:
+            with self._lock:
+                cached = self._instances.get(name)
+                if cached and cached[0] == signature:
+                    return cached[1]
+            if cached:
+                logger.info(f"Rebuilding service '{name}' (settings or secrets changed)")
+            instance = self._factories[name][0](self.base_dir)
+            with self._lock:
+                self._instances[name] = (signature, instance)
+            return instance
+
+    def invalidate(self, name: str = None):
+        """Drops one (or every) built service; the next get() rebuilds it."""
+        with self._lock:
+            if name:
+                self._instances.pop(name, None)
+            else:
+                self._instances.clear()
+
+    def built(self) -> list:
+        with self._lock:
+            return sorted(self._instances)
+
+
+def _llm(base_dir: Path):
+    from app.services.llm import GeminiService
+    return GeminiService()
+
+
+def _tts(base_dir: Path):
+    from app.services.tts import ElevenLabsService
+    return ElevenLabsService()
+
+
+def _stt(base_dir: Path):
+    # Cheap handle; the model itself lives in the shared Whisper pool
+    from app.services.stt import WhisperService
+    try:
+        with open(base_dir / "settings.json", "r") as f:
+            settings = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        settings = {}
+    return WhisperService.from_settings(settings)
+
+
+def _downloader(base_dir: Path):
+    from app.services.downloader import YTDownloader
+    return YTDownloader(cookies_path=base_dir / "cookies.txt")
+
+
+def _processor(base_dir: Path):
+    from app.services.video_processor_ffmpeg import VideoProcessorFFmpeg
+    return VideoProcessorFFmpeg()
+
+
+def _theme_color(base_dir: Path):
+    from app.utils.theme_parser import get_theme_color
+    color = get_theme_color(base_dir.parent / "packages" / "brand" / "theme.css")
+    print(f"🎨 Theme Color: {color}")
+    return color
+
+
+_default_container = None
+_default_container_lock = threading.Lock()
+
+
+def get_services() -> ServiceContainer:
+    """Process-wide container with the pipeline services registered."""
+    global _default_container
+    if _default_container is None:
+        with _default_container_lock:
+            if _default_container is None:
+                container = ServiceContainer()
+                container.register("llm", _llm, env=["GOOGLE_API_KEY"], settings=True)
+                container.register("tts", _tts, env=["ELEVENLABS_API_KEY", "ELEVENLABS_API_KEY_BACKUP", "ELEVENLABS_BASE_URL"], settings=True)
+                container.register("stt", _stt, settings=True)
+                container.register("downloader", _downloader)
+                container.register("processor", _processor)
+                container.register("theme_color", _theme_color, files=[BASE_DIR.parent / "packages" / "brand" / "theme.css"])
+                _default_container = container
+    return _default_container
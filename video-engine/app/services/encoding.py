@@ -0,0 +1,97 @@
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Built-in x264 tiers. settings.json can override fields or add profiles via "encoding_profiles".
+#   preset/tune  - x264 speed/quality trade-off (tune None = x264 default)
+#   crf          - constant quality target
+#   maxrate      - optional VBV cap so busy sources can't blow up the file size
+#   threads      - x264 threads (0 = auto)
+#   gop_seconds  - keyframe interval; segmented renders cut on these boundaries
+ENCODING_PROFILES = {
+    "draft": {
+        "preset": "ultrafast",
+        "crf": 26,
+        "maxrate": None,
+        "bufsize": None,
+        "threads": 0,
+        "tune": "fastdecode",
+        "gop_seconds": 2.0,
+    },
+    "standard": {
+        "preset": "veryfast",
+        "crf": 23,
+        "maxrate": "6M",
+        "bufsize": "12M",
+        "threads": 0,
+        "tune": None,
+        "gop_seconds": 2.0,
+    },
+    "archive": {
+        "preset": "slow",
+        "crf": 20,
+        "maxrate": "10M",
+        "bufsize": "20M",
+        "threads": 0,
+        "tune": "film",
+        "gop_seconds": 4.0,
+    },
+}
+
+DEFAULT_PROFILE = "standard"
+
+
+def profile_names(settings: Optional[dict] = None) -> list:
+    return list({**ENCODING_PROFILES, **(settings or {}).get("encoding_profiles", {})})
+
+
+def resolve_profile(name: Optional[str] = None, settings: Optional[dict] = None, template: Optional[dict] = None) -> dict:
+    """
+    Returns the encoding profile for a job. The name is resolved as
+    explicit name > template `encoding.profile` > settings `encoding_profile` > "standard",
+    and settings `encoding_profiles` entries are layered over the built-in ones.
+    """
+    settings = settings or {}
+    name = (
+        name
+        or (template or {}).get("encoding", {}).get("profile")
+        or settings.get("encoding_profile")
+        or DEFAULT_PROFILE
+    )
+    overrides = settings.get("encoding_profiles", {})
+    if name not in ENCODING_PROFILES and name not in overrides:
+        logger.warning(f"Unknown encoding profile '{name}', falling back to '{DEFAULT_PROFILE}'")
+        name = DEFAULT_PROFILE
+
+    profile = {**ENCODING_PROFILES.get(name, ENCODING_PROFILES[DEFAULT_PROFILE]), **overrides.get(name, {})}
+    profile["name"] = name
+    return profile
+
+
+def x264_args(profile: Optional[dict] = None, fps: float = 30.0, threads: Optional[int] = None, fixed_gop: bool = False) -> list:
+    """
+    FFmpeg video encoder arguments for a profile. `threads` overrides the profile (segmented
+    renders split the cores between chunks); `fixed_gop` disables scene-cut keyframes so
+    chunk boundaries land exactly on GOP boundaries.
+    """
+    profile = profile or resolve_profile()
+    gop_frames = max(1, round(profile["gop_seconds"] * (fps or 30.0)))
+
+    args = [
+        "-c:v", "libx264",
+        "-pix_fmt", "yuv420p",
+        "-preset", profile["preset"],
+        "-crf", str(profile["crf"]),
+    ]
+    if profile.get("tune"):
+        args += ["-tune", profile["tune"]]
+    if profile.get("maxrate"):
+        args += ["-maxrate", str(profile["maxrate"]), "-bufsize", str(profile.get("bufsize") or profile["maxrate"])]
+    args += ["-g", str(gop_frames)]
+    if fixed_gop:
+        args += ["-keyint_min", str(gop_frames), "-sc_threshold", "0"]
+    thread_count = profile.get("threads", 0) if threads is None else threads
+    if thread_count:
+        args += ["-threads", str(thread_count)]
+    return args
@@ -0,0 +1,57 @@
+import logging
+from typing import Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 15
+
+
+class RemoteQueue:
+    """
+    The render queue as seen from a farm worker: the RenderQueue methods a WorkerPool uses,
+    forwarded to the coordinator's /api/farm endpoints. Lease expiry is handled by the
+    coordinator, so requeue_stale is a no-op here.
+    """
+
+    def __init__(self, coordinator_url: str, token: Optional[str] = None):
+        self.base_url = coordinator_url.rstrip("/") + "/api/farm"
+        self.session = requests.Session()
+        if token:
+            self.session.headers["X-Farm-Token"] = token
+
+    def _post(self, path: str, body: dict) -> dict:
+        response = self.session.post(f"{self.base_url}{path}", json=body, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def register(self, name: str, host: str, slots: int, targets: Optional[list] = None) -> dict:
+        return self._post("/workers", {"name": name, "host": host, "slots": slots, "targets": targets})
+
+    def requeue_stale(self, timeout: Optional[float] = None) -> int:
+        return 0
+
+    def claim(self, worker: str, targets: Optional[list] = None) -> Optional[dict]:
+        return self._post("/lease", {"worker": worker, "targets": targets})["job"]
+
+    def heartbeat(self, queue_id: int, stage: Optional[str] = None, progress: Optional[float] = None, telemetry: Optional[dict] = None, worker: Optional[str] = None) -> bool:
+        try:
+            body = {"worker": worker, "stage": stage, "progress": progress, "telemetry": telemetry}
+            return self._post(f"/jobs/{queue_id}/heartbeat", body)["stop"]
+        except requests.RequestException as e:
+            # A missed heartbeat is not fatal; the lease only expires after HEARTBEAT_TIMEOUT
+            logger.warning(f"Heartbeat for queue entry {queue_id} failed: {e}")
+            return False
+
+    def complete(self, queue_id: int, result: Optional[dict] = None, worker: Optional[str] = None) -> bool:
+        return self._post(f"/jobs/{queue_id}/complete", {"worker": worker, "result": result})["accepted"]
+
+    def fail(self, queue_id: int, error: str, worker: Optional[str] = None) -> bool:
+        return self._post(f"/jobs/{queue_id}/fail", {"worker": worker, "error": error})["accepted"]
+
+    def mark_cancelled(self, queue_id: int, worker: Optional[str] = None) -> bool:
+        return self._post(f"/jobs/{queue_id}/cancelled", {"worker": worker})["accepted"]
+
+    def release(self, queue_id: int, worker: Optional[str] = None) -> bool:
+        return self._post(f"/jobs/{queue_id}/release", {"worker": worker})["accepted"]
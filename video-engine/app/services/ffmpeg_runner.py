@@ -0,0 +1,328 @@
+import os
+import json
+import time
+import signal
+import asyncio
+import logging
+import threading
+import subprocess
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.services.jobs import JobCancelled, current_job
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_STATS_PATH = BASE_DIR / "data" / "render_stats.jsonl"
+
+# Lines of stderr kept for error reports (the progress data itself comes over stdout)
+STDERR_TAIL = 40
+# Seconds FFmpeg gets to exit after SIGTERM (it finalizes the container) before it is killed
+KILL_GRACE = 5.0
+
+# Job-level consumer of progress events (set by the UI / worker around a pipeline run)
+_progress_listener: ContextVar[Optional[Callable[[dict], None]]] = ContextVar("ffmpeg_progress_listener", default=None)
+
+
+@contextmanager
+def progress_listener(callback: Callable[[dict], None]):
+    """Routes every FFmpeg progress event emitted in this context (asyncio.to_thread copies it) to `callback`."""
+    token = _progress_listener.set(callback)
+    try:
+        yield
+    finally:
+        _progress_listener.reset(token)
+
+
+def current_listener() -> Optional[Callable[[dict], None]]:
+    return _progress_listener.get()
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(str(value).rstrip("x")) if value not in (None, "", "N/A") else None
+    except ValueError:
+        return None
+
+
+def parse_progress_block(block: dict, duration: float, started: float, stage: str) -> dict:
+    """Turns one `-progress` key/value block into a progress event."""
+    out_time_us = _to_float(block.get("out_time_us")) or _to_float(block.get("out_time_ms"))
+    out_time = max(0.0, (out_time_us or 0.0) / 1_000_000)
+    speed = _to_float(block.get("speed"))
+    fraction = min(1.0, out_time / duration) if duration > 0 else 0.0
+    done = block.get("progress") == "end"
+
+    eta = None
+    if done:
+        eta = 0.0
+    elif duration > 0 and speed:
+        eta = max(0.0, (duration - out_time) / speed)
+    elif fraction > 0:
+        elapsed = time.monotonic() - started
+        eta = elapsed * (1 - fraction) / fraction
+
+    return {
+        "stage": stage,
+        "out_time": round(out_time, 3),
+        "duration": duration,
+        "progress": 1.0 if done else fraction,
+        "frame": int(_to_float(block.get("frame")) or 0),
+        "fps": _to_float(block.get("fps")),
+        "speed": speed,
+        "bitrate": block.get("bitrate") if block.get("bitrate") not in (None, "N/A") else None,
+        "total_size": int(_to_float(block.get("total_size")) or 0),
+        "eta": round(eta, 1) if eta is not None else None,
+        "done": done,
+    }
+
+
+def record_throughput(summary: dict, stats_path: Path = DEFAULT_STATS_PATH):
+    """Appends a per-stage throughput record (fps, x-realtime) to data/render_stats.jsonl."""
+    try:
+        stats_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(stats_path, "a") as f:
+            f.write(json.dumps(summary) + "\n")
+    except Exception as e:
+        logger.warning(f"Failed to record render stats: {e}")
+
+
+class _ProgressReader:
+    """Accumulates `-progress` key/value lines and fans each finished block out as an event."""
+
+    def __init__(self, duration: float, stage: str, callbacks: list):
+        self.duration = duration
+        self.stage = stage
+        self.callbacks = [cb for cb in callbacks if cb]
+        self.started = time.monotonic()
+        self.block = {}
+        self.last_event = None
+
+    def feed(self, line: str):
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return
+        self.block[key] = value
+        if key == "progress":
+            self.last_event = parse_progress_block(self.block, self.duration, self.started, self.stage)
+            for callback in self.callbacks:
+                try:
+                    callback(self.last_event)
+                except Exception as e:
+                    logger.warning(f"Progress callback failed: {e}")
+            self.block = {}
+
+    def summary(self, record: bool) -> dict:
+        wall = time.monotonic() - self.started
+        media_time = (self.last_event or {}).get("out_time") or self.duration
+        frames = (self.last_event or {}).get("frame", 0)
+        summary = {
+            "stage": self.stage,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "wall": round(wall, 3),
+            "media_duration": round(media_time, 3),
+            "frames": frames,
+            "fps": round(frames / wall, 2) if wall > 0 else None,
+            "realtime": round(media_time / wall, 3) if wall > 0 else None,
+        }
+        logger.info(f"FFmpeg stage '{self.stage}': {summary['fps']} fps, {summary['realtime']}x realtime in {wall:.1f}s")
+        if record:
+            record_throughput(summary)
+        return summary
+
+
+def _with_progress_args(cmd: list) -> list:
+    # -stats output on stderr is redundant once the machine-readable pipe is enabled
+    args = [arg for arg in cmd[1:] if arg != "-stats"]
+    return [cmd[0], "-progress", "pipe:1", "-nostats", *args]
+
+
+def _signal_group(pid: int, sig) -> bool:
+    """Signals the process group led by `pid` (runners start every child in its own session)."""
+    try:
+        os.killpg(pid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+@contextmanager
+def _job_process(pid: int):
+    """Attaches a child process to the current job so a cancel request can signal its group."""
+    job = current_job()
+    if job:
+        job.add_process(pid)
+    try:
+        yield job
+    finally:
+        if job:
+            job.remove_process(pid)
+
+
+def _check_cancelled():
+    job = current_job()
+    if job:
+        job.raise_if_cancelled()
+
+
+class FFmpegRunner:
+    """
+    Runs FFmpeg with `-progress pipe:1` and turns its key/value output into structured
+    progress events (out_time, fps, speed, frame, bitrate, ETA). stderr is drained on a
+    separate thread and only its tail is kept for error messages.
+    """
+
+    @staticmethod
+    def run(
+        cmd: list,
+        duration: float = 0.0,
+        on_event: Optional[Callable[[dict], None]] = None,
+        stage: str = "ffmpeg",
+        record: bool = True,
+        forward: bool = True
+    ) -> dict:
+        """
+        Runs `cmd` to completion, calling `on_event` (and, if `forward`, the context progress
+        listener) for every progress block. Returns a throughput summary; raises
+        CalledProcessError with the stderr tail on failure.
+        """
+        _check_cancelled()
+        listener = _progress_listener.get() if forward else None
+        reader = _ProgressReader(duration, stage, [on_event, listener])
+        process = subprocess.Popen(
+            _with_progress_args(cmd),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            universal_newlines=True,
+            bufsize=1,
+            start_new_session=True
+        )
+
+        stderr_tail = deque(maxlen=STDERR_TAIL)
+        drain = threading.Thread(target=lambda: stderr_tail.extend(process.stderr), daemon=True)
+        drain.start()
+
+        with _job_process(process.pid) as job:
+            for line in process.stdout:
+                reader.feed(line)
+            process.wait()
+        drain.join(timeout=5)
+        if job and job.cancelled:
+            raise JobCancelled(f"FFmpeg stage '{stage}' cancelled with job {job.job_id}")
+        if process.returncode != 0:
+            stderr = "".join(stderr_tail)
+            logger.error(f"FFmpeg stage '{stage}' failed ({process.returncode}): {stderr.strip()[-2000:]}")
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr)
+        return reader.summary(record)
+
+
+class AsyncFFmpegRunner:
+    """
+    asyncio-native counterpart of FFmpegRunner (asyncio.create_subprocess_exec), so a render
+    awaits its process instead of parking an executor thread on a blocking pipe read.
+    Cancelling the awaiting task, or exceeding `timeout`, terminates FFmpeg's process group
+    (SIGTERM, then SIGKILL after `grace` seconds).
+    """
+
+    @staticmethod
+    async def _stop(process: asyncio.subprocess.Process, grace: float = KILL_GRACE):
+        if process.returncode is not None:
+            return
+        if not _signal_group(process.pid, signal.SIGTERM):
+            return
+        try:
+            await asyncio.wait_for(process.wait(), grace)
+        except asyncio.TimeoutError:
+            logger.warning(f"FFmpeg (pid {process.pid}) ignored SIGTERM for {grace}s, killing its process group")
+            _signal_group(process.pid, signal.SIGKILL)
+            await process.wait()
+
+    @staticmethod
+    async def _drain(stream: asyncio.StreamReader, sink):
+        async for line in stream:
+            sink(line.decode("utf-8", errors="replace"))
+
+    @staticmethod
+    async def _supervise(process, work, timeout: Optional[float], grace: float, stage: str):
+        """Awaits `work` (the pipe readers); stops the process on timeout or cancellation."""
+        try:
+            await asyncio.wait_for(work, timeout)
+            await process.wait()
+        except asyncio.TimeoutError:
+            await AsyncFFmpegRunner._stop(process, grace)
+            raise TimeoutError(f"FFmpeg stage '{stage}' exceeded its {timeout:g}s timeout")
+        except asyncio.CancelledError:
+            logger.info(f"FFmpeg stage '{stage}' cancelled, stopping pid {process.pid}")
+            await asyncio.shield(AsyncFFmpegRunner._stop(process, grace))
+            raise
+
+    @staticmethod
+    async def run(
+        cmd: list,
+        duration: float = 0.0,
+        on_event: Optional[Callable[[dict], None]] = None,
+        stage: str = "ffmpeg",
+        record: bool = True,
+        forward: bool = True,
+        timeout: Optional[float] = None,
+        grace: float = KILL_GRACE
+    ) -> dict:
+        """Async FFmpegRunner.run with timeout and cancellation support."""
+        _check_cancelled()
+        listener = _progress_listener.get() if forward else None
+        reader = _ProgressReader(duration, stage, [on_event, listener])
+        process = await asyncio.create_subprocess_exec(
+            *_with_progress_args(cmd),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            stdin=asyncio.subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+        stderr_tail = deque(maxlen=STDERR_TAIL)
+        work = asyncio.gather(
+            AsyncFFmpegRunner._drain(process.stdout, reader.feed),
+            AsyncFFmpegRunner._drain(process.stderr, stderr_tail.append),
+        )
+        with _job_process(process.pid) as job:
+            await AsyncFFmpegRunner._supervise(process, work, timeout, grace, stage)
+
+        if job and job.cancelled:
+            raise JobCancelled(f"FFmpeg stage '{stage}' cancelled with job {job.job_id}")
+        if process.returncode != 0:
+            stderr = "".join(stderr_tail)
+            logger.error(f"FFmpeg stage '{stage}' failed ({process.returncode}): {stderr.strip()[-2000:]}")
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr)
+        return reader.summary(record)
+
+    @staticmethod
+    async def run_capture(cmd: list, timeout: Optional[float] = None, grace: float = KILL_GRACE) -> str:
+        """Runs a short command (ffprobe, stream-copy trims) and returns its stdout."""
+        _check_cancelled()
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            stdin=asyncio.subprocess.DEVNULL,
+            start_new_session=True
+        )
+        out, err = [], []
+        work = asyncio.gather(
+            AsyncFFmpegRunner._drain(process.stdout, out.append),
+            AsyncFFmpegRunner._drain(process.stderr, err.append),
+        )
+        stage = Path(cmd[0]).name
+        with _job_process(process.pid) as job:
+            await AsyncFFmpegRunner._supervise(process, work, timeout, grace, stage)
+
+        if job and job.cancelled:
+            raise JobCancelled(f"FFmpeg stage '{stage}' cancelled with job {job.job_id}")
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, output="".join(out), stderr="".join(err))
+        return "".join(out)
@@ -0,0 +1,189 @@
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+from app.services.asset_cache import get_asset_cache
+from app.services.media_probe import get_media_probe
+
+logger = logging.getLogger(__name__)
+
+# The logo fades in this long after the start and out this long before the end; shorter
+# clips pull both towards the middle so the fades don't overlap
+LOGO_FADE_OFFSET = 5.0
+LOGO_FADE_DURATION = 1.0
+
+# The base video stays planar YUV end to end (libass, fade and overlay all work on it);
+# alpha only exists on the overlay inputs, and overlay blends them straight into yuv420.
+RENDER_PIX_FMT = "yuv420p"
+OVERLAY_BLEND_FMT = "yuv420"
+
+# Pixel format each layer is prepared in before it is blended onto the base video
+LAYER_PIX_FMTS = {
+    "base": RENDER_PIX_FMT,
+    "plate": "yuva420p",  # static PNG (tint + gradients), converted once since it is a single frame
+    "intro": "yuva420p",  # pre-keyed in AssetCache.keyed_overlay
+    "outro": "yuva420p",
+    "logo": "yuva420p",   # alpha fades need an alpha plane, not full RGBA
+}
+
+# Legacy layout: the whole frame is converted to RGBA, blended, then converted back on encode
+RGBA_LAYER_PIX_FMTS = {**LAYER_PIX_FMTS, "base": "rgba", "plate": "rgba", "logo": "rgba"}
+
+
+def template_hash(template: dict, theme_color: str) -> str:
+    """Stable hash of the template subtree and theme that shape the VFX graph."""
+    blob = json.dumps({"template": template, "theme": theme_color.upper()}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def _logo_width(template: dict) -> int:
+    logo_width_config = template['logo'].get('width', '30%')
+    if isinstance(logo_width_config, str) and logo_width_config.endswith('%'):
+        multiplier = float(logo_width_config.strip('%')) / 100.0
+        return int(1080 * multiplier)
+    try:
+        return int(logo_width_config)
+    except:
+        return 324
+
+
+def _enabled(template: dict, layer: str) -> bool:
+    return bool(template.get(layer, {}).get('enabled', True))
+
+
+class VfxGraph:
+    """
+    A compiled VFX graph for one template/theme, shared by clips of any length: everything
+    that depends on the clip's duration is filled in by build().
+    `layers` is the ordered list of layers that survived compilation; overlay inputs are
+    appended by the caller (via input_args) right after its own inputs.
+    """
+
+    def __init__(self, layers: list, overlay_inputs: list, fonts_dir: Path, params: dict, pix_fmts: dict = LAYER_PIX_FMTS):
+        self.layers = layers
+        self.overlay_inputs = overlay_inputs  # [(layer, path)]
+        self.fonts_dir = fonts_dir
+        self.params = params
+        self.pix_fmts = pix_fmts
+        self.blend_fmt = "rgb" if pix_fmts["base"] == "rgba" else OVERLAY_BLEND_FMT
+
+    def input_args(self) -> list:
+        args = []
+        for _, path in self.overlay_inputs:
+            args += ["-i", str(path)]
+        return args
+
+    def build(self, base_label: str, first_input: int, duration: float, ass_path: Optional[Path] = None) -> str:
+        """Returns the filter chain from [base_label] to [v_final] for a clip of `duration` seconds."""
+        def esc(p): return str(p).replace("\\", "/").replace(":", "\\:")
+
+        idx = {layer: first_input + i for i, (layer, _) in enumerate(self.overlay_inputs)}
+        parts = []
+        current = base_label
+
+        def chain(expr: str, label: str):
+            nonlocal current
+            parts.append(f"[{current}]{expr}[{label}]")
+            current = label
+
+        def overlay(layer_input: str, label: str, options: str):
+            nonlocal current
+            parts.append(f"[{current}][{layer_input}]overlay={options}:format={self.blend_fmt}[{label}]")
+            current = label
+
+        chain(f"format={self.pix_fmts['base']}", "v0")
+        if "text" in self.layers and ass_path is not None:
+            chain(f"ass='{esc(ass_path)}':fontsdir='{esc(self.fonts_dir)}'", "v_sub")
+        if "plate" in self.layers:
+            parts.append(f"[{idx['plate']}:v]format={self.pix_fmts['plate']}[plate_s]")
+            overlay("plate_s", "v_plate", "0:0")
+
+        fade_start_t = max(0, duration - 4.0)
+        chain(f"fade=t=out:st={fade_start_t}:d=4:color=black", "v_faded")
+
+        if "intro" in self.layers:
+            intro_end = self.params["intro_duration"]
+            overlay(f"{idx['intro']}:v", "v_intro", f"0:0:enable='between(t,0,{intro_end})'")
+        if "outro" in self.layers:
+            outro_start = max(0, duration - self.params["outro_duration"])
+            overlay(f"{idx['outro']}:v", "v_outro", f"0:0:enable='between(t,{outro_start},{duration})'")
+        if "logo" in self.layers:
+            # Scale and convert the still once, then loop the prepared frame
+            logo_chain = (
+                f"[{idx['logo']}:v]scale={self.params['logo_width']}:-1,format={self.pix_fmts['logo']},"
+                f"loop=loop=-1:size=1:start=0"
+            )
+            fade_dur = LOGO_FADE_DURATION
+            fade_in = min(LOGO_FADE_OFFSET, max(0.0, duration / 2 - fade_dur))
+            fade_out = max(fade_in + fade_dur, duration - LOGO_FADE_OFFSET)
+            logo_chain += (
+                f",fade=in:st={fade_in}:d={fade_dur}:alpha=1"
+                f",fade=out:st={fade_out}:d={fade_dur}:alpha=1"
+            )
+            parts.append(logo_chain + "[logo_s]")
+            overlay("logo_s", "v_logo", f"W-w-{self.params['logo_margin_right']}:{self.params['logo_margin_top']}:shortest=1")
+
+        # Rename the last label to the stable output name
+        last = parts[-1]
+        parts[-1] = last[:last.rindex("[")] + "[v_final]"
+        return ";".join(parts)
+
+
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+
+def compile_vfx_graph(template: dict, base_dir: Path, theme_color: str, rgba: bool = False) -> VfxGraph:
+    """
+    Compiles a template into the minimal VFX graph: disabled layers are dropped (no input is
+    opened for them), the tint and gradients are merged into one pre-baked plate and each layer
+    gets its own pixel format. Memoized per template hash.
+    `rgba=True` builds the legacy full-frame RGBA graph (kept for benchmarking).
+    """
+    key = (template_hash(template, theme_color), str(base_dir), rgba)
+    graph = _graphs.get(key)
+    if graph is not None:
+        return graph
+
+    with _graphs_lock:
+        graph = _graphs.get(key)
+        if graph is not None:
+            return graph
+
+        assets_dir = base_dir / "assets"
+        cache = get_asset_cache()
+        probe = get_media_probe()
+        pix_fmts = RGBA_LAYER_PIX_FMTS if rgba else LAYER_PIX_FMTS
+        layers, overlay_inputs = [], []
+        params = {}
+
+        if _enabled(template, 'text'):
+            layers.append("text")
+
+        # Adjacent static layers (tint + gradients) collapse into a single overlay
+        plate = cache.overlay_plate(template, theme_color, base_dir)
+        if plate is not None:
+            layers.append("plate")
+            overlay_inputs.append(("plate", plate))
+
+        for layer in ("intro", "outro"):
+            if _enabled(template, layer):
+                source = assets_dir / template[layer]['file']
+                layers.append(layer)
+                overlay_inputs.append((layer, cache.keyed_overlay(source, pix_fmts[layer])))
+                params[f"{layer}_duration"] = probe.get_duration(source)
+
+        if _enabled(template, 'logo'):
+            layers.append("logo")
+            overlay_inputs.append(("logo", assets_dir / template['logo']['file']))
+            params["logo_width"] = _logo_width(template)
+            params["logo_margin_right"] = template['logo'].get('margin_right', 60)
+            params["logo_margin_top"] = template['logo'].get('margin_top', 60)
+
+        graph = VfxGraph(layers, overlay_inputs, assets_dir / "fonts", params, pix_fmts)
+        _graphs[key] = graph
+        logger.info(f"Compiled VFX graph {key[0]}: {', '.join(layers) or 'no layers'}")
+        return graph
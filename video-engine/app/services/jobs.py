@@ -0,0 +1,163 @@
+import os
+import signal
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds a process group gets after SIGTERM before it is SIGKILLed
+KILL_GRACE = 5.0
+
+
+class JobCancelled(Exception):
+    """Raised when work is started (or continued) for a job that has been cancelled."""
+
+
+class JobHandle:
+    """
+    Live control block for a running job: the asyncio task driving it and the process
+    groups of its FFmpeg children. Runners register their processes here (every FFmpeg is
+    started in its own session, so pid == pgid) and cancel() signals them.
+    """
+
+    def __init__(self, job_id: str, task: Optional[asyncio.Task] = None):
+        self.job_id = job_id
+        self.task = task
+        self.loop = task.get_loop() if task else None
+        self.cancelled = False
+        self._token = None
+        self._pgids = set()
+        self._lock = threading.Lock()
+
+    def add_process(self, pgid: int):
+        with self._lock:
+            self._pgids.add(pgid)
+            cancelled = self.cancelled
+        if cancelled:
+            # Started after cancel() was issued: stop it right away
+            self._signal(pgid, signal.SIGTERM)
+
+    def remove_process(self, pgid: int):
+        with self._lock:
+            self._pgids.discard(pgid)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+    @staticmethod
+    def _signal(pgid: int, sig):
+        try:
+            os.killpg(pgid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def cancel(self, grace: float = KILL_GRACE):
+        """Signals every registered process group (TERM, then KILL after `grace`), or cancels the idle task."""
+        with self._lock:
+            self.cancelled = True
+            pgids = list(self._pgids)
+
+        for pgid in pgids:
+            logger.info(f"Cancelling job {self.job_id}: SIGTERM to process group {pgid}")
+            self._signal(pgid, signal.SIGTERM)
+
+        def escalate():
+            with self._lock:
+                remaining = [pgid for pgid in pgids if pgid in self._pgids]
+            for pgid in remaining:
+                logger.warning(f"Process group {pgid} still alive after {grace}s, sending SIGKILL")
+                self._signal(pgid, signal.SIGKILL)
+
+        if pgids:
+            timer = threading.Timer(grace, escalate)
+            timer.daemon = True
+            timer.start()
+
+        # With FFmpeg running, the killed process makes its runner raise JobCancelled. Otherwise
+        # the task is awaiting other work (TTS, transcription threads) and is cancelled directly.
+        if not pgids and self.task and not self.task.done():
+            self.loop.call_soon_threadsafe(self.task.cancel)
+
+
+_current_job: ContextVar[Optional[JobHandle]] = ContextVar("current_job", default=None)
+
+
+def current_job() -> Optional[JobHandle]:
+    return _current_job.get()
+
+
+class JobRegistry:
+    """Process-wide map of running jobs, used by the UI and the cancel API."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, job_id: str) -> JobHandle:
+        """
+        Registers the calling asyncio task as job `job_id` and makes it the current job, so
+        FFmpeg processes started from it (including asyncio.to_thread workers) attach to it.
+        Pair with finish().
+        """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        handle = JobHandle(job_id, task)
+        handle._token = _current_job.set(handle)
+        with self._lock:
+            self._jobs[job_id] = handle
+        return handle
+
+    def finish(self, handle: JobHandle):
+        with self._lock:
+            if self._jobs.get(handle.job_id) is handle:
+                del self._jobs[handle.job_id]
+        _current_job.reset(handle._token)
+
+    @contextmanager
+    def running(self, job_id: str):
+        handle = self.start(job_id)
+        try:
+            yield handle
+        finally:
+            self.finish(handle)
+
+    def is_running(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._jobs
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            handle = self._jobs.get(job_id)
+        if not handle:
+            return False
+        handle.cancel()
+        return True
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_job_registry() -> JobRegistry:
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = JobRegistry()
+    return _default_registry
+
+
+def cancel_job(job_id: str) -> bool:
+    """Cancels a job wherever it is: running in this process, waiting in the queue, or on a worker."""
+    from app.services.render_queue import get_render_queue
+
+    local = get_job_registry().cancel(job_id)
+    queued = get_render_queue().cancel(job_id)
+    return local or queued
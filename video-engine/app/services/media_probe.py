@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_INDEX_PATH = BASE_DIR / "data" / "probe_cache.json"
+
+
+def _parse_rate(rate: Optional[str]) -> float:
+    """Convert an ffprobe frame rate like '30000/1001' to float."""
+    try:
+        num, _, den = (rate or "0/1").partition("/")
+        den = float(den or 1)
+        return float(num) / den if den else 0.0
+    except ValueError:
+        return 0.0
+
+
+class MediaProbe:
+    """
+    ffprobe metadata service with a content-keyed cache.
+    Results are keyed by (path, size, mtime) and kept in memory and in a small JSON index,
+    so static assets (intro/outro, music) are probed once per deployment. Over MAX_ENTRIES,
+    entries for deleted files go first, then the least recently used ones.
+    """
+    MAX_ENTRIES = 500
+    # A hit re-persists its `last_used` stamp at most this often (seconds)
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, index_path: Path = DEFAULT_INDEX_PATH):
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._entries = self._load_index()
+
+    def _load_index(self) -> dict:
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, "r") as f:
+                    return json.load(f)
+            except Exception:
+                logger.warning(f"Probe index {self.index_path.name} is unreadable, starting fresh.")
+        return {}
+
+    def _save_index(self):
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            if len(self._entries) > self.MAX_ENTRIES:
+                self._entries = {key: entry for key, entry in self._entries.items() if os.path.exists(key)}
+            if len(self._entries) > self.MAX_ENTRIES:
+                recent = sorted(self._entries.items(), key=lambda kv: kv[1].get("last_used", 0), reverse=True)
+                self._entries = dict(recent[:self.MAX_ENTRIES])
+            tmp_path = self.index_path.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            logger.warning(f"Failed to persist probe index: {e}")
+
+    @staticmethod
+    def _ffprobe_cmd(path: Path) -> list:
+        return [
+            "ffprobe", "-v", "error",
+            "-show_entries",
+            "format=duration,format_name:stream=index,codec_type,codec_name,width,height,avg_frame_rate,r_frame_rate,pix_fmt,duration",
+            "-of", "json", str(path)
+        ]
+
+    @staticmethod
+    def _run_ffprobe(path: Path) -> dict:
+        result = subprocess.run(MediaProbe._ffprobe_cmd(path), capture_output=True, text=True, check=True)
+        return MediaProbe._parse_ffprobe(result.stdout, path)
+
+    @staticmethod
+    def _parse_ffprobe(stdout: str, path: Path) -> dict:
+        raw = json.loads(stdout or "{}")
+
+        streams = []
+        for s in raw.get("streams", []):
+            streams.append({
+                "index": s.get("index"),
+                "type": s.get("codec_type"),
+                "codec": s.get("codec_name"),
+                "width": s.get("width"),
+                "height": s.get("height"),
+                "fps": _parse_rate(s.get("avg_frame_rate")) or _parse_rate(s.get("r_frame_rate")),
+                "pix_fmt": s.get("pix_fmt"),
+                "duration": float(s["duration"]) if s.get("duration") not in (None, "N/A") else None,
+            })
+
+        fmt = raw.get("format", {})
+        duration = fmt.get("duration")
+        if duration in (None, "N/A"):
+            # Some containers (e.g. webm) only carry per-stream durations
+            durations = [s["duration"] for s in streams if s["duration"]]
+            duration = max(durations) if durations else None
+        if duration is None:
+            raise ValueError(f"ffprobe reported no duration for {path}")
+
+        video = next((s for s in streams if s["type"] == "video"), {})
+        return {
+            "duration": float(duration),
+            "format": fmt.get("format_name"),
+            "streams": streams,
+            "codec": video.get("codec"),
+            "width": video.get("width"),
+            "height": video.get("height"),
+            "fps": video.get("fps"),
+            "pix_fmt": video.get("pix_fmt"),
+        }
+
+    def _cached(self, path: Path):
+        st = path.stat()
+        key = str(path.resolve())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                now = time.time()
+                stale = now - entry.get("last_used", 0) >= self.TOUCH_INTERVAL
+                entry["last_used"] = now
+                if stale:
+                    self._save_index()
+                return key, st, entry["info"]
+        return key, st, None
+
+    def _store(self, key: str, st, info: dict):
+        with self._lock:
+            self._entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "last_used": time.time(), "info": info}
+            self._save_index()
+
+    def probe(self, path: Path) -> dict:
+        """Returns duration, streams, codec, resolution, fps and pixel format for a media file."""
+        path = Path(path)
+        key, st, info = self._cached(path)
+        if info is None:
+            info = self._run_ffprobe(path)
+            self._store(key, st, info)
+        return info
+
+    async def probe_async(self, path: Path) -> dict:
+        """probe() for async callers: a cache miss awaits ffprobe instead of blocking the event loop."""
+        from app.services.ffmpeg_runner import AsyncFFmpegRunner
+
+        path = Path(path)
+        key, st, info = self._cached(path)
+        if info is None:
+            stdout = await AsyncFFmpegRunner.run_capture(self._ffprobe_cmd(path), timeout=60)
+            info = self._parse_ffprobe(stdout, path)
+            self._store(key, st, info)
+        return info
+
+    def get_duration(self, path: Path) -> float:
+        return self.probe(path)["duration"]
+
+    async def get_duration_async(self, path: Path) -> float:
+        return (await self.probe_async(path))["duration"]
+
+
+_default_probe = None
+_default_probe_lock = threading.Lock()
+
+
+def get_media_probe() -> MediaProbe:
+    """Process-wide probe service backed by data/probe_cache.json."""
+    global _default_probe
+    if _default_probe is None:
+        with _default_probe_lock:
+            if _default_probe is None:
+                _default_probe = MediaProbe()
+    return _default_probe
@@ -0,0 +1,302 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_QUEUE_PATH = BASE_DIR / "data" / "queue.db"
+
+# A running job whose worker has not heartbeated for this long is handed to another worker
+HEARTBEAT_TIMEOUT = 60.0
+# Attempts before a job that keeps losing its worker (or failing) is marked failed
+MAX_ATTEMPTS = 3
+
+ACTIVE_STATUSES = ("queued", "running")
+# Priority of wizard steps the UI is waiting on, so they go ahead of batch renders
+INTERACTIVE_PRIORITY = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    topic TEXT,
+    target TEXT NOT NULL DEFAULT 'final',
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    telemetry TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, id);
+CREATE INDEX IF NOT EXISTS jobs_job_id ON jobs (job_id);
+CREATE TABLE IF NOT EXISTS workers (
+    name TEXT PRIMARY KEY,
+    host TEXT,
+    slots INTEGER NOT NULL DEFAULT 1,
+    targets TEXT,
+    registered_at REAL NOT NULL,
+    seen_at REAL NOT NULL
+);
+"""
+
+
+class RenderQueue:
+    """
+    Durable render queue in SQLite (data/queue.db, WAL mode), shared by the UI process and any
+    number of worker processes on the same box. Workers claim the highest-priority, oldest
+    queued job atomically, heartbeat while running and report stage/progress back through
+    the row; the UI only enqueues and reads.
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_QUEUE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ("payload", "telemetry", "result"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+    def enqueue(self, job_id: str, payload: dict, priority: int = 0, target: str = "final", topic: Optional[str] = None) -> int:
+        """Queues a render (higher `priority` runs first). Returns the queue row id."""
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO jobs (job_id, topic, target, payload, priority, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, topic or payload.get("topic"), target, json.dumps(payload), int(priority), time.time())
+            )
+            logger.info(f"Queued job {job_id} ({target}, priority {priority})")
+            return cursor.lastrowid
+
+    def claim(self, worker: str, targets: Optional[list] = None) -> Optional[dict]:
+        """Atomically hands the next queued job to `worker` (None if the queue is empty)."""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                query = "SELECT id FROM jobs WHERE status = 'queued'"
+                params = []
+                if targets:
+                    query += f" AND target IN ({', '.join('?' * len(targets))})"
+                    params += list(targets)
+                row = db.execute(query + " ORDER BY priority DESC, id LIMIT 1", params).fetchone()
+                if row is None:
+                    self._seen(db, worker)
+                    db.execute("COMMIT")
+                    return None
+                now = time.time()
+                db.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, heartbeat_at = ?, stage = NULL, progress = 0, error = NULL WHERE id = ?",
+                    (worker, now, now, row["id"])
+                )
+                job = self._row(db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+                self._seen(db, worker)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        logger.info(f"Worker {worker} claimed job {job['job_id']} (attempt {job['attempts']})")
+        return job
+
+    @staticmethod
+    def _lease(worker: Optional[str]):
+        # Row filter that makes an update a no-op once `worker` no longer holds the job's lease
+        return (" AND worker = ?", [worker]) if worker else ("", [])
+
+    def heartbeat(self, queue_id: int, stage: Optional[str] = None, progress: Optional[float] = None, telemetry: Optional[dict] = None, worker: Optional[str] = None) -> bool:
+        """
+        Records liveness (and optionally stage/progress), renewing the lease. Returns True if the
+        worker should stop: cancellation was requested, or (with `worker`) its lease was lost
+        because it was considered dead and the job handed out again.
+        """
+        sets, params = ["heartbeat_at = ?"], [time.time()]
+        if stage is not None:
+            sets.append("stage = ?")
+            params.append(stage)
+        if progress is not None:
+            sets.append("progress = ?")
+            params.append(float(progress))
+        if telemetry is not None:
+            sets.append("telemetry = ?")
+            params.append(json.dumps(telemetry))
+        lease, lease_params = self._lease(worker)
+        with self._connect() as db:
+            held = db.execute(
+                f"UPDATE jobs SET {', '.join(sets)} WHERE id = ? AND status = 'running'{lease}", params + [queue_id] + lease_params
+            ).rowcount
+            row = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (queue_id,)).fetchone()
+            if worker:
+                self._seen(db, worker)
+        if worker and not held:
+            logger.warning(f"Worker {worker} lost the lease on queue entry {queue_id}")
+            return True
+        return bool(row and row["cancel_requested"])
+
+    def _finish(self, queue_id: int, status: str, result: Optional[dict] = None, error: Optional[str] = None, worker: Optional[str] = None) -> bool:
+        lease, lease_params = self._lease(worker)
+        with self._connect() as db:
+            return bool(db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                f"progress = CASE WHEN ? = 'completed' THEN 100 ELSE progress END WHERE id = ? AND status = 'running'{lease}",
+                [status, json.dumps(result) if result is not None else None, error, time.time(), status, queue_id] + lease_params
+            ).rowcount)
+
+    def complete(self, queue_id: int, result: Optional[dict] = None, worker: Optional[str] = None) -> bool:
+        return self._finish(queue_id, "completed", result=result, worker=worker)
+
+    def fail(self, queue_id: int, error: str, worker: Optional[str] = None) -> bool:
+        return self._finish(queue_id, "failed", error=error, worker=worker)
+
+    def mark_cancelled(self, queue_id: int, worker: Optional[str] = None) -> bool:
+        return self._finish(queue_id, "cancelled", worker=worker)
+
+    def release(self, queue_id: int, worker: Optional[str] = None) -> bool:
+        """Puts a running job back in the queue (its worker is shutting down); the attempt is not counted."""
+        lease, lease_params = self._lease(worker)
+        with self._connect() as db:
+            return bool(db.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, attempts = MAX(attempts - 1, 0) "
+                f"WHERE id = ? AND status = 'running'{lease}", [queue_id] + lease_params
+            ).rowcount)
+
+    @staticmethod
+    def _seen(db, worker: str):
+        # Pool workers lease as "<name>/<slot>"
+        db.execute("UPDATE workers SET seen_at = ? WHERE name = ?", (time.time(), worker.split("/")[0]))
+
+    def register_worker(self, name: str, host: Optional[str] = None, slots: int = 1, targets: Optional[list] = None):
+        """Records a (render farm) worker; `seen_at` is refreshed by its leases and heartbeats."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO workers (name, host, slots, targets, registered_at, seen_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET host = excluded.host, slots = excluded.slots, "
+                "targets = excluded.targets, registered_at = excluded.registered_at, seen_at = excluded.seen_at",
+                (name, host, int(slots), json.dumps(targets) if targets else None, now, now)
+            )
+        logger.info(f"Registered worker {name} ({slots} slot(s))")
+
+    def list_workers(self) -> list:
+        """Registered workers with their running jobs; `alive` is false once they miss the heartbeat timeout."""
+        cutoff = time.time() - HEARTBEAT_TIMEOUT
+        with self._connect() as db:
+            workers = [dict(r) for r in db.execute("SELECT * FROM workers ORDER BY name").fetchall()]
+            running = db.execute("SELECT worker, job_id FROM jobs WHERE status = 'running'").fetchall()
+        for worker in workers:
+            worker["targets"] = json.loads(worker["targets"]) if worker["targets"] else None
+            worker["alive"] = worker["seen_at"] >= cutoff
+            # Pool workers lease as "<name>/<slot>"
+            worker["jobs"] = [r["job_id"] for r in running if r["worker"] and r["worker"].split("/")[0] == worker["name"]]
+        return workers
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels a queued job outright; a running one is flagged and stopped by its worker."""
+        with self._connect() as db:
+            queued = db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            ).rowcount
+            running = db.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'", (job_id,)
+            ).rowcount
+        return bool(queued or running)
+
+    def requeue_stale(self, timeout: float = HEARTBEAT_TIMEOUT) -> int:
+        """Returns running jobs whose worker stopped heartbeating to the queue (or fails them after MAX_ATTEMPTS)."""
+        cutoff = time.time() - timeout
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            stale = db.execute(
+                "SELECT id, job_id, worker, attempts, cancel_requested FROM jobs WHERE status = 'running' AND heartbeat_at < ?",
+                (cutoff,)
+            ).fetchall()
+            for row in stale:
+                if row["cancel_requested"]:
+                    status = "cancelled"
+                elif row["attempts"] >= MAX_ATTEMPTS:
+                    status = "failed"
+                else:
+                    status = "queued"
+                logger.warning(f"Job {row['job_id']} lost worker {row['worker']}, marking {status}")
+                db.execute(
+                    "UPDATE jobs SET status = ?, worker = NULL, error = ?, "
+                    "finished_at = CASE WHEN ? = 'queued' THEN NULL ELSE ? END WHERE id = ?",
+                    (status, f"Worker {row['worker']} stopped responding", status, time.time(), row["id"])
+                )
+            db.execute("COMMIT")
+        return len(stale)
+
+    def entry(self, queue_id: int) -> Optional[dict]:
+        with self._connect() as db:
+            return self._row(db.execute("SELECT * FROM jobs WHERE id = ?", (queue_id,)).fetchone())
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Latest queue entry for a UI job id."""
+        with self._connect() as db:
+            return self._row(db.execute("SELECT * FROM jobs WHERE job_id = ? ORDER BY id DESC LIMIT 1", (job_id,)).fetchone())
+
+    def list_jobs(self, statuses: Optional[tuple] = None, limit: int = 100) -> list:
+        with self._connect() as db:
+            query, params = "SELECT * FROM jobs", []
+            if statuses:
+                query += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+                params += list(statuses)
+            rows = db.execute(query + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [self._row(r) for r in rows]
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based place in line of a queued job (None if it is not waiting)."""
+        with self._connect() as db:
+            row = db.execute("SELECT id, priority FROM jobs WHERE job_id = ? AND status = 'queued' ORDER BY id DESC LIMIT 1", (job_id,)).fetchone()
+            if row is None:
+                return None
+            ahead = db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND (priority > ? OR (priority = ? AND id < ?))",
+                (row["priority"], row["priority"], row["id"])
+            ).fetchone()[0]
+        return ahead + 1
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_render_queue() -> RenderQueue:
+    """Process-wide queue backed by data/queue.db."""
+    global _default_queue
+    if _default_queue is None:
+        with _default_queue_lock:
+            if _default_queue is None:
+                _default_queue = RenderQueue()
+    return _default_queue
@@ -0,0 +1,183 @@
+import time
+import asyncio
+import logging
+import weakref
+import threading
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default per-resource concurrency (settings.json "stage_concurrency" overrides):
+#   network - API calls and downloads (Gemini, ElevenLabs, yt-dlp)
+#   stt     - Whisper inference (model memory bound)
+#   encode  - FFmpeg encodes (CPU bound)
+DEFAULT_LIMITS = {
+    "network": 4,
+    "stt": 1,
+    "encode": 2,
+}
+
+
+class Stage:
+    """
+    One node of a pipeline DAG. `fn(results)` gets the results of every finished stage keyed by
+    stage name; it may be sync (run on a worker thread) or async. `resource` names the
+    concurrency pool the stage runs under; `outputs` are the artifact paths it produces.
+    """
+
+    def __init__(self, name: str, fn: Callable, deps: Iterable[str] = (), resource: Optional[str] = None, outputs: Iterable = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.resource = resource
+        self.outputs = tuple(outputs)
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={list(self.deps)}, resource={self.resource!r})"
+
+
+def prune(stages: list, targets: Iterable[str]) -> list:
+    """Keeps only `targets` and the stages they (transitively) depend on."""
+    by_name = {s.name: s for s in stages}
+    keep, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in keep:
+            keep.add(name)
+            pending.extend(by_name[name].deps)
+    return [s for s in stages if s.name in keep]
+
+
+def validate_dag(stages: list, provided: Iterable[str] = ()):
+    """Raises ValueError for duplicate names, unknown dependencies or cycles."""
+    provided = set(provided)
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Duplicate stage '{stage.name}'")
+        by_name[stage.name] = stage
+    for stage in stages:
+        missing = [d for d in stage.deps if d not in by_name and d not in provided]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+
+    visiting, done = set(), set()
+
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Stage cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dep in by_name[name].deps:
+            if dep in by_name:
+                visit(dep, path + [name])
+        visiting.discard(name)
+        done.add(name)
+
+    for stage in stages:
+        visit(stage.name, [])
+
+
+class ResourceLimits:
+    """
+    Process-wide concurrency caps per resource type, shared by every DAG running in the
+    process (so two jobs still only get `encode` concurrent FFmpeg encodes). Semaphores are
+    created per event loop.
+    """
+
+    def __init__(self, limits: Optional[dict] = None):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        # event loop -> {resource: Semaphore}
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def configure(self, limits: Optional[dict]):
+        """Applies settings overrides; pools already in use keep their size until the loop ends."""
+        with self._lock:
+            self.limits.update(limits or {})
+
+    def semaphore(self, resource: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pools = self._semaphores.setdefault(loop, {})
+            if resource not in pools:
+                pools[resource] = asyncio.Semaphore(max(1, int(self.limits.get(resource, 1))))
+            return pools[resource]
+
+
+_default_limits = None
+_default_limits_lock = threading.Lock()
+
+
+def get_resource_limits() -> ResourceLimits:
+    global _default_limits
+    if _default_limits is None:
+        with _default_limits_lock:
+            if _default_limits is None:
+                _default_limits = ResourceLimits()
+    return _default_limits
+
+
+class DagScheduler:
+    """
+    Runs a stage DAG, starting each stage as soon as all of its dependencies have finished,
+    under the per-resource limits. The first failure cancels the stages still running and is
+    re-raised; cancelling run() cancels every stage.
+    """
+
+    def __init__(self, limits: Optional[ResourceLimits] = None, on_stage: Optional[Callable[[str, str], None]] = None):
+        self.limits = limits or get_resource_limits()
+        # on_stage(name, "started" | "finished") for UI logs / job progress
+        self.on_stage = on_stage
+        self.timings = {}
+
+    def _notify(self, name: str, status: str):
+        if self.on_stage:
+            try:
+                self.on_stage(name, status)
+            except Exception as e:
+                logger.warning(f"Stage callback failed: {e}")
+
+    async def _run_stage(self, stage: Stage, results: dict):
+        async def call():
+            self._notify(stage.name, "started")
+            started = time.monotonic()
+            if asyncio.iscoroutinefunction(stage.fn):
+                result = await stage.fn(results)
+            else:
+                result = await asyncio.to_thread(stage.fn, results)
+            self.timings[stage.name] = round(time.monotonic() - started, 3)
+            logger.info(f"Stage '{stage.name}' finished in {self.timings[stage.name]}s")
+            self._notify(stage.name, "finished")
+            return result
+
+        if stage.resource:
+            async with self.limits.semaphore(stage.resource):
+                return await call()
+        return await call()
+
+    async def run(self, stages: list, results: Optional[dict] = None) -> dict:
+        """Runs every stage and returns {stage name: result} (seeded with `results`, if given)."""
+        results = dict(results or {})
+        validate_dag(stages, results)
+        pending = {s.name: s for s in stages if s.name not in results}
+        running = {}
+
+        try:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.deps):
+                        del pending[name]
+                        running[asyncio.ensure_future(self._run_stage(stage, results))] = name
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    results[name] = task.result()
+        except BaseException:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            raise
+        return results
@@ -1,79 +1,266 @@
-import whisper
+import gc
+import time
+import logging
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional
 
-class WhisperService:
-    def __init__(self, model_name: str = "base"):
-        self.model = whisper.load_model(model_name)
+logger = logging.getLogger(__name__)
 
-    def transcribe(self, audio_path: Path):
-        result = self.model.transcribe(str(audio_path), word_timestamps=True)
+# Seconds an unused model stays loaded (settings.json "whisper_model_ttl")
+DEFAULT_MODEL_TTL = 600.0
+
+# Whisper parameter counts (millions), for the memory estimate of engines that don't expose weights
+MODEL_PARAMS_M = {"tiny": 39, "base": 74, "small": 244, "medium": 769, "large": 1550, "large-v2": 1550, "large-v3": 1550, "turbo": 809}
+BYTES_PER_PARAM = {"int8": 1, "int8_float32": 1, "int8_float16": 1, "float16": 2, "float32": 4}
+
+
+class SttBackend:
+    """
+    A speech-to-text engine and model. load() returns (model, size in MB) for the shared pool;
+    transcribe() turns a loaded model's output into [{"word", "start", "end"}] (seconds), the
+    format step_transcribe writes to `_words.json`, whatever the engine.
+    """
+
+    name = ""
+    default_compute_type = None
+
+    def __init__(self, model_name: str = "base", compute_type: Optional[str] = None, threads: int = 0):
+        self.model_name = model_name
+        self.compute_type = compute_type or self.default_compute_type
+        self.threads = int(threads or 0)
+
+    @property
+    def key(self) -> str:
+        """Pool key / transcript fingerprint, e.g. "whisper:base" or "faster-whisper:base:int8"."""
+        return ":".join(p for p in (self.name, self.model_name, self.compute_type) if p)
+
+    def load(self):
+        raise NotImplementedError
+
+    def transcribe(self, model, audio_path: Path) -> list:
+        raise NotImplementedError
+
+    @staticmethod
+    def _word(text: str, start: float, end: float) -> dict:
+        return {"word": text.strip(), "start": start, "end": end}
+
+
+class OpenAIWhisperBackend(SttBackend):
+    """openai-whisper (PyTorch, fp32 on CPU). The default."""
+
+    name = "whisper"
+
+    def load(self):
+        import whisper
+        model = whisper.load_model(self.model_name)
+        return model, sum(p.numel() * p.element_size() for p in model.parameters()) / 1e6
+
+    def transcribe(self, model, audio_path: Path) -> list:
+        result = model.transcribe(str(audio_path), word_timestamps=True)
         words = []
         for segment in result.get("segments", []):
             for word_data in segment.get("words", []):
-                words.append({
-                    "word": word_data["word"].strip(),
-                    "start": word_data["start"],
-                    "end": word_data["end"]
-                })
+                words.append(self._word(word_data["word"], word_data["start"], word_data["end"]))
         return words
 
-    def generate_ass(self, words: list, output_path: Path, font_name: str = "Inter-Bold", font_size: int = 110, time_offset: float = 0.0):
-        # Alignment: 5 = Center of the screen
-        alignment = 5 
-        margin_v = 50 
-        
-        events = []
-        words_per_screen = 3 # Keep it punchy (3-4 words max)
-        
-        for i in range(0, len(words), words_per_screen):
-            chunk = words[i:i + words_per_screen]
-            if not chunk: continue
-            
-            # Highlight effect: Active word in GOLD + Larger, others in White/Gray
-            for j, active_word in enumerate(chunk):
-                word_start = active_word["start"] + time_offset
-                word_end = active_word["end"] + time_offset
-                
-                styled_parts = []
-                for k, w in enumerate(chunk):
-                    text = w["word"].upper()
-                    
-                    if k == j:
-                        # Highlighted: Brand Gold (#FCC01E -> BGR: 1E C0 FC -> &H1EC0FC&)
-                        # Scale: 125%
-                        prefix = r"{\c&H1EC0FC&}{\3c&H000000&}{\fscx125\fscy125}" 
-                        suffix = r"{\fscx100\fscy100}" 
-                        styled_parts.append(f"{prefix}{text}{suffix}")
-                    else:
-                        # Dimmed: White but slightly smaller/standard
-                        # Keeping them white (&HFFFFFF&) ensures readability, gray might be too dull.
-                        # Let's try pure White but normal size.
-                        prefix = r"{\c&HFFFFFF&}{\3c&H000000&}{\fscx100\fscy100}"
-                        styled_parts.append(f"{prefix}{text}")
-                
-                text_content = " ".join(styled_parts)
-                
-                def fmt_time(t):
-                    h = int(t // 3600)
-                    m = int((t % 3600) // 60)
-                    s = t % 60
-                    return f"{h}:{m:02d}:{s:05.2f}"
-                
-                events.append(f"Dialogue: 0,{fmt_time(word_start)},{fmt_time(word_end)},Default,,0,0,0,,{text_content}")
-
-        # Note: Outline (Border) width
-        ass_content = f"""[Script Info]
-ScriptType: v4.00+
-PlayResX: 1080
-PlayResY: 1920
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,{font_name},{font_size},&H00FFFFFF,&H000000FF,&H00000000,&H00000000,-1,0,0,0,100,100,0,0,1,4,0,{alignment},50,50,{margin_v},1
-
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
-        ass_content += "\n".join(events)
-        output_path.write_text(ass_content, encoding="utf-8")
-        return output_path
+
+class FasterWhisperBackend(SttBackend):
+    """faster-whisper (CTranslate2), int8-quantized on CPU by default. Optional dependency."""
+
+    name = "faster-whisper"
+    default_compute_type = "int8"
+
+    def load(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError("stt_backend 'faster-whisper' needs the faster-whisper package (poetry install -E fast-stt)") from e
+        model = WhisperModel(self.model_name, device="cpu", compute_type=self.compute_type, cpu_threads=self.threads)
+        size_mb = MODEL_PARAMS_M.get(self.model_name, 0) * BYTES_PER_PARAM.get(self.compute_type, 4)
+        return model, size_mb
+
+    def transcribe(self, model, audio_path: Path) -> list:
+        segments, _ = model.transcribe(str(audio_path), word_timestamps=True)
+        words = []
+        # `segments` is a generator: decoding happens while iterating
+        for segment in segments:
+            for word in segment.words or []:
+                words.append(self._word(word.word, word.start, word.end))
+        return words
+
+
+STT_BACKENDS = {backend.name: backend for backend in (OpenAIWhisperBackend, FasterWhisperBackend)}
+
+
+def make_backend(name: str = "whisper", model_name: str = "base", compute_type: Optional[str] = None, threads: int = 0) -> SttBackend:
+    if name not in STT_BACKENDS:
+        raise ValueError(f"Unknown stt_backend '{name}' (available: {', '.join(STT_BACKENDS)})")
+    return STT_BACKENDS[name](model_name, compute_type, threads)
+
+
+class WhisperModelPool:
+    """
+    Process-wide STT models: each backend/size is loaded once, on first use, by a single thread
+    while other callers wait for it (single-flight). Models nobody is using are unloaded
+    after `ttl` seconds, or sooner, least recently used first, when loaded weights exceed
+    `memory_budget_mb`.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_MODEL_TTL, memory_budget_mb: float = 0):
+        self.ttl = ttl
+        self.memory_budget_mb = memory_budget_mb
+        # backend key -> {"model", "size_mb", "users", "last_used"}
+        self._models = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def configure(self, ttl: Optional[float] = None, memory_budget_mb: Optional[float] = None):
+        with self._lock:
+            if ttl is not None:
+                self.ttl = float(ttl)
+            if memory_budget_mb is not None:
+                self.memory_budget_mb = float(memory_budget_mb)
+
+    @staticmethod
+    def _load(backend: SttBackend):
+        print(f"   🧠 Loading STT model '{backend.key}'...")
+        started = time.monotonic()
+        model, size_mb = backend.load()
+        logger.info(f"Loaded STT '{backend.key}' ({size_mb:.0f} MB) in {time.monotonic() - started:.1f}s")
+        return model, size_mb
+
+    def _acquire(self, backend: SttBackend):
+        name = backend.key
+        while True:
+            with self._lock:
+                entry = self._models.get(name)
+                if entry:
+                    entry["users"] += 1
+                    return entry["model"]
+                loading = self._loading.get(name)
+                if loading is None:
+                    loading = self._loading[name] = threading.Event()
+                    leader = True
+                else:
+                    leader = False
+            if not leader:
+                # Another thread is loading this model; use its result (or retry if it failed)
+                loading.wait()
+                continue
+            try:
+                model, size_mb = self._load(backend)
+                with self._lock:
+                    self._models[name] = {"model": model, "size_mb": size_mb, "users": 1, "last_used": time.monotonic()}
+                    self._evict_locked()
+                self._start_reaper()
+                return model
+            finally:
+                with self._lock:
+                    self._loading.pop(name).set()
+
+    def _release(self, name: str):
+        with self._lock:
+            entry = self._models[name]
+            entry["users"] -= 1
+            entry["last_used"] = time.monotonic()
+            self._evict_locked()
+
+    @contextmanager
+    def model(self, backend):
+        """The loaded model of `backend` (or a Whisper size name); it is not evicted while the block runs."""
+        if isinstance(backend, str):
+            backend = OpenAIWhisperBackend(backend)
+        model = self._acquire(backend)
+        try:
+            yield model
+        finally:
+            self._release(backend.key)
+
+    def _evict_locked(self):
+        now = time.monotonic()
+        idle = sorted((e["last_used"], n) for n, e in self._models.items() if e["users"] == 0)
+        for last_used, name in idle:
+            if self.ttl and now - last_used >= self.ttl:
+                self._unload_locked(name, "idle")
+        if self.memory_budget_mb:
+            for last_used, name in idle:
+                if name in self._models and sum(e["size_mb"] for e in self._models.values()) > self.memory_budget_mb:
+                    self._unload_locked(name, "over memory budget")
+
+    def _unload_locked(self, name: str, reason: str):
+        del self._models[name]
+        logger.info(f"Unloaded STT '{name}' ({reason})")
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_locked()
+
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is not None or not self.ttl:
+                return
+            self._reaper = threading.Thread(target=self._reap, name="whisper-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(max(1.0, min(self.ttl or 60.0, 60.0) / 2))
+            self.evict_idle()
+
+    def loaded(self) -> dict:
+        """{model name: {"size_mb", "users", "idle"}} for diagnostics."""
+        now = time.monotonic()
+        with self._lock:
+            return {n: {"size_mb": round(e["size_mb"]), "users": e["users"], "idle": round(now - e["last_used"], 1)} for n, e in self._models.items()}
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_whisper_pool() -> WhisperModelPool:
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = WhisperModelPool()
+    return _default_pool
+
+
+class WhisperService:
+    """
+    Word-level transcription through the configured backend (settings.json "stt_backend",
+    "stt_model", "stt_compute_type"); the model comes from the shared pool, so this is cheap
+    to create.
+    """
+
+    DEFAULT_ENGINE = "whisper:base"
+
+    def __init__(self, model_name: str = "base", backend: str = "whisper", compute_type: Optional[str] = None, threads: int = 0):
+        self.backend = make_backend(backend, model_name, compute_type, threads)
+        self.model_name = model_name
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "WhisperService":
+        return cls(
+            settings.get("stt_model", "base"), settings.get("stt_backend", "whisper"),
+            settings.get("stt_compute_type"), settings.get("stt_threads", 0)
+        )
+
+    @property
+    def engine(self) -> str:
+        return self.backend.key
+
+    def transcribe(self, audio_path: Path):
+        with get_whisper_pool().model(self.backend) as model:
+            return self.backend.transcribe(model, audio_path)
@@ -1,11 +1,15 @@
 import os
 import json
+import base64
 from elevenlabs import generate, save, set_api_key
 from dotenv import load_dotenv
 from pathlib import Path
 
 load_dotenv()
 
+DEFAULT_API_BASE = "https://api.elevenlabs.io"
+TIMESTAMPS_TIMEOUT = 120
+
 class ElevenLabsService:
     @staticmethod
     def validate_api_key(api_key: str) -> bool:
@@ -27,6 +31,8 @@ class ElevenLabsService:
         if not self.api_key:
             raise ValueError("ELEVENLABS_API_KEY not found in environment")
         set_api_key(self.api_key)
+        # Overridable so the with-timestamps path can run against a local stub (app/scripts/tts_stub.py)
+        self.api_base = os.getenv("ELEVENLABS_BASE_URL", DEFAULT_API_BASE).rstrip("/")
         
         # Load dynamic settings
         settings_path = self.base_dir / "settings.json"
@@ -34,6 +40,8 @@ class ElevenLabsService:
         # Defaults
         self.voice_id = "21m00Tcm4TlvDq8ikWAM" # Rachel
         self.model_id = "eleven_multilingual_v2"
+        # Request character timings with the audio so the Whisper pass can be skipped
+        self.timestamps = False
         
         if settings_path.exists():
             try:
@@ -41,6 +49,7 @@ class ElevenLabsService:
                     settings = json.load(f)
                     self.voice_id = settings.get("tts_voice_id", self.voice_id)
                     self.model_id = settings.get("tts_model", self.model_id)
+                    self.timestamps = bool(settings.get("tts_timestamps", self.timestamps))
             except:
                 pass
 
@@ -79,3 +88,49 @@ class ElevenLabsService:
                      save(audio, str(output_path))
                      return output_path
             raise e
+
+    def text_to_speech_with_timestamps(self, text: str, output_path: Path, voice_id: str = None, model_id: str = None) -> list:
+        """
+        Speech and its timing in one request (the `/with-timestamps` endpoint). Saves the mp3 to
+        `output_path` and returns the words as [{"word", "start", "end"}], the transcript format.
+        """
+        import requests
+        use_voice = voice_id if voice_id else self.voice_id
+        use_model = model_id if model_id else self.model_id
+        url = f"{self.api_base}/v1/text-to-speech/{use_voice}/with-timestamps"
+        keys = [key for key in (self.api_key, self.backup_key) if key]
+        for i, key in enumerate(keys):
+            resp = requests.post(url, headers={"xi-api-key": key}, json={"text": text, "model_id": use_model}, timeout=TIMESTAMPS_TIMEOUT)
+            quota = resp.status_code == 429 or (resp.status_code == 401 and "quota" in resp.text.lower())
+            if quota and i + 1 < len(keys):
+                print("   ⚠️ Primary API Key quota exceeded. Switching to BACKUP key...")
+                continue
+            resp.raise_for_status()
+            break
+        data = resp.json()
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "wb") as f:
+            f.write(base64.b64decode(data["audio_base64"]))
+        # "alignment" follows the input text; "normalized_alignment" spells out numbers etc.
+        alignment = data.get("alignment") or data.get("normalized_alignment")
+        return self.alignment_words(alignment) if alignment else []
+
+    @staticmethod
+    def alignment_words(alignment: dict) -> list:
+        """Groups the per-character timings of an alignment into whitespace-separated words."""
+        words, current = [], None
+        chars = zip(alignment["characters"], alignment["character_start_times_seconds"], alignment["character_end_times_seconds"])
+        for char, start, end in chars:
+            if char.isspace():
+                if current:
+                    words.append(current)
+                current = None
+            elif current is None:
+                current = {"word": char, "start": round(start, 3), "end": round(end, 3)}
+            else:
+                current["word"] += char
+                current["end"] = round(end, 3)
+        if current:
+            words.append(current)
+        return words
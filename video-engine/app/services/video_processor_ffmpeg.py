@@ -1,69 +1,137 @@
-import re
-import sys
+import os
 import json
+import asyncio
+import math
+import shutil
 import logging
-import subprocess
+import tempfile
+import threading
 from pathlib import Path
+from app.services.media_probe import get_media_probe
+from app.services.filter_graph import compile_vfx_graph
+from app.services.encoding import resolve_profile, x264_args
+from app.services.ffmpeg_runner import FFmpegRunner, AsyncFFmpegRunner, current_listener
 
 logger = logging.getLogger(__name__)
 
 class VideoProcessorFFmpeg:
     @staticmethod
     def get_duration(file_path: Path):
+        return get_media_probe().get_duration(file_path)
+
+    @staticmethod
+    def probe(file_path: Path) -> dict:
+        """Cached stream metadata (duration, codec, resolution, fps, pixel format)."""
+        return get_media_probe().probe(file_path)
+
+    @staticmethod
+    def _percent_callback(duration, progress_callback, base_progress, weight):
+        def on_event(event):
+            if progress_callback and duration > 0:
+                progress_callback(base_progress + (event["progress"] * weight))
+        return on_event
+
+    @staticmethod
+    def run_cmd_with_progress(cmd, duration, progress_callback, base_progress=0, weight=100.0, stage="ffmpeg"):
+        """
+        Runs an FFmpeg command and reports progress via callback (as a percentage).
+        Structured events (fps, speed, ETA, ...) go to the active progress listener and the
+        stage's throughput is recorded; see FFmpegRunner.
+        """
+        on_event = VideoProcessorFFmpeg._percent_callback(duration, progress_callback, base_progress, weight)
+        return FFmpegRunner.run(cmd, duration, on_event, stage=stage)
+
+    @staticmethod
+    async def run_cmd_async(cmd, duration, progress_callback=None, base_progress=0, weight=100.0, stage="ffmpeg", timeout: float = None):
+        """Async run_cmd_with_progress: awaits FFmpeg without holding a thread; cancellable, optional timeout."""
+        on_event = VideoProcessorFFmpeg._percent_callback(duration, progress_callback, base_progress, weight)
+        return await AsyncFFmpegRunner.run(cmd, duration, on_event, stage=stage, timeout=timeout)
+
+    @staticmethod
+    def _trim_cmd(input_path: Path, output_path: Path, target_duration: float, offset: float, source_duration: float):
+        """Returns (cmd, concat list path or None) for trim_source."""
+        list_path = None
+        if source_duration >= target_duration:
+            offset = min(max(0.0, offset), source_duration - target_duration)
+            # Input seeking with stream copy starts at the keyframe at or before `offset`
+            inputs = ["-ss", str(offset), "-i", str(input_path)]
+            print(f"      ✂️  Cutting {target_duration:.1f}s window at {offset:.1f}s from {source_duration:.1f}s source (stream copy)")
+        else:
+            repeats = math.ceil(target_duration / source_duration) if source_duration > 0 else 1
+            list_path = output_path.with_suffix(".txt")
+            list_path.write_text(f"file '{input_path.resolve().as_posix()}'\n" * repeats)
+            inputs = ["-f", "concat", "-safe", "0", "-i", str(list_path)]
+            print(f"      🔁 Looping {source_duration:.1f}s source x{repeats} via concat (stream copy)")
+
         cmd = [
-            "ffprobe", "-v", "error", "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1", str(file_path)
+            "ffmpeg", "-y", "-v", "error",
+            *inputs,
+            "-t", str(target_duration),
+            "-map", "0:v:0",
+            "-c", "copy",
+            "-avoid_negative_ts", "make_zero",
+            str(output_path)
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        return float(result.stdout.strip())
-
-    @staticmethod
-    def run_cmd_with_progress(cmd, duration, progress_callback, base_progress=0, weight=100.0):
-        """Runs an FFmpeg command and reports progress via callback."""
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1
-        )
-        
-        time_regex = re.compile(r"time=(\d+):(\d+):(\d+.\d+)")
-        
-        for line in process.stdout:
-            match = time_regex.search(line)
-            if match and duration > 0:
-                h, m, s = map(float, match.groups())
-                current_time = h * 3600 + m * 60 + s
-                p = min(1.0, current_time / duration)
-                if progress_callback:
-                    progress_callback(base_progress + (p * weight))
-        
-        process.wait()
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, cmd)
+        return cmd, list_path
 
     @staticmethod
-    def process_source_video(input_path: Path, output_path: Path, target_duration: float, progress_callback=None, base_progress=0, weight=10.0):
-        """Crops to 9:16, removes audio, and loops using FFmpeg."""
-        filter_complex = "scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920"
-        cmd = [
+    def trim_source(input_path: Path, output_path: Path, target_duration: float, offset: float = 0.0) -> Path:
+        """Blocking trim_source_async, for callers without an event loop."""
+        return asyncio.run(VideoProcessorFFmpeg.trim_source_async(input_path, output_path, target_duration, offset))
+
+    @staticmethod
+    async def trim_source_async(input_path: Path, output_path: Path, target_duration: float, offset: float = 0.0, timeout: float = None) -> Path:
+        """
+        Stream-copies exactly the part of the source the render needs (no decode, no encode).
+        Long sources get a keyframe-aligned window starting at `offset` (clamped so the window
+        fits); sources shorter than the target are repeated through the concat demuxer.
+        """
+        source_duration = await get_media_probe().get_duration_async(input_path)
+        cmd, list_path = VideoProcessorFFmpeg._trim_cmd(input_path, output_path, target_duration, offset, source_duration)
+        try:
+            await AsyncFFmpegRunner.run_capture(cmd, timeout=timeout)
+        finally:
+            if list_path:
+                list_path.unlink(missing_ok=True)
+        return output_path
+
+    @staticmethod
+    def _crop_cmd(trimmed_path: Path, output_path: Path, target_duration: float, profile: dict = None, size: tuple = (1080, 1920)):
+        width, height = size
+        filter_complex = f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}"
+        return [
             "ffmpeg", "-y", "-stats",
-            "-stream_loop", "-1",
-            "-i", str(input_path),
+            "-i", str(trimmed_path),
             "-t", str(target_duration),
             "-vf", filter_complex,
             "-an",
-            "-c:v", "libx264",
-            "-pix_fmt", "yuv420p",
-            "-preset", "ultrafast",
+            *x264_args(profile),
             str(output_path)
         ]
-        VideoProcessorFFmpeg.run_cmd_with_progress(cmd, target_duration, progress_callback, base_progress, weight)
 
     @staticmethod
-    def merge_audio_video(video_path: Path, audio_path: Path, output_path: Path, audio_delay: float = 4.0, bg_music_path: Path = None, bg_fade_out: float = 3.0, progress_callback=None, base_progress=0, weight=10.0):
-        video_duration = VideoProcessorFFmpeg.get_duration(video_path)
+    def process_source_video(input_path: Path, output_path: Path, target_duration: float, progress_callback=None, base_progress=0, weight=10.0, profile: dict = None, source_offset: float = 0.0, size: tuple = (1080, 1920)):
+        """Blocking process_source_video_async, for callers without an event loop."""
+        asyncio.run(VideoProcessorFFmpeg.process_source_video_async(
+            input_path, output_path, target_duration, progress_callback, base_progress, weight, profile, source_offset, size
+        ))
+
+    @staticmethod
+    async def process_source_video_async(input_path: Path, output_path: Path, target_duration: float, progress_callback=None, base_progress=0, weight=10.0, profile: dict = None, source_offset: float = 0.0, size: tuple = (1080, 1920), timeout: float = None):
+        """
+        Trims (or loops) the source to the target length, crops to 9:16 and removes audio.
+        `size` lets previews render a low-resolution proxy instead of the full frame.
+        """
+        trimmed_path = output_path.with_name(f"{output_path.stem}_trim{input_path.suffix}")
+        try:
+            await VideoProcessorFFmpeg.trim_source_async(input_path, trimmed_path, target_duration, source_offset, timeout)
+            cmd = VideoProcessorFFmpeg._crop_cmd(trimmed_path, output_path, target_duration, profile, size)
+            await VideoProcessorFFmpeg.run_cmd_async(cmd, target_duration, progress_callback, base_progress, weight, stage="crop", timeout=timeout)
+        finally:
+            trimmed_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _merge_cmd(video_path: Path, audio_path: Path, output_path: Path, video_duration: float, audio_delay: float = 4.0, bg_music_path: Path = None, bg_fade_out: float = 3.0):
         delay_ms = int(audio_delay * 1000)
         inputs = ["-i", str(video_path), "-i", str(audio_path)]
         filter_complex = f"[1:a]adelay={delay_ms}|{delay_ms}[delayed_voice];"
@@ -78,7 +146,7 @@ class VideoProcessorFFmpeg:
             filter_complex += "[delayed_voice]volume=1.0[a_out]"
             map_audio = "-map [a_out]"
 
-        cmd = [
+        return [
             "ffmpeg", "-y", "-stats",
             *inputs,
             "-filter_complex", filter_complex,
@@ -89,7 +157,19 @@ class VideoProcessorFFmpeg:
             "-shortest", 
             str(output_path)
         ]
-        VideoProcessorFFmpeg.run_cmd_with_progress(cmd, video_duration, progress_callback, base_progress, weight)
+
+    @staticmethod
+    def merge_audio_video(video_path: Path, audio_path: Path, output_path: Path, audio_delay: float = 4.0, bg_music_path: Path = None, bg_fade_out: float = 3.0, progress_callback=None, base_progress=0, weight=10.0):
+        """Blocking merge_audio_video_async, for callers without an event loop."""
+        asyncio.run(VideoProcessorFFmpeg.merge_audio_video_async(
+            video_path, audio_path, output_path, audio_delay, bg_music_path, bg_fade_out, progress_callback, base_progress, weight
+        ))
+
+    @staticmethod
+    async def merge_audio_video_async(video_path: Path, audio_path: Path, output_path: Path, audio_delay: float = 4.0, bg_music_path: Path = None, bg_fade_out: float = 3.0, progress_callback=None, base_progress=0, weight=10.0, timeout: float = None):
+        video_duration = await get_media_probe().get_duration_async(video_path)
+        cmd = VideoProcessorFFmpeg._merge_cmd(video_path, audio_path, output_path, video_duration, audio_delay, bg_music_path, bg_fade_out)
+        await VideoProcessorFFmpeg.run_cmd_async(cmd, video_duration, progress_callback, base_progress, weight, stage="mix", timeout=timeout)
 
     @staticmethod
     def apply_vfx(
@@ -101,74 +181,491 @@ class VideoProcessorFFmpeg:
         theme_color: str = "#FCC01E",
         progress_callback=None,
         base_progress=0,
-        weight=80.0
+        weight=80.0,
+        profile: dict = None
     ):
-        assets_dir = base_dir / "assets"
-        intro_path = assets_dir / template['intro']['file']
-        outro_path = assets_dir / template['outro']['file']
-        logo_path = assets_dir / template['logo']['file']
-        gradient_bottom_path = assets_dir / template['gradient']['file']
-        gradient_top_path = assets_dir / "overlays/gradient-top.png"
-        
-        duration = VideoProcessorFFmpeg.get_duration(input_path)
-        intro_duration = VideoProcessorFFmpeg.get_duration(intro_path)
-        outro_duration = VideoProcessorFFmpeg.get_duration(outro_path)
-        
-        def esc(p): return str(p).replace("\\", "/").replace(":", "\\:")
-        
-        logo_width_config = template['logo'].get('width', '30%')
-        if isinstance(logo_width_config, str) and logo_width_config.endswith('%'):
-            multiplier = float(logo_width_config.strip('%')) / 100.0
-            target_logo_w = int(1080 * multiplier)
-        else:
-            try:
-                target_logo_w = int(logo_width_config)
-            except:
-                target_logo_w = 324 
-        
-        fonts_dir = assets_dir / "fonts"
-        intro_end = intro_duration
-        outro_start = max(0, duration - outro_duration)
-        fade_dur = 1.0
-        fade_start_t = max(0, duration - 4.0)
+        """Blocking apply_vfx_async, for callers without an event loop."""
+        asyncio.run(VideoProcessorFFmpeg.apply_vfx_async(
+            input_path, output_path, ass_path, template, base_dir, theme_color, progress_callback, base_progress, weight, profile
+        ))
+
+    @staticmethod
+    async def apply_vfx_async(
+        input_path: Path,
+        output_path: Path,
+        ass_path: Path,
+        template: dict,
+        base_dir: Path,
+        theme_color: str = "#FCC01E",
+        progress_callback=None,
+        base_progress=0,
+        weight=80.0,
+        profile: dict = None,
+        timeout: float = None
+    ):
+        """Overlays and subtitles on an already cropped and mixed video; cancellable, optional timeout."""
+        duration = await get_media_probe().get_duration_async(input_path)
+        # Graph compilation may build cached assets on first use; keep that off the loop
+        graph = await asyncio.to_thread(compile_vfx_graph, template, base_dir, theme_color)
+        filter_complex = graph.build("0:v", 1, duration, ass_path)
 
-        filter_complex = (
-            f"[0:v]format=rgba[v0];"
-            f"[v0]ass='{esc(ass_path)}':fontsdir='{esc(fonts_dir)}'[v_sub];"
-            f"[v_sub]drawbox=x=0:y=0:w=iw:h=ih:color={theme_color}@0.08:t=fill[v_tint];"
-            f"[v_tint]fade=t=out:st={fade_start_t}:d=4:color=black[v_faded];"
-            f"[1:v]format=rgba,colorkey=0x000000:0.1:0.1[intro_src];"
-            f"[2:v]format=rgba,colorkey=0x000000:0.1:0.1[outro_src];"
-            f"[v_faded][intro_src]overlay=0:0:enable='between(t,0,{intro_end})'[v_intro];"
-            f"[v_intro][outro_src]overlay=0:0:enable='between(t,{outro_start},{duration})'[v_outro];"
-            f"[v_outro][3:v]overlay=0:H-h[v_grad_b];"
-            f"[v_grad_b][4:v]overlay=W-w:0[v_grad_t];"
-            f"[5:v]loop=loop=-1:size=1:start=0,scale={target_logo_w}:-1,format=rgba,"
-            f"fade=in:st=5.0:d={fade_dur}:alpha=1,"
-            f"fade=out:st={duration - 5.0}:d={fade_dur}:alpha=1[logo_s];"
-            f"[v_grad_t][logo_s]overlay=W-w-60:60:shortest=1[v_final]"
-        )
-        
         cmd = [
             "ffmpeg", "-y", 
             "-v", "error", "-stats",
             "-i", str(input_path),
-            "-i", str(intro_path),
-            "-i", str(outro_path), 
-            "-i", str(gradient_bottom_path),
-            "-i", str(gradient_top_path),
-            "-i", str(logo_path),
+            *graph.input_args(),
             "-filter_complex", filter_complex,
             "-map", "[v_final]",
             "-map", "0:a?",
-            "-c:v", "libx264",
-            "-pix_fmt", "yuv420p",
-            "-preset", "ultrafast",
-            "-crf", "23",
+            *x264_args(profile),
             "-c:a", "aac", "-b:a", "192k",
             str(output_path)
         ]
-        VideoProcessorFFmpeg.run_cmd_with_progress(cmd, duration, progress_callback, base_progress, weight)
+        await VideoProcessorFFmpeg.run_cmd_async(cmd, duration, progress_callback, base_progress, weight, stage="vfx", timeout=timeout)
+
+    @staticmethod
+    def _music_enabled(template: dict, bg_music_path: Path) -> bool:
+        return bool(template.get('music', {}).get('enabled', True) and bg_music_path and bg_music_path.exists())
+
+    @staticmethod
+    def _mix_filter(voice_input: int, music_input, duration: float, audio_delay: float = 4.0, bg_fade_out: float = 3.0):
+        """Voice delay + looped background music mix, ending in [a_out]."""
+        delay_ms = int(audio_delay * 1000)
+        audio_filter = f"[{voice_input}:a]adelay={delay_ms}|{delay_ms}[delayed_voice];"
+        if music_input is not None:
+            fade_start = max(0, duration - bg_fade_out)
+            audio_filter += (
+                f"[{music_input}:a]volume=0.15,afade=t=out:st={fade_start}:d={bg_fade_out}[bg_music];"
+                f"[delayed_voice][bg_music]amix=inputs=2:duration=longest:dropout_transition=0[a_out]"
+            )
+        else:
+            # Pad the voice so the clip keeps its full length without music
+            audio_filter += "[delayed_voice]volume=1.0,apad[a_out]"
+        return audio_filter
+
+    @staticmethod
+    def render_fused(
+        source_path: Path,
+        voice_path: Path,
+        output_path: Path,
+        ass_path: Path,
+        template: dict,
+        base_dir: Path,
+        target_duration: float,
+        audio_delay: float = 4.0,
+        bg_music_path: Path = None,
+        bg_fade_out: float = 3.0,
+        theme_color: str = "#FCC01E",
+        progress_callback=None,
+        base_progress=0,
+        weight=100.0,
+        profile: dict = None,
+        source_offset: float = 0.0
+    ):
+        """Blocking render_fused_async, for callers without an event loop (see generate_final_video)."""
+        asyncio.run(VideoProcessorFFmpeg.render_fused_async(
+            source_path, voice_path, output_path, ass_path, template, base_dir, target_duration, audio_delay,
+            bg_music_path, bg_fade_out, theme_color, progress_callback, base_progress, weight, profile, source_offset
+        ))
+
+    @staticmethod
+    async def render_fused_async(
+        source_path: Path,
+        voice_path: Path,
+        output_path: Path,
+        ass_path: Path,
+        template: dict,
+        base_dir: Path,
+        target_duration: float,
+        audio_delay: float = 4.0,
+        bg_music_path: Path = None,
+        bg_fade_out: float = 3.0,
+        theme_color: str = "#FCC01E",
+        progress_callback=None,
+        base_progress=0,
+        weight=100.0,
+        profile: dict = None,
+        source_offset: float = 0.0,
+        timeout: float = None
+    ):
+        """
+        Single-pass render: crop, voice + music mix and VFX in one filter graph.
+        The source is decoded once and the output encoded once; the only intermediate is
+        the stream-copied trim/loop of the source (see trim_source_async). Awaited on the
+        event loop: cancelling the task or exceeding `timeout` stops FFmpeg.
+        """
+        trimmed_path = output_path.with_name(f"{output_path.stem}_trim{source_path.suffix}")
+        try:
+            await VideoProcessorFFmpeg.trim_source_async(source_path, trimmed_path, target_duration, source_offset, timeout)
+            # Graph compilation may build cached assets on first use; keep that off the loop
+            cmd = await asyncio.to_thread(
+                VideoProcessorFFmpeg._fused_cmd,
+                trimmed_path, voice_path, output_path, ass_path, template, base_dir, target_duration,
+                audio_delay, bg_music_path, bg_fade_out, theme_color, profile
+            )
+            await VideoProcessorFFmpeg.run_cmd_async(cmd, target_duration, progress_callback, base_progress, weight, stage="render", timeout=timeout)
+        finally:
+            trimmed_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _fused_cmd(
+        trimmed_path: Path,
+        voice_path: Path,
+        output_path: Path,
+        ass_path: Path,
+        template: dict,
+        base_dir: Path,
+        target_duration: float,
+        audio_delay: float,
+        bg_music_path: Path,
+        bg_fade_out: float,
+        theme_color: str,
+        profile: dict
+    ):
+        graph = compile_vfx_graph(template, base_dir, theme_color)
+        inputs = [
+            "-t", str(target_duration), "-i", str(trimmed_path),
+            "-i", str(voice_path),
+        ]
+        has_music = VideoProcessorFFmpeg._music_enabled(template, bg_music_path)
+        if has_music:
+            inputs.extend(["-stream_loop", "-1", "-i", str(bg_music_path)])
+        audio_filter = VideoProcessorFFmpeg._mix_filter(1, 2 if has_music else None, target_duration, audio_delay, bg_fade_out)
+        first_overlay_input = inputs.count("-i")
+
+        filter_complex = (
+            "[0:v]scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920[v_base];"
+            + audio_filter + ";"
+            + graph.build("v_base", first_overlay_input, target_duration, ass_path)
+        )
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-v", "error", "-stats",
+            *inputs,
+            *graph.input_args(),
+            "-filter_complex", filter_complex,
+            "-map", "[v_final]",
+            "-map", "[a_out]",
+            "-t", str(target_duration),
+            *x264_args(profile),
+            "-c:a", "aac", "-b:a", "192k",
+            str(output_path)
+        ]
+        return cmd
+
+    @staticmethod
+    def _segment_plan(duration: float, fps: float, segments: int, gop_seconds: float = 2.0):
+        """
+        Splits [0, duration) into at most `segments` chunks whose boundaries fall on
+        GOP boundaries (multiples of `gop_seconds`, snapped to whole frames).
+        """
+        fps = fps or 30.0
+        gop_frames = max(1, round(gop_seconds * fps))
+        total_gops = max(1, math.ceil(duration * fps / gop_frames))
+        gops_per_segment = max(1, math.ceil(total_gops / max(1, segments)))
+
+        plan = []
+        for first_gop in range(0, total_gops, gops_per_segment):
+            start = first_gop * gop_frames / fps
+            end = min(duration, (first_gop + gops_per_segment) * gop_frames / fps)
+            if end - start > 1e-3:
+                plan.append((start, end - start))
+        return plan, gop_frames
+
+    @staticmethod
+    def _default_segments():
+        # ultrafast x264 saturates around 4 threads; give each chunk about that many
+        return max(1, min(16, (os.cpu_count() or 4) // 4))
+
+    @staticmethod
+    def _segment_progress(segment_cmds: list, progress_callback, base_progress, weight, stage):
+        """
+        Per-segment event callbacks that fold N interleaved event streams into one
+        (summed fps/speed) for the progress callback and the active listener.
+        """
+        total = sum(length for _, length in segment_cmds) or 1.0
+        events = [None] * len(segment_cmds)
+        lock = threading.Lock()
+        listener = current_listener()
+
+        def make_callback(i):
+            def on_event(event):
+                with lock:
+                    events[i] = event
+                    live = [e for e in events if e]
+                    out_time = sum(e["progress"] * segment_cmds[j][1] for j, e in enumerate(events) if e)
+                    combined = {
+                        "stage": stage,
+                        "out_time": round(out_time, 3),
+                        "duration": total,
+                        "progress": out_time / total,
+                        "frame": sum(e["frame"] for e in live),
+                        "fps": sum(e["fps"] or 0 for e in live if not e["done"]) or None,
+                        "speed": sum(e["speed"] or 0 for e in live if not e["done"]) or None,
+                        "bitrate": None,
+                        "total_size": sum(e["total_size"] for e in live),
+                        "eta": max((e["eta"] or 0 for e in live), default=None),
+                        "done": False,
+                    }
+                if progress_callback:
+                    progress_callback(base_progress + combined["progress"] * weight)
+                if listener:
+                    listener(combined)
+            return on_event
+
+        return make_callback
+
+    @staticmethod
+    async def _render_segments_async(segment_cmds: list, progress_callback=None, base_progress=0, weight=100.0, stage="segments", timeout: float = None):
+        """One FFmpeg task per segment with aggregated progress; a failure or cancellation stops the rest."""
+        make_callback = VideoProcessorFFmpeg._segment_progress(segment_cmds, progress_callback, base_progress, weight, stage)
+        tasks = [
+            asyncio.ensure_future(AsyncFFmpegRunner.run(
+                cmd, length, make_callback(i), f"{stage} {i + 1}/{len(segment_cmds)}", True, False, timeout
+            ))
+            for i, (cmd, length) in enumerate(segment_cmds)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    @staticmethod
+    def _segment_encode_args(profile: dict, fps: float, threads: int):
+        # Fixed GOP so every chunk starts on a keyframe the concat demuxer can cut on
+        return ["-an", *x264_args(profile, fps, threads=threads, fixed_gop=True)]
+
+    @staticmethod
+    def _concat_cmd(segment_paths: list, list_path: Path, audio_inputs: list, audio_args: list, output_path: Path, duration: float):
+        list_path.write_text("".join(f"file '{p.resolve().as_posix()}'\n" for p in segment_paths))
+        return [
+            "ffmpeg", "-y",
+            "-v", "error", "-stats",
+            "-f", "concat", "-safe", "0", "-i", str(list_path),
+            *audio_inputs,
+            "-map", "0:v",
+            *audio_args,
+            "-t", str(duration),
+            "-c:v", "copy",
+            "-c:a", "aac", "-b:a", "192k",
+            str(output_path)
+        ]
+
+    @staticmethod
+    def apply_vfx_segmented(
+        input_path: Path,
+        output_path: Path,
+        ass_path: Path,
+        template: dict,
+        base_dir: Path,
+        theme_color: str = "#FCC01E",
+        segments: int = None,
+        gop_seconds: float = None,
+        progress_callback=None,
+        base_progress=0,
+        weight=80.0,
+        profile: dict = None
+    ):
+        """Blocking apply_vfx_segmented_async, for callers without an event loop."""
+        asyncio.run(VideoProcessorFFmpeg.apply_vfx_segmented_async(
+            input_path, output_path, ass_path, template, base_dir, theme_color, segments, gop_seconds,
+            progress_callback, base_progress, weight, profile
+        ))
+
+    @staticmethod
+    async def apply_vfx_segmented_async(
+        input_path: Path,
+        output_path: Path,
+        ass_path: Path,
+        template: dict,
+        base_dir: Path,
+        theme_color: str = "#FCC01E",
+        segments: int = None,
+        gop_seconds: float = None,
+        progress_callback=None,
+        base_progress=0,
+        weight=80.0,
+        profile: dict = None,
+        timeout: float = None
+    ):
+        """
+        Parallel variant of apply_vfx_async: renders GOP-aligned time chunks in separate FFmpeg
+        processes and stitches them with the concat demuxer. Each chunk's timestamps are
+        shifted back to the absolute timeline so fades, overlays and ASS events line up.
+        """
+        info = await get_media_probe().probe_async(input_path)
+        duration = info["duration"]
+        graph = await asyncio.to_thread(compile_vfx_graph, template, base_dir, theme_color)
+        profile = {**(profile or resolve_profile()), **({"gop_seconds": gop_seconds} if gop_seconds else {})}
+        segments = segments or VideoProcessorFFmpeg._default_segments()
+        fps = info.get("fps") or 30.0
+        plan, _ = VideoProcessorFFmpeg._segment_plan(duration, fps, segments, profile["gop_seconds"])
+        threads = max(1, (os.cpu_count() or 4) // len(plan))
+
+        work_dir = Path(tempfile.mkdtemp(prefix=f"{output_path.stem}_seg_", dir=output_path.parent))
+        try:
+            segment_cmds, segment_paths = [], []
+            for i, (start, length) in enumerate(plan):
+                seg_path = work_dir / f"seg_{i:03d}.mp4"
+                filter_complex = (
+                    f"[0:v]setpts=PTS-STARTPTS+{start}/TB[v_seg];"
+                    + graph.build("v_seg", 1, duration, ass_path)
+                    + ";[v_final]setpts=PTS-STARTPTS[v_out]"
+                )
+                cmd = [
+                    "ffmpeg", "-y",
+                    "-v", "error", "-stats",
+                    "-ss", str(start), "-t", str(length), "-i", str(input_path),
+                    *graph.input_args(),
+                    "-filter_complex", filter_complex,
+                    "-map", "[v_out]",
+                    *VideoProcessorFFmpeg._segment_encode_args(profile, fps, threads),
+                    str(seg_path)
+                ]
+                segment_cmds.append((cmd, length))
+                segment_paths.append(seg_path)
+
+            print(f"      🧩 Rendering {len(plan)} segments in parallel ({threads} threads each)...")
+            await VideoProcessorFFmpeg._render_segments_async(segment_cmds, progress_callback, base_progress, weight * 0.95, stage="vfx", timeout=timeout)
+            cmd = VideoProcessorFFmpeg._concat_cmd(
+                segment_paths, work_dir / "segments.txt", ["-i", str(input_path)], ["-map", "1:a?"], output_path, duration
+            )
+            await VideoProcessorFFmpeg.run_cmd_async(cmd, duration, progress_callback, base_progress + weight * 0.95, weight * 0.05, stage="concat", timeout=timeout)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    def render_fused_segmented(
+        source_path: Path,
+        voice_path: Path,
+        output_path: Path,
+        ass_path: Path,
+        template: dict,
+        base_dir: Path,
+        target_duration: float,
+        audio_delay: float = 4.0,
+        bg_music_path: Path = None,
+        bg_fade_out: float = 3.0,
+        theme_color: str = "#FCC01E",
+        segments: int = None,
+        gop_seconds: float = None,
+        progress_callback=None,
+        base_progress=0,
+        weight=100.0,
+        profile: dict = None,
+        source_offset: float = 0.0
+    ):
+        """Blocking render_fused_segmented_async, for callers without an event loop."""
+        asyncio.run(VideoProcessorFFmpeg.render_fused_segmented_async(
+            source_path, voice_path, output_path, ass_path, template, base_dir, target_duration, audio_delay,
+            bg_music_path, bg_fade_out, theme_color, segments, gop_seconds, progress_callback, base_progress,
+            weight, profile, source_offset
+        ))
+
+    @staticmethod
+    async def render_fused_segmented_async(
+        source_path: Path,
+        voice_path: Path,
+        output_path: Path,
+        ass_path: Path,
+        template: dict,
+        base_dir: Path,
+        target_duration: float,
+        audio_delay: float = 4.0,
+        bg_music_path: Path = None,
+        bg_fade_out: float = 3.0,
+        theme_color: str = "#FCC01E",
+        segments: int = None,
+        gop_seconds: float = None,
+        progress_callback=None,
+        base_progress=0,
+        weight=100.0,
+        profile: dict = None,
+        source_offset: float = 0.0,
+        timeout: float = None
+    ):
+        """
+        Parallel variant of render_fused_async: the source is trimmed/looped once by stream
+        copy, each chunk crops its own window of it and applies the VFX chain; the voice/music
+        mix is done once while stitching. Segment processes are awaited as tasks.
+        """
+        source_info = await get_media_probe().probe_async(source_path)
+        work_dir = Path(tempfile.mkdtemp(prefix=f"{output_path.stem}_seg_", dir=output_path.parent))
+        try:
+            trimmed_path = await VideoProcessorFFmpeg.trim_source_async(
+                source_path, work_dir / f"source{source_path.suffix}", target_duration, source_offset, timeout
+            )
+            segment_cmds, segment_paths, audio_inputs, audio_args = await asyncio.to_thread(
+                VideoProcessorFFmpeg._fused_segment_jobs,
+                trimmed_path, source_info, work_dir, voice_path, ass_path, template, base_dir, target_duration,
+                audio_delay, bg_music_path, bg_fade_out, theme_color, segments, gop_seconds, profile
+            )
+            await VideoProcessorFFmpeg._render_segments_async(segment_cmds, progress_callback, base_progress, weight * 0.95, stage="render", timeout=timeout)
+            cmd = VideoProcessorFFmpeg._concat_cmd(segment_paths, work_dir / "segments.txt", audio_inputs, audio_args, output_path, target_duration)
+            await VideoProcessorFFmpeg.run_cmd_async(cmd, target_duration, progress_callback, base_progress + weight * 0.95, weight * 0.05, stage="concat", timeout=timeout)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    def _fused_segment_jobs(
+        trimmed_path: Path,
+        source_info: dict,
+        work_dir: Path,
+        voice_path: Path,
+        ass_path: Path,
+        template: dict,
+        base_dir: Path,
+        target_duration: float,
+        audio_delay: float,
+        bg_music_path: Path,
+        bg_fade_out: float,
+        theme_color: str,
+        segments: int,
+        gop_seconds: float,
+        profile: dict
+    ):
+        """Builds the per-segment commands plus the audio inputs/args used when stitching."""
+        graph = compile_vfx_graph(template, base_dir, theme_color)
+        profile = {**(profile or resolve_profile()), **({"gop_seconds": gop_seconds} if gop_seconds else {})}
+        segments = segments or VideoProcessorFFmpeg._default_segments()
+        fps = source_info.get("fps") or 30.0
+        plan, _ = VideoProcessorFFmpeg._segment_plan(target_duration, fps, segments, profile["gop_seconds"])
+        threads = max(1, (os.cpu_count() or 4) // len(plan))
+
+        segment_cmds, segment_paths = [], []
+        for i, (start, length) in enumerate(plan):
+            seg_path = work_dir / f"seg_{i:03d}.mp4"
+            filter_complex = (
+                f"[0:v]scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920,"
+                f"setpts=PTS-STARTPTS+{start}/TB[v_seg];"
+                + graph.build("v_seg", 1, target_duration, ass_path)
+                + ";[v_final]setpts=PTS-STARTPTS[v_out]"
+            )
+            cmd = [
+                "ffmpeg", "-y",
+                "-v", "error", "-stats",
+                "-ss", str(start), "-t", str(length), "-i", str(trimmed_path),
+                *graph.input_args(),
+                "-filter_complex", filter_complex,
+                "-map", "[v_out]",
+                *VideoProcessorFFmpeg._segment_encode_args(profile, fps, threads),
+                str(seg_path)
+            ]
+            segment_cmds.append((cmd, length))
+            segment_paths.append(seg_path)
+
+        audio_inputs = ["-i", str(voice_path)]
+        has_music = VideoProcessorFFmpeg._music_enabled(template, bg_music_path)
+        if has_music:
+            audio_inputs.extend(["-stream_loop", "-1", "-i", str(bg_music_path)])
+        audio_filter = VideoProcessorFFmpeg._mix_filter(1, 2 if has_music else None, target_duration, audio_delay, bg_fade_out)
+
+        print(f"      🧩 Rendering {len(plan)} segments in parallel ({threads} threads each)...")
+        return segment_cmds, segment_paths, audio_inputs, ["-filter_complex", audio_filter, "-map", "[a_out]"]
 
     @staticmethod
     def generate_final_video(
@@ -185,24 +682,21 @@ class VideoProcessorFFmpeg:
         """
         Orchestrates the full FFmpeg pipeline:
         1. Generate Subtitles (ASS)
-        2. Process Source (Crop/Loop)
-        3. Merge Audio (Voice + BG Music)
-        4. Apply VFX (Overlays + Subtitles)
+        2. Fused render (Crop/Loop + Voice/Music mix + Overlays/Subtitles in one pass)
         """
-        from app.services.stt import WhisperService  # Local import to avoid circular dep risks
-        
+        from app.utils.subtitles import generate_ass
+
         outputs_dir = source_video_path.parent
         print(f"🎬 FFmpeg Pipeline Started for: {output_path.name}")
 
         # 1. Generate ASS Subtitles
-        print("   [1/4] Generating subtitles...")
-        stt = WhisperService()
+        print("   [1/2] Generating subtitles...")
         ass_path = outputs_dir / "captions.ass"
         
         font_name = template['text']['typography']['font'].split('.')[0] # Remove .ttf
         font_size = template['text']['typography'].get('size', 110)
         
-        stt.generate_ass(
+        generate_ass(
             words=words,
             output_path=ass_path,
             font_name=font_name,
@@ -210,45 +704,28 @@ class VideoProcessorFFmpeg:
             time_offset=4.0  # Match voice delay
         )
 
-        # 2. Process Video (Crop/Loop)
-        print("   [2/4] Processing source video...")
+        # 2. Fused render
+        print("   [2/2] Rendering video (single pass)...")
         voice_duration = VideoProcessorFFmpeg.get_duration(voice_path)
         target_duration = voice_duration + 8.0
         
-        processed_source = outputs_dir / "ffmpeg_processed_temp.mp4"
-        VideoProcessorFFmpeg.process_source_video(
-            source_video_path, processed_source, target_duration,
-            progress_callback=progress_callback, base_progress=60, weight=10
-        )
-        
-        # 3. Merge Audio
-        print("   [3/4] Merging audio tracks...")
-        merged_audio_path = outputs_dir / "ffmpeg_merged_audio_temp.mp4"
-        VideoProcessorFFmpeg.merge_audio_video(
-            video_path=processed_source,
-            audio_path=voice_path,
-            output_path=merged_audio_path,
-            audio_delay=4.0,
-            bg_music_path=bg_music_path,
-            progress_callback=progress_callback, base_progress=70, weight=5
-        )
-        
-        # 4. Apply VFX
-        print("   [4/4] Applying final VFX...")
-        VideoProcessorFFmpeg.apply_vfx(
-            input_path=merged_audio_path,
+        VideoProcessorFFmpeg.render_fused(
+            source_path=source_video_path,
+            voice_path=voice_path,
             output_path=output_path,
             ass_path=ass_path,
             template=template,
             base_dir=base_dir,
+            target_duration=target_duration,
+            audio_delay=4.0,
+            bg_music_path=bg_music_path,
             theme_color=theme_color,
-            progress_callback=progress_callback, base_progress=75, weight=25
+            progress_callback=progress_callback, base_progress=60, weight=40
         )
         
         # Cleanup temps
-        for p in [processed_source, merged_audio_path, ass_path]:
-            if p.exists():
-                p.unlink()
+        if ass_path.exists():
+            ass_path.unlink()
         
         # Save sample/metadata JSON
         json_path = output_path.with_suffix(".json")
@@ -0,0 +1,74 @@
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """
+    Subsystems loaded in the background once the process is serving, instead of at import
+    time. Each one is "cold" until its loader runs, then "warming", then "warm" (or "error").
+    Anything used before it is warm simply loads on first use, as it would without warmup.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        # name -> {"state", "seconds", "error"}
+        self.status = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def add(self, name: str, loader: Callable):
+        with self._lock:
+            self._loaders[name] = loader
+            self.status.setdefault(name, {"state": "cold"})
+
+    def _load(self, name: str, loader: Callable):
+        with self._lock:
+            self.status[name] = {"state": "warming"}
+        started = time.monotonic()
+        try:
+            loader()
+            state = {"state": "warm"}
+        except Exception as e:
+            logger.warning(f"Warmup of {name} failed: {e}")
+            state = {"state": "error", "error": str(e)}
+        state["seconds"] = round(time.monotonic() - started, 2)
+        with self._lock:
+            self.status[name] = state
+
+    async def run(self):
+        """Loads every subsystem, one at a time, on a worker thread."""
+        for name, loader in list(self._loaders.items()):
+            await asyncio.to_thread(self._load, name, loader)
+        summary = ", ".join(f"{name} ({state['state']})" for name, state in self.report().items())
+        print(f"🔥 Warmup done: {summary}")
+
+    def start(self):
+        """Schedules run() on the running event loop (call once the server is listening)."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+
+    def report(self) -> dict:
+        with self._lock:
+            return {name: dict(state) for name, state in self.status.items()}
+
+    @property
+    def ready(self) -> bool:
+        return all(s["state"] == "warm" for s in self.report().values())
+
+
+_default_warmup = None
+_default_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    global _default_warmup
+    if _default_warmup is None:
+        with _default_warmup_lock:
+            if _default_warmup is None:
+                _default_warmup = Warmup()
+    return _default_warmup
@@ -4,8 +4,9 @@ import os
 import sys
 import asyncio
 from app.services.cms import CmsService
-from app.services.llm import GeminiService
-from app.services.tts import ElevenLabsService
+from app.services.encoding import profile_names
+from app.services.jobs import get_job_registry, cancel_job
+from app.services.render_queue import get_render_queue
 from pathlib import Path
 from typing import Optional, List, Dict
 from datetime import datetime
@@ -29,6 +30,17 @@ STEP_CONFIG = {
     13: {"title": "Publish", "subtitle": "Push to CMS", "icon": "publish", "field": None, "action": "PUBLISH"},
 }
 
+# Render queue priorities (higher runs first)
+QUEUE_PRIORITIES = {10: "High", 0: "Normal", -10: "Low"}
+
+def preview_file(outputs_dir: Path, slug: str, stage: str) -> Optional[Path]:
+    """Preview artifact for a stage ('cropped' / 'mixed'): the low-res proxy if rendered, else the full file."""
+    for name in (f"{slug}_{stage}_proxy.mp4", f"{slug}_{stage}.mp4"):
+        if (outputs_dir / name).exists():
+            return outputs_dir / name
+    return None
+
+
 class State:
     def __init__(self, data_dir: Path):
         self.data_dir = data_dir
@@ -96,6 +108,9 @@ class State:
         self.music_dir = self.data_dir.parent / "assets" / "music"
         self.music_options = [f.name for f in self.music_dir.glob("*.mp3")] if self.music_dir.exists() else []
         
+        # Encoding tiers (draft / standard / archive + any defined in settings.json)
+        self.encoding_profile_options = profile_names(self.settings)
+        
         # Home page starts fresh - no auto-restore
         # User must click a job in sidebar to resume it
 
@@ -111,9 +126,9 @@ class State:
                 self.current_step = 13
             else:
                 self.current_step = 12
-        elif (outputs / f"{slug}_mixed.mp4").exists():
+        elif preview_file(outputs, slug, "mixed"):
             self.current_step = 10
-        elif (outputs / f"{slug}_cropped.mp4").exists():
+        elif preview_file(outputs, slug, "cropped"):
             self.current_step = 9
         elif (outputs / f"{slug}_source.mp4").exists() or any(outputs.glob(f"{slug}_source*")):
             self.current_step = 9 # Advance to next logic step after download
@@ -246,7 +261,7 @@ class State:
         except Exception as e:
             print(f"⚠️ Failed to update .env: {e}")
 
-    def add_job(self, topic: str) -> str:
+    def add_job(self, topic: str, make_current: bool = True) -> str:
         """Create a new job and return its ID."""
         from app.utils.slug import slugify
         job_id = str(uuid.uuid4())[:8]
@@ -280,18 +295,33 @@ class State:
             }
         }
         self.jobs.insert(0, job)
-        self.jobs = self.jobs[:20]
-        self.current_job_id = job_id
+        # Keep the 20 most recent jobs, plus everything still waiting in or running from the queue
+        self.jobs = [j for i, j in enumerate(self.jobs) if i < 20 or j["status"] in ("queued", "processing")]
+        if make_current:
+            self.current_job_id = job_id
         self.save_jobs()
         return job_id
 
-    def update_job(self, job_id: str, status: str = None, progress: int = None, content: Dict = None, current_step: int = None):
-        """Update a job's status, progress, content, or current_step."""
+    def update_job(self, job_id: str, status: str = None, progress: int = None, content: Dict = None, current_step: int = None, telemetry: Dict = None):
+        """
+        Update a job's status, progress, content, or current_step.
+        `telemetry` is a live FFmpeg progress event (fps, speed, ETA, ...); it is kept in memory
+        only, except for the final per-stage throughput which is persisted with the job.
+        """
         for job in self.jobs:
             if job["id"] == job_id:
+                if telemetry is not None:
+                    job["telemetry"] = telemetry
+                    if telemetry.get("done"):
+                        job.setdefault("throughput", {})[telemetry["stage"]] = {
+                            "fps": telemetry.get("fps"),
+                            "speed": telemetry.get("speed"),
+                        }
+                    elif status is None and progress is None and content is None and current_step is None:
+                        break
                 if status:
                     job["status"] = status
-                    if status in ["completed", "failed"]:
+                    if status in ["completed", "failed", "cancelled"]:
                         job["completed_at"] = datetime.now().isoformat()
                 if progress is not None:
                     job["progress"] = progress
@@ -302,6 +332,52 @@ class State:
                 self.save_jobs()
                 break
 
+    def sync_queue(self):
+        """
+        Mirrors render queue rows (status, stage, progress, results) into the job history.
+        Works the same whether the jobs run on the in-process pool or on `app.worker` processes.
+        """
+        try:
+            rows = get_render_queue().list_jobs(limit=100)
+        except Exception as e:
+            print(f"Render queue unavailable: {e}")
+            return
+        latest = {}
+        for row in rows:
+            # Wizard steps (previews, audio, downloads) are followed by the page that started them
+            if row["target"] == "final":
+                latest.setdefault(row["job_id"], row)
+
+        statuses = {"queued": "queued", "running": "processing", "completed": "completed", "failed": "failed", "cancelled": "cancelled"}
+        changed = False
+        for job in self.jobs:
+            row = latest.get(job["id"])
+            if not row:
+                continue
+            job["queue"] = {
+                "priority": row["priority"],
+                "stage": row["stage"],
+                "worker": row["worker"],
+                "error": row["error"],
+            }
+            if row["telemetry"] and row["status"] == "running":
+                job["telemetry"] = row["telemetry"]
+            status = statuses.get(row["status"], row["status"])
+            progress = int(row["progress"] or 0)
+            if job["status"] == status and job["progress"] == progress:
+                continue
+            job["status"] = status
+            job["progress"] = progress
+            if status in ["completed", "failed", "cancelled"]:
+                job["completed_at"] = datetime.now().isoformat()
+            if status == "completed" and row["result"]:
+                job["content"] = {**(job.get("content") or {}), **row["result"].get("content", {})}
+                if job["id"] == self.current_job_id:
+                    self.content.update(row["result"].get("content", {}))
+            changed = True
+        if changed:
+            self.save_jobs()
+
     def get_job(self, job_id: str) -> Optional[Dict]:
         """Get a job by ID."""
         for job in self.jobs:
@@ -357,8 +433,12 @@ def job_history_panel(state: State):
                             for job in state.jobs:
                                 render_job_item(state, job)
                 
-                render_jobs()
-                ui.timer(2.0, render_jobs)  # Refresh every 2 seconds
+                def refresh():
+                    state.sync_queue()
+                    render_jobs()
+
+                refresh()
+                ui.timer(2.0, refresh)  # Refresh every 2 seconds
 
 def render_job_item(state: State, job: Dict):
     """Render a single job item."""
@@ -367,14 +447,16 @@ def render_job_item(state: State, job: Dict):
         "queued": "#64748b",
         "processing": state.brand_color,
         "completed": "#22c55e",
-        "failed": "#ef4444"
+        "failed": "#ef4444",
+        "cancelled": "#f59e0b"
     }
     status_icons = {
         "draft": "edit_note",
         "queued": "schedule",
         "processing": "sync",
         "completed": "check_circle",
-        "failed": "error"
+        "failed": "error",
+        "cancelled": "cancel"
     }
     
     is_current = job["id"] == state.current_job_id
@@ -391,6 +473,12 @@ def render_job_item(state: State, job: Dict):
         else:
             ui.notify("No content saved for this job", type='warning')
 
+    def on_cancel_click():
+        # Queued jobs are dropped; running ones get their FFmpeg process groups killed and are
+        # marked "cancelled" as their task unwinds
+        if cancel_job(job["id"]):
+            ui.notify(f"Cancelling job: {job['topic'][:20]}...", type='warning')
+
     with ui.card().classes('w-full p-3 cursor-pointer hover:bg-slate-800/50 transition-all') \
         .style(f'background: {"rgba(255,255,255,0.03)" if is_current else "transparent"}; {border_style}') \
         .on('click', on_job_click):
@@ -414,8 +502,23 @@ def render_job_item(state: State, job: Dict):
                     date_str = job["started_at"]
                 
                 ui.label(date_str).classes('text-[10px] text-slate-500')
+
+                # Queue details: place in line / current stage
+                queue_info = job.get("queue")
+                if queue_info and job["status"] == "queued":
+                    position = get_render_queue().position(job["id"])
+                    ui.label(f'#{position} in queue · priority {queue_info["priority"]}').classes('text-[10px] text-slate-500')
+                elif queue_info and job["status"] == "processing" and queue_info.get("stage"):
+                    ui.label(f'{queue_info["stage"]} · {queue_info.get("worker") or ""}').classes('text-[10px] text-slate-500')
+                elif queue_info and job["status"] == "failed" and queue_info.get("error"):
+                    ui.label(queue_info["error"][:80]).classes('text-[10px] text-red-400')
             
-            ui.icon(status_icons.get(job["status"], "help")).classes('text-sm').style(f'color: {status_colors.get(job["status"], "#64748b")}')
+            with ui.row().classes('items-center gap-1'):
+                if get_job_registry().is_running(job["id"]) or job["status"] in ("queued", "processing"):
+                    ui.button(icon='stop_circle').props('flat round dense size=sm') \
+                        .classes('text-slate-500 hover:text-red-500') \
+                        .on('click.stop', on_cancel_click)
+                ui.icon(status_icons.get(job["status"], "help")).classes('text-sm').style(f'color: {status_colors.get(job["status"], "#64748b")}')
         
         # Progress bar for processing jobs
         if job["status"] == "processing":
@@ -442,6 +545,8 @@ def settings_drawer(state: State):
                 .classes('w-full').props('dark filled dense')
             
             async def test_google_key():
+                # Imported on demand: the Gemini/ElevenLabs SDKs are too heavy to load at startup
+                from app.services.llm import GeminiService
                 ui.notify('Testing Google API Key...', type='info')
                 if await asyncio.to_thread(GeminiService.validate_api_key, state.secrets['google_api_key']):
                     state.save_secrets()
@@ -451,6 +556,7 @@ def settings_drawer(state: State):
                     ui.notify('❌ Invalid Google API Key', type='negative')
 
             async def test_eleven_key():
+                from app.services.tts import ElevenLabsService
                 ui.notify('Testing ElevenLabs API Key...', type='info')
                 if await asyncio.to_thread(ElevenLabsService.validate_api_key, state.secrets['elevenlabs_api_key']):
                     state.save_secrets()
@@ -647,8 +753,26 @@ def global_progress_indicator(state: State):
                         ui.label('PLEASE WAIT').classes('text-[8px] text-slate-500')
                     
                     ui.linear_progress(value=p_val/100).classes('w-full h-1.5 rounded-full').props(f'color="{state.brand_color}"')
+                    telemetry_label = ui.label('').classes('text-[10px] font-mono text-slate-400')
+
+                    def update_telemetry():
+                        job = state.get_job(state.current_job_id) if state.current_job_id else None
+                        event = (job or {}).get("telemetry")
+                        if not event or event.get("done"):
+                            telemetry_label.set_text('')
+                            return
+                        parts = [event["stage"].upper(), f'{event["progress"] * 100:.0f}%']
+                        if event.get("fps"):
+                            parts.append(f'{event["fps"]:.0f} fps')
+                        if event.get("speed"):
+                            parts.append(f'{event["speed"]:.2f}x')
+                        if event.get("eta") is not None:
+                            parts.append(f'ETA {int(event["eta"]) // 60}:{int(event["eta"]) % 60:02d}')
+                        telemetry_label.set_text(' · '.join(parts))
 
-def content_editor_panel(state: State, on_back, on_generate_audio, on_generate_video, on_next_step, on_regenerate, on_download_source=None, on_generate_transcript=None, on_publish=None, on_generate_images=None):
+                    ui.timer(1.0, update_telemetry)
+
+def content_editor_panel(state: State, on_back, on_generate_audio, on_generate_video, on_next_step, on_regenerate, on_download_source=None, on_generate_transcript=None, on_publish=None, on_generate_images=None, on_queue_video=None):
     """11-step content production wizard."""
     config = STEP_CONFIG.get(state.current_step, STEP_CONFIG[1])
     slug = state.content.get("slug", "")
@@ -755,18 +879,18 @@ def content_editor_panel(state: State, on_back, on_generate_audio, on_generate_v
                 
                 # STEP 9: Video Crop Preview
                 elif state.current_step == 9:
-                    cropped_file = outputs_dir / f"{slug}_cropped.mp4"
+                    cropped_file = preview_file(outputs_dir, slug, "cropped")
                     with ui.column().classes('w-full items-center gap-6 py-8'):
                         ui.icon('content_cut').classes('text-6xl').style(f'color: {state.brand_color}')
-                        if cropped_file.exists():
-                            ui.video(f"/outputs/{slug}_cropped.mp4").classes('w-full max-w-md rounded-xl')
+                        if cropped_file:
+                            ui.video(f"/outputs/{cropped_file.name}").classes('w-full max-w-md rounded-xl')
                             ui.label('Video cropped and looped').classes('text-green-500 text-xs')
                         else:
                             ui.label('Ready to Process').classes('text-slate-500 text-xs')
                 
                 # STEP 10: Audio Mixing Preview
                 elif state.current_step == 10:
-                    mixed_file = outputs_dir / f"{slug}_mixed.mp4"
+                    mixed_file = preview_file(outputs_dir, slug, "mixed")
                     with ui.column().classes('w-full items-center gap-6 py-8'):
                         ui.icon('library_music').classes('text-6xl').style(f'color: {state.brand_color}')
                         
@@ -774,8 +898,8 @@ def content_editor_panel(state: State, on_back, on_generate_audio, on_generate_v
                         ui.select(state.music_options, label="Background Music", value=state.content.get("bg_music") or (state.music_options[0] if state.music_options else None)) \
                             .classes('w-64').props('dark dense').bind_value(state.content, "bg_music")
                         
-                        if mixed_file.exists():
-                            ui.video(f"/outputs/{slug}_mixed.mp4").classes('w-full max-w-md rounded-xl')
+                        if mixed_file:
+                            ui.video(f"/outputs/{mixed_file.name}").classes('w-full max-w-md rounded-xl')
                             ui.label('Audio mixed successfully').classes('text-green-500 text-xs')
                         else:
                             ui.label('Click CONTINUE to mix audio').classes('text-slate-500 text-xs')
@@ -790,6 +914,11 @@ def content_editor_panel(state: State, on_back, on_generate_audio, on_generate_v
                         else:
                             ui.icon('movie').classes('text-6xl').style(f'color: {state.brand_color}')
                             ui.label('Ready for Final Render').classes('text-slate-500 text-xs')
+                            ui.select(state.encoding_profile_options, label="Encoding Profile", value=state.content.get("encoding_profile") or state.settings.get("encoding_profile", "standard")) \
+                                .classes('w-64').props('dark dense').bind_value(state.content, "encoding_profile")
+                            if on_queue_video:
+                                ui.select(QUEUE_PRIORITIES, label="Queue Priority", value=state.content.get("priority", 0)) \
+                                    .classes('w-64').props('dark dense').bind_value(state.content, "priority")
 
                 # STEP 12: Image Generation
                 elif state.current_step == 12:
@@ -941,8 +1070,7 @@ def content_editor_panel(state: State, on_back, on_generate_audio, on_generate_v
                     
                     elif state.current_step == 9:
                         # Logic for Step 9: Crop Preview
-                        cropped_file = outputs_dir / f"{slug}_cropped.mp4"
-                        if cropped_file.exists():
+                        if preview_file(outputs_dir, slug, "cropped"):
                             ui.button('CONTINUE', icon='arrow_forward', on_click=on_next_step) \
                                 .classes('px-6 py-3 font-bold rounded-xl').style(f'background: {state.brand_color}; color: black;')
                         else:
@@ -952,8 +1080,7 @@ def content_editor_panel(state: State, on_back, on_generate_audio, on_generate_v
                                 
                     elif state.current_step == 10:
                         # Logic for Step 10: Mix Preview
-                        mixed_file = outputs_dir / f"{slug}_mixed.mp4"
-                        if mixed_file.exists():
+                        if preview_file(outputs_dir, slug, "mixed"):
                             ui.button('CONTINUE', icon='arrow_forward', on_click=on_next_step) \
                                 .classes('px-6 py-3 font-bold rounded-xl').style(f'background: {state.brand_color}; color: black;')
                         else:
@@ -968,6 +1095,10 @@ def content_editor_panel(state: State, on_back, on_generate_audio, on_generate_v
                             ui.button('CONTINUE', icon='arrow_forward', on_click=on_next_step) \
                                 .classes('px-6 py-3 font-bold rounded-xl').style(f'background: {state.brand_color}; color: black;')
                         else:
+                             if on_queue_video:
+                                 ui.button('ADD TO QUEUE', icon='playlist_add', on_click=on_queue_video) \
+                                    .classes('px-6 py-3 font-bold rounded-xl').props('outline').style(f'color: {state.brand_color};') \
+                                    .bind_enabled_from(state, 'is_processing', backward=lambda x: not x)
                              ui.button('FINAL RENDER', icon='movie', on_click=on_generate_video) \
                                 .classes('px-6 py-3 font-bold rounded-xl').style(f'background: {state.brand_color}; color: black;') \
                                 .bind_enabled_from(state, 'is_processing', backward=lambda x: not x)
@@ -1,28 +1,21 @@
 import subprocess
-import re
 import sys
 import shutil
 import logging
 from pathlib import Path
 from typing import Optional, List, Tuple
+from app.services.media_probe import get_media_probe
+from app.services.ffmpeg_runner import FFmpegRunner
 
 logger = logging.getLogger(__name__)
 
 class FFmpegHelper:
     @staticmethod
     def get_duration(input_path: Path) -> float:
-        """Get video duration in seconds using ffprobe."""
-        cmd = [
-            "ffprobe", 
-            "-v", "error", 
-            "-show_entries", "format=duration", 
-            "-of", "default=noprint_wrappers=1:nokey=1", 
-            str(input_path)
-        ]
+        """Get video duration in seconds using the shared (cached) ffprobe service."""
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return float(result.stdout.strip())
-        except (ValueError, subprocess.CalledProcessError):
+            return get_media_probe().get_duration(input_path)
+        except (ValueError, OSError, subprocess.CalledProcessError):
             return 0.0
 
     @staticmethod
@@ -39,57 +32,13 @@ class FFmpegHelper:
 
     @staticmethod
     def run_ffmpeg(cmd: List[str], desc: str = "Processing"):
-        """Run FFmpeg command with a progress bar."""
-        # Find input file to calculate total duration for progress
+        """Run FFmpeg command with progress reporting (duration taken from the first input)."""
         input_file = None
         for i, arg in enumerate(cmd):
             if arg == "-i" and i + 1 < len(cmd):
-                input_file = Path(cmd[i+1])
+                input_file = cmd[i + 1]
                 break
-        
-        total_duration = FFmpegHelper.get_duration(input_file) if input_file and input_file.exists() else 0
-        
-        print(f"      🔧 {desc}...")
-        
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True
-        )
-
-        # Progress pattern in FFmpeg output: time=00:00:05.12
-        pattern = re.compile(r"time=(\d{2}:\d{2}:\d{2}\.\d{2})")
-        
-        # Simple progress bar
-        bar_length = 30
-        
-        while True:
-            # Read stderr character by character is too slow/complex for Popen text mode usually, 
-            # but line by line works if ffmpeg flushes newlines. 
-            # FFmpeg uses \r for updates. Universal newlines should handle it?
-            # Actually, reading char by char or chunks is safer for \r updates.
-            # For simplicity, let's just attempt to read lines.
-            
-            # Since FFmpeg uses \r, 'process.stderr.readline()' might block until a \n or buffer fill.
-            # Using communicate() blocks until end.
-            
-            # Efficient approach: Loop and read output
-            # But complicating this might be risky. 
-            # Let's try reading chunks and extracting the last 'time='
-            pass
-            # Writing this properly requires careful handling.
-            
-            # Alternative: Just use tqdm if we could, but let's stick to standard lib for now.
-            break # Just placeholder for the thought process. 
-            
-        # Actual implementation using a simpler approach for now:
-        # We will use poll() and read stderr.
-        
-        # NOTE: For this implementation, I will just dump output to a variable and parse it, 
-        # or simplified: just let it run and maybe print strict updates if possible.
-        # However, to be truly robust, I'll implement a simple reader.
-        pass
+        FFmpegHelper._run_with_progress(cmd, desc, input_file)
 
     @staticmethod
     def encode_vp9(input_path: Path, output_path: Path, crf: int = 32, bitrate: Optional[str] = None, show_progress: bool = True):
@@ -141,53 +90,23 @@ class FFmpegHelper:
         FFmpegHelper._run_with_progress(cmd, f"Adding text: {text}", str(input_path))
 
     @staticmethod
-    def _run_with_progress(cmd: List[str], desc: str, input_file_path: str):
-        """Internal runner with progress bar handling."""
-        total_duration = FFmpegHelper.get_duration(Path(input_file_path))
-        if total_duration == 0:
-            total_duration = 1 # Avoid division by zero
-            
+    def _run_with_progress(cmd: List[str], desc: str, input_file_path: Optional[str]):
+        """Internal runner: structured `-progress` events rendered as a single console status line."""
+        input_path = Path(input_file_path) if input_file_path else None
+        total_duration = FFmpegHelper.get_duration(input_path) if input_path and input_path.exists() else 0.0
+
         print(f"      ⏳ {desc}...")
-        
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True
-        )
 
-        pattern = re.compile(r"time=(\d{2}:\d{2}:\d{2}\.\d{2})")
-        
-        while True:
-            # Read line-by-line using a small chunk size or unbuffered if possible.
-            # FFmpeg outputs to stderr.
-            # We'll read char by char to handle \r
-            char = process.stderr.read(1)
-            if char == '' and process.poll() is not None:
-                break
-            
-            if char != '':
-                sys.stdout.buffer.write(char.encode('utf-8')) # Pass through if needed, 
-                # But we want to parse.
-                # Actually, implementing a proper progress bar char-by-char is tricky in Python 
-                # without blocking.
-                
-                # Let's simplify: Use 'ffmpeg-progress-yield' style parsing or just print status periodically.
-                # Or just let FFmpeg print its own status to stdout/stderr and we just don't capture it 
-                # (let it flow to user terminal).
-                # But the user specifically asked for "logs of what is it doing" and previous attempts failed 
-                # because we captured output silently.
-                
-                # BEST APPROACH: Don't capture stderr, let it inherit.
-                # But we want to add our own nice headers.
-                pass
-        
-        # RE-THINK: The previous success was because I removed capture=True and allowed it to print.
-        # I should just let it print to stderr naturally, providing a nice header before.
-        # But `subprocess.run` without capture_output lets it print to the console which is what we want.
-        
-        # Okay, I'll rewrite this function to just use subprocess.run but verify success.
-        pass
+        def on_event(event):
+            pct = f"{event['progress'] * 100:5.1f}%" if total_duration else f"{event['out_time']:.1f}s"
+            fps = f"{event['fps']:.0f} fps" if event['fps'] else "- fps"
+            speed = f"{event['speed']:.2f}x" if event['speed'] else "-"
+            eta = f"ETA {event['eta']:.0f}s" if event['eta'] is not None else ""
+            sys.stdout.write(f"\r         {pct}  {fps}  {speed}  {eta}   ")
+            sys.stdout.flush()
+
+        FFmpegRunner.run(cmd, total_duration, on_event, stage=desc)
+        sys.stdout.write("\n")
 
     @staticmethod
     def simple_run(cmd: List[str]):
@@ -0,0 +1,245 @@
+"""
+Render worker: claims jobs from the render queue (data/queue.db) and runs them, reporting
+stage/progress back through the queue. Run one or more next to the UI:
+
+    python -m app.worker --workers 2
+
+or, as a render farm node, against a coordinator over HTTP with a shared artifact store:
+
+    python -m app.worker --coordinator http://render-main:8001 --store /mnt/renders --scratch /tmp/render
+"""
+import os
+import sys
+import json
+import signal
+import socket
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from typing import Optional
+
+from app.services.jobs import get_job_registry
+from app.services.render_queue import RenderQueue, get_render_queue
+from app.services.artifact_store import ArtifactStore, LocalArtifactStore
+from app.services.warmup import get_warmup
+from app.services.ffmpeg_runner import progress_listener
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Seconds between heartbeats (and cancellation checks) of a running job
+HEARTBEAT_INTERVAL = 5.0
+# Seconds an idle worker waits before polling the queue again
+POLL_INTERVAL = 2.0
+
+
+class WorkerPool:
+    """
+    Pulls jobs from the render queue and runs them through the VideoWorkflow stage DAG.
+    `workers` jobs run at once; within them, stages share the process-wide resource limits
+    (settings.json "stage_concurrency"), so e.g. at most 2 encodes run regardless of how many
+    jobs are in flight. Progress and cancellation go through the queue row.
+
+    As a farm node, `queue` is a RemoteQueue and `store` the shared artifact store: a job's
+    artifacts are pulled into `outputs_dir` before it runs and its new ones pushed after.
+    `targets` limits the pool to some pipeline targets (e.g. only "transcribe" on a GPU box).
+    """
+
+    def __init__(self, workers: int = 1, queue: Optional[RenderQueue] = None, name: Optional[str] = None, poll_interval: float = POLL_INTERVAL,
+                 targets: Optional[list] = None, store: Optional[ArtifactStore] = None, outputs_dir: Optional[Path] = None):
+        self.workers = max(1, int(workers))
+        self.queue = queue or get_render_queue()
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.targets = targets
+        self.store = store
+        self.outputs_dir = outputs_dir
+        self._tasks = []
+        # Fire-and-forget stage heartbeats; the loop only keeps weak references to tasks
+        self._pending = set()
+        self._stopping = False
+
+    def _get_workflow(self):
+        # A fresh workflow per job picks up settings.json changes; it is cheap because the
+        # services (and Whisper models) behind it are shared through the service container
+        from app.workflow import VideoWorkflow
+        return VideoWorkflow(BASE_DIR, self.outputs_dir)
+
+    def start(self):
+        """Starts the worker loops on the running event loop."""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._tasks = [asyncio.ensure_future(self._loop(f"{self.name}/{i}")) for i in range(self.workers)]
+        print(f"🛠️  Render worker pool started: {self.workers} worker(s) as {self.name}")
+
+    async def stop(self):
+        """Stops claiming jobs and cancels the ones in flight (they return to the queue when stale)."""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self, worker: str):
+        while not self._stopping:
+            try:
+                await asyncio.to_thread(self.queue.requeue_stale)
+                job = await asyncio.to_thread(self.queue.claim, worker, self.targets)
+            except Exception as e:
+                logger.error(f"Queue unavailable for {worker}: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            # Each job gets its own task so a cancel request stops the job, not the worker loop
+            await asyncio.ensure_future(self._execute(job))
+
+    async def _beat(self, job: dict, stage: Optional[str], progress: Optional[float], telemetry: Optional[dict]) -> bool:
+        """One heartbeat; returns True when the job should stop."""
+        try:
+            return await asyncio.to_thread(self.queue.heartbeat, job["id"], stage, progress, telemetry, job["worker"])
+        except Exception as e:
+            # e.g. "database is locked": a missed beat is not fatal, the lease only expires after HEARTBEAT_TIMEOUT
+            logger.warning(f"Heartbeat for job {job['job_id']} failed: {e}")
+            return False
+
+    async def _heartbeat(self, job: dict, status: dict):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            stop = await self._beat(job, status.get("stage"), status.get("progress"), status.get("telemetry"))
+            if stop:
+                logger.info(f"Stopping job {job['job_id']} (cancel requested or lease lost)")
+                get_job_registry().cancel(job["job_id"])
+
+    async def _execute(self, job: dict):
+        handle = get_job_registry().start(job["job_id"])
+        status = {}
+
+        def on_stage(name, state, percent):
+            status.update(stage=f"{name}:{state}", progress=percent)
+            # Stage changes are pushed right away; telemetry waits for the next heartbeat
+            beat = asyncio.ensure_future(self._beat(job, status["stage"], percent, None))
+            self._pending.add(beat)
+            beat.add_done_callback(self._pending.discard)
+
+        def on_event(event):
+            status["telemetry"] = event
+
+        heartbeat = asyncio.ensure_future(self._heartbeat(job, status))
+        try:
+            workflow = self._get_workflow()
+            slug = workflow.job_slug(job["payload"])
+            if self.store:
+                await asyncio.to_thread(self.store.pull, slug, workflow.outputs_dir)
+            with progress_listener(on_event):
+                result = await workflow.run_job(job["payload"], job["target"], on_stage=on_stage)
+            if self.store:
+                await asyncio.to_thread(self.store.push, slug, workflow.outputs_dir)
+            if await asyncio.to_thread(self.queue.complete, job["id"], result, job["worker"]):
+                print(f"✅ Job {job['job_id']} completed")
+            else:
+                print(f"⚠️ Job {job['job_id']} finished after its lease expired; result dropped")
+        except (asyncio.CancelledError, Exception) as e:
+            if handle.cancelled:
+                # No-op if the stop came from a lost lease: the job already belongs to another worker
+                if await asyncio.to_thread(self.queue.mark_cancelled, job["id"], job["worker"]):
+                    print(f"🛑 Job {job['job_id']} cancelled")
+            elif isinstance(e, asyncio.CancelledError):
+                # Pool shutdown: hand the job straight back to the queue for the next worker
+                try:
+                    await asyncio.to_thread(self.queue.release, job["id"], job["worker"])
+                    print(f"↩️  Job {job['job_id']} returned to the queue")
+                except Exception as release_error:
+                    logger.warning(f"Could not release job {job['job_id']} (it requeues when its lease expires): {release_error}")
+                raise
+            else:
+                logger.error(f"Job {job['job_id']} failed: {e}", exc_info=True)
+                await asyncio.to_thread(self.queue.fail, job["id"], str(e), job["worker"])
+        finally:
+            heartbeat.cancel()
+            get_job_registry().finish(handle)
+
+
+def _configured_workers() -> int:
+    try:
+        with open(BASE_DIR / "settings.json", "r") as f:
+            return max(1, int(json.load(f).get("render_workers", 1) or 1))
+    except (FileNotFoundError, ValueError, json.JSONDecodeError):
+        return 1
+
+
+def _warm_whisper():
+    from app.services.container import get_services
+    from app.services.stt import get_whisper_pool
+    with get_whisper_pool().model(get_services().get("stt").backend):
+        pass
+
+
+def _warm_services():
+    from app.services.container import get_services
+    for name in ("llm", "tts", "downloader"):
+        get_services().get(name)
+
+
+async def serve(workers: int, name: Optional[str] = None, poll_interval: float = POLL_INTERVAL, targets: Optional[list] = None,
+                coordinator: Optional[str] = None, token: Optional[str] = None, store: Optional[Path] = None, scratch: Optional[Path] = None):
+    """Runs a worker pool until SIGINT/SIGTERM, then returns its in-flight jobs to the queue."""
+    queue, artifact_store = None, None
+    if coordinator:
+        from app.services.farm_client import RemoteQueue
+        queue = RemoteQueue(coordinator, token)
+        artifact_store = LocalArtifactStore(store) if store else None
+    pool = WorkerPool(workers, queue, name, poll_interval, targets, artifact_store, scratch)
+    if coordinator:
+        await asyncio.to_thread(queue.register, pool.name, socket.gethostname(), pool.workers, targets)
+        print(f"🌐 Joined render farm at {coordinator} as {pool.name}")
+    else:
+        # Registered so the app's /api/ready can count live workers
+        await asyncio.to_thread(pool.queue.register_worker, pool.name, socket.gethostname(), pool.workers, targets)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    pool.start()
+    # Load the pipeline, the Whisper model and the API clients while waiting for the first job
+    warmup = get_warmup()
+    warmup.add("workflow", lambda: __import__("app.workflow"))
+    warmup.add("whisper", _warm_whisper)
+    warmup.add("services", _warm_services)
+    warmup.start()
+    await stop.wait()
+    print("🛑 Render worker stopping...")
+    await pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run render jobs from the queue in this process.")
+    parser.add_argument("--workers", type=int, default=None, help="jobs to run at once (default: settings.json render_workers)")
+    parser.add_argument("--name", default=None, help="worker name shown in the job history (default: host-pid)")
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL, help="seconds between queue polls when idle")
+    parser.add_argument("--targets", default=None, help="comma-separated pipeline targets to take (e.g. final,transcribe; default: all)")
+    parser.add_argument("--coordinator", default=None, help="render farm coordinator URL; lease jobs over HTTP instead of data/queue.db")
+    parser.add_argument("--token", default=os.environ.get("FARM_TOKEN"), help="coordinator farm_token (default: $FARM_TOKEN)")
+    parser.add_argument("--store", type=Path, default=None, help="shared artifact directory (NFS mount / the coordinator's data/outputs)")
+    parser.add_argument("--scratch", type=Path, default=None, help="local working directory for job artifacts (default: data/outputs)")
+    args = parser.parse_args()
+    if args.store and not args.coordinator:
+        parser.error("--store needs --coordinator")
+
+    logging.basicConfig(level=logging.INFO)
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()] if args.targets else None
+    asyncio.run(serve(
+        args.workers or _configured_workers(), args.name, args.poll, targets,
+        args.coordinator, args.token, args.store, args.scratch
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,100 @@
 import os
 import json
 import yaml
+import asyncio
 import logging
 from pathlib import Path
 from typing import Optional
 from dotenv import load_dotenv
-from app.services.llm import GeminiService
-from app.services.tts import ElevenLabsService
-from app.services.stt import WhisperService
-from app.services.downloader import YTDownloader
+from app.services.stt import WhisperService, get_whisper_pool
+from app.utils.subtitles import generate_ass
 from app.services.video_processor_ffmpeg import VideoProcessorFFmpeg
-from app.utils.theme_parser import get_theme_color
+from app.services.encoding import resolve_profile
+from app.services.media_probe import get_media_probe
+from app.services.jobs import JobCancelled
+from app.services import artifacts
+from app.services.scheduler import Stage, DagScheduler, prune, get_resource_limits
+from app.services.container import get_services
 
 load_dotenv()
 
 # Setup module logger
 logger = logging.getLogger(__name__)
 
+# Part of every stage fingerprint: bump a stage when its code changes what it produces for the
+# same inputs, so cached artifacts from older code are re-rendered (with everything downstream).
+STAGE_VERSIONS = {
+    "audio": 1,
+    "transcribe": 1,
+    "crop": 1,
+    "mix": 1,
+    "render": 1,
+}
+
+# Transcript "engine" of word timings that came with the TTS audio (tts_timestamps)
+TTS_TIMESTAMPS_ENGINE = "elevenlabs:timestamps"
+
 class VideoWorkflow:
-    def __init__(self, base_dir: Path):
+    def __init__(self, base_dir: Path, outputs_dir: Optional[Path] = None):
         self.base_dir = base_dir
-        self.outputs_dir = base_dir / "data" / "outputs"
+        # Render farm nodes work in their own scratch directory and sync through the artifact store
+        self.outputs_dir = Path(outputs_dir) if outputs_dir else base_dir / "data" / "outputs"
         self.outputs_dir.mkdir(parents=True, exist_ok=True)
         
-        self.llm = GeminiService()
-        self.tts = ElevenLabsService()
-        self.stt = WhisperService()
-        self.downloader = YTDownloader(cookies_path=base_dir / "cookies.txt")
-        self.processor = VideoProcessorFFmpeg()
-        
-        # Determine theme color once
-        theme_css_path = base_dir.parent / "packages" / "brand" / "theme.css"
-        self.theme_color = get_theme_color(theme_css_path)
-        print(f"🎨 Theme Color: {self.theme_color}")
+        # Services are built on first use and shared across workflows (see ServiceContainer),
+        # so constructing a workflow for a crop or a download costs a settings read
+        self.services = get_services()
+
+        # Render tuning from settings.json (render_segments > 1 enables the parallel segmented render)
+        self.settings = self._load_settings()
+        self.render_segments = int(self.settings.get("render_segments", 0) or 0)
+        # Seconds to skip at the start of long sources (intros, channel branding)
+        self.source_offset = float(self.settings.get("source_offset", 0) or 0)
+        # Steps 9/10 render low-resolution `_proxy` previews; full quality only happens at final render
+        self.proxy_previews = bool(self.settings.get("proxy_previews", True))
+        self.proxy_size = tuple(int(v) for v in str(self.settings.get("proxy_size", "540x960")).lower().split("x"))
+        # Upper bound (seconds) for a single FFmpeg process in the async steps; 0 disables it
+        self.ffmpeg_timeout = float(self.settings.get("ffmpeg_timeout", 0) or 0) or None
+        # "transcribe" (Whisper) or "align" (force-align content["speech"] to the TTS audio)
+        self.transcribe_mode = self.settings.get("transcribe_mode", "transcribe")
+        # Per-resource stage concurrency ({"network": 4, "stt": 1, "encode": 2} by default)
+        get_resource_limits().configure(self.settings.get("stage_concurrency"))
+        # Whisper models are shared process-wide; unused ones are unloaded after the TTL / over the budget
+        get_whisper_pool().configure(self.settings.get("whisper_model_ttl"), self.settings.get("whisper_memory_budget_mb"))
+
+    @property
+    def llm(self):
+        return self.services.get("llm")
+
+    @property
+    def tts(self):
+        return self.services.get("tts")
+
+    @property
+    def stt(self):
+        return self.services.get("stt")
+
+    @property
+    def downloader(self):
+        return self.services.get("downloader")
+
+    @property
+    def processor(self):
+        return self.services.get("processor")
+
+    @property
+    def theme_color(self) -> str:
+        return self.services.get("theme_color")
+
+    def _load_settings(self) -> dict:
+        settings_path = self.base_dir / "settings.json"
+        if settings_path.exists():
+            try:
+                with open(settings_path, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to read settings.json: {e}")
+        return {}
 
     def download_video(self, yt_url: str, filename_prefix: str = "source"):
         """Standalone method to download source video."""
@@ -41,17 +103,32 @@ class VideoWorkflow:
         print(f"      ✅ Video downloaded: {source_video_path.name} (Resolution: {res})")
         return source_video_path, res
 
-    def step_audio_gen(self, content: dict, audio_path: Path):
-        """Step 2: Generate speech audio."""
+    def step_audio_gen(self, content: dict, audio_path: Path, words_path: Optional[Path] = None):
+        """
+        Step 2: Generate speech audio. With tts_timestamps, ElevenLabs also returns the timing
+        of every character, and the word timings are written to `words_path` right away.
+        """
         try:
-            if audio_path.exists() and audio_path.stat().st_size > 1000:
+            inputs = self.audio_inputs(content, self.tts.voice_id, self.tts.model_id)
+            if artifacts.validate(audio_path, inputs):
                 logger.info(f"Audio found ({audio_path.name}), skipping ElevenLabs.")
                 return audio_path
                  
             logger.info(f"Generating speech with ElevenLabs to {audio_path.name}...")
             script = content.get("speech", "")
             if script:
-                self.tts.text_to_speech(script, audio_path)
+                words = None
+                with artifacts.atomic_output(audio_path, inputs) as tmp_path:
+                    if self.tts.timestamps and words_path:
+                        words = self.tts.text_to_speech_with_timestamps(script, tmp_path, voice_id=inputs["voice"], model_id=inputs["model"])
+                    else:
+                        self.tts.text_to_speech(script, tmp_path, voice_id=inputs["voice"], model_id=inputs["model"])
+                if words:
+                    # Fingerprinted by the audio's hash, so step_transcribe accepts it for this audio only
+                    artifacts.write_json(words_path, words, self.transcript_inputs(audio_path, TTS_TIMESTAMPS_ENGINE))
+                    logger.info(f"Word timings from ElevenLabs saved to {words_path.name}")
+                elif self.tts.timestamps and words_path:
+                    logger.warning("ElevenLabs returned no alignment; words will be transcribed")
                 logger.info(f"Audio generated successfully.")
                 return audio_path
             else:
@@ -60,18 +137,41 @@ class VideoWorkflow:
             logger.error(f"Audio generation failed: {e}", exc_info=True)
             raise RuntimeError(f"Audio Stage Failed: {e}") from e
 
-    def step_transcribe(self, audio_path: Path, subtitle_path: Path):
-        """Step 3: Transcribe audio with Whisper."""
+    def step_transcribe(self, audio_path: Path, subtitle_path: Path, script: Optional[str] = None):
+        """
+        Step 3: Word timings for the narration. With transcribe_mode "align" and the script
+        the audio was synthesized from, the script is force-aligned to the audio (exact words,
+        no decoding); otherwise, or if alignment isn't confident, Whisper transcribes it.
+        Word timings the TTS step already wrote for this audio (tts_timestamps) are used as is.
+        """
         try:
-            if subtitle_path.exists():
+            meta = artifacts.read_sidecar(subtitle_path) or {}
+            if (meta.get("inputs") or {}).get("engine") == TTS_TIMESTAMPS_ENGINE:
+                inputs = self.transcript_inputs(audio_path, TTS_TIMESTAMPS_ENGINE)
+                if artifacts.validate(subtitle_path, inputs, media=False):
+                    logger.info(f"Word timings from TTS found ({subtitle_path.name}), skipping transcription.")
+                    with open(subtitle_path, 'r') as f:
+                        return json.load(f)
+
+            align = self.transcribe_mode == "align" and bool(script)
+            inputs = self.transcript_inputs(audio_path, self.stt.engine, script if align else None)
+            if artifacts.validate(subtitle_path, inputs, media=False):
                 logger.info(f"Word data found ({subtitle_path.name}), skipping Whisper.")
                 with open(subtitle_path, 'r') as f:
                     return json.load(f)
-            
-            logger.info("Transcribing audio with Whisper...")
-            words = self.stt.transcribe(audio_path)
-            with open(subtitle_path, 'w') as f:
-                json.dump(words, f)
+
+            words = None
+            if align:
+                from app.services.aligner import AlignmentFailed, get_aligner
+                try:
+                    logger.info("Aligning the speech script to the audio...")
+                    words = get_aligner(self.settings).align(audio_path, script)
+                except AlignmentFailed as e:
+                    logger.warning(f"Forced alignment failed ({e}), falling back to transcription")
+            if words is None:
+                logger.info(f"Transcribing audio with {self.stt.engine}...")
+                words = self.stt.transcribe(audio_path)
+            artifacts.write_json(subtitle_path, words, inputs)
             logger.info(f"Transcription saved to {subtitle_path.name}")
             return words
         except Exception as e:
@@ -81,12 +181,11 @@ class VideoWorkflow:
     def step_video_download(self, yt_url: str, slug: str):
         """Step 4: Mandatory source download."""
         try:
-            source_filename = f"{slug}_source.mp4"
-            source_video_path = self.outputs_dir / source_filename
-            
-            if source_video_path.exists():
-                logger.info(f"Using existing source video: {source_video_path.name}")
-                return source_video_path
+            # The downloader suffixes the resolution ({slug}_source_1080p.mp4)
+            for source_video_path in sorted(self.outputs_dir.glob(f"{slug}_source*.mp4")):
+                if ".part." not in source_video_path.name:
+                    logger.info(f"Using existing source video: {source_video_path.name}")
+                    return source_video_path
                 
             logger.info(f"Downloading video from {yt_url}...")
             path, res = self.downloader.download(yt_url, self.outputs_dir, filename_prefix=slug+"_source")
@@ -96,135 +195,350 @@ class VideoWorkflow:
             logger.error(f"Video download failed: {e}", exc_info=True)
             raise RuntimeError(f"Download Stage Failed: {e}") from e
 
-    def step_video_crop(self, source_path: Path, audio_path: Path, output_path: Path, progress_callback=None):
-        """Step 5: Crop/Loop source to match audio duration."""
+    def encoding_profile(self, name: Optional[str] = None, template: Optional[dict] = None) -> dict:
+        """Encoding profile for a job: explicit name > template > settings.json > 'standard'."""
+        return resolve_profile(name, self.settings, template)
+
+    @staticmethod
+    def proxy_path(path: Path) -> Path:
+        return path.with_name(f"{path.stem}_proxy{path.suffix}")
+
+    @staticmethod
+    def audio_inputs(content: dict, voice_id: str, model_id: str) -> dict:
+        """Fingerprint inputs of the TTS stage (shared with the UI's direct audio generation)."""
+        return {
+            "speech": content.get("speech", ""),
+            "voice": content.get("voice_id") or voice_id,
+            "model": content.get("tts_model") or model_id,
+            "version": STAGE_VERSIONS["audio"],
+        }
+
+    @staticmethod
+    def transcript_inputs(audio_path: Path, engine: Optional[str] = None, script: Optional[str] = None) -> dict:
+        inputs = {"audio": audio_path, "version": STAGE_VERSIONS["transcribe"]}
+        # Only non-default engines are fingerprinted, so existing transcripts stay valid
+        if engine and engine != WhisperService.DEFAULT_ENGINE:
+            inputs["engine"] = engine
+        # Aligned timings depend on the script (the fallback transcript is kept until it changes)
+        if script:
+            inputs["align"] = {"script": script}
+        return inputs
+
+    @staticmethod
+    def render_template(template: dict) -> dict:
+        """Template subtree the VFX render depends on (music and encoding are fingerprinted separately)."""
+        return {k: v for k, v in (template or {}).items() if k not in ("music", "encoding")}
+
+    async def step_video_crop_async(self, source_path: Path, audio_path: Path, output_path: Path, progress_callback=None, encoding_profile: Optional[str] = None, proxy: bool = False):
+        """
+        Step 5: Crop/Loop source to match audio duration.
+        proxy=True renders a fast low-resolution preview to `<name>_proxy.mp4` instead.
+        FFmpeg is awaited on the event loop, so cancelling the stage stops it.
+        """
         try:
-            if output_path.exists():
+            if proxy:
+                output_path = self.proxy_path(output_path)
+            profile = self.encoding_profile("draft" if proxy else encoding_profile)
+            size = self.proxy_size if proxy else (1080, 1920)
+            inputs = {
+                "source": source_path, "audio": audio_path, "profile": profile, "size": size,
+                "offset": self.source_offset, "version": STAGE_VERSIONS["crop"],
+            }
+            if await asyncio.to_thread(artifacts.validate, output_path, inputs):
                 logger.info(f"Processed video already exists: {output_path.name}")
                 return output_path
-                
+
             logger.info("Processing source video (Crop/Loop)...")
-            voice_duration = VideoProcessorFFmpeg.get_duration(audio_path)
+            voice_duration = await get_media_probe().get_duration_async(audio_path)
             target_duration = voice_duration + 8.0 # 4s intro + 4s outro
-            
-            VideoProcessorFFmpeg.process_source_video(
-                source_path, output_path, target_duration,
-                progress_callback=progress_callback, base_progress=0, weight=100
-            )
+
+            async with artifacts.atomic_output_async(output_path, inputs) as tmp_path:
+                await VideoProcessorFFmpeg.process_source_video_async(
+                    source_path, tmp_path, target_duration,
+                    progress_callback=progress_callback, base_progress=0, weight=100,
+                    profile=profile,
+                    source_offset=self.source_offset,
+                    size=size,
+                    timeout=self.ffmpeg_timeout
+                )
             logger.info(f"Video cropped successfully to {output_path.name}")
             return output_path
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Video crop failed: {e}", exc_info=True)
             raise RuntimeError(f"Crop Stage Failed: {e}") from e
 
-    def step_music_merge(self, video_path: Path, audio_path: Path, output_path: Path, bg_music_path: Path, progress_callback=None):
-        """Step 6: Merge voice and background music."""
+    async def step_music_merge_async(self, video_path: Path, audio_path: Path, output_path: Path, bg_music_path: Path, progress_callback=None, proxy: bool = False):
+        """
+        Step 6: Merge voice and background music.
+        proxy=True mixes onto the proxy crop and writes `<name>_proxy.mp4` (video is stream-copied).
+        """
         try:
-            if output_path.exists():
+            if proxy:
+                video_path = self.proxy_path(video_path)
+                output_path = self.proxy_path(output_path)
+            inputs = {"video": video_path, "audio": audio_path, "music": bg_music_path, "version": STAGE_VERSIONS["mix"]}
+            if await asyncio.to_thread(artifacts.validate, output_path, inputs):
                 logger.info(f"Merged audio video already exists: {output_path.name}")
                 return output_path
-                
+
             logger.info(f"Mixing tracks with {bg_music_path.name}...")
-            VideoProcessorFFmpeg.merge_audio_video(
-                video_path=video_path,
-                audio_path=audio_path,
-                output_path=output_path,
-                audio_delay=4.0,
-                bg_music_path=bg_music_path,
-                progress_callback=progress_callback, base_progress=0, weight=100
-            )
+            async with artifacts.atomic_output_async(output_path, inputs) as tmp_path:
+                await VideoProcessorFFmpeg.merge_audio_video_async(
+                    video_path=video_path,
+                    audio_path=audio_path,
+                    output_path=tmp_path,
+                    audio_delay=4.0,
+                    bg_music_path=bg_music_path,
+                    progress_callback=progress_callback, base_progress=0, weight=100,
+                    timeout=self.ffmpeg_timeout
+                )
             logger.info(f"Audio merged successfully to {output_path.name}")
             return output_path
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Music merge failed: {e}", exc_info=True)
             raise RuntimeError(f"Music Mix Stage Failed: {e}") from e
 
-    def step_final_render(self, input_path: Path, output_path: Path, ass_path: Path, template: dict, theme_color: str, progress_callback=None):
+    async def step_final_render_async(self, input_path: Path, output_path: Path, ass_path: Path, template: dict, theme_color: str, progress_callback=None, encoding_profile: Optional[str] = None):
         """Step 7: Apply VFX and Subtitles."""
         try:
-            if output_path.exists():
+            profile = self.encoding_profile(encoding_profile, template)
+            inputs = {
+                "video": input_path, "subtitles": ass_path, "template": self.render_template(template),
+                "theme": theme_color, "profile": profile, "version": STAGE_VERSIONS["render"],
+            }
+            if await asyncio.to_thread(artifacts.validate, output_path, inputs):
                 logger.info(f"Final video already exists: {output_path.name}")
                 return output_path
                 
             logger.info("Applying final VFX and Subtitles...")
-            VideoProcessorFFmpeg.apply_vfx(
+            render_kwargs = dict(
                 input_path=input_path,
-                output_path=output_path,
                 ass_path=ass_path,
                 template=template,
                 base_dir=self.base_dir,
                 theme_color=theme_color,
-                progress_callback=progress_callback, base_progress=0, weight=100
+                progress_callback=progress_callback, base_progress=0, weight=100,
+                profile=profile,
+                timeout=self.ffmpeg_timeout
             )
+            async with artifacts.atomic_output_async(output_path, inputs) as tmp_path:
+                if self.render_segments > 1:
+                    await VideoProcessorFFmpeg.apply_vfx_segmented_async(output_path=tmp_path, segments=self.render_segments, **render_kwargs)
+                else:
+                    await VideoProcessorFFmpeg.apply_vfx_async(output_path=tmp_path, **render_kwargs)
             logger.info(f"Final video rendered successfully: {output_path.name}")
             return output_path
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"Final render failed: {e}", exc_info=True)
             raise RuntimeError(f"Final Render Stage Failed: {e}") from e
 
-    def run(self, input_text: str, yt_url: Optional[str] = None, template_name: str = "default", content: Optional[dict] = None, progress_callback=None):
-        """Monolithic wrapper kept for compatibility but refactored to use steps."""
+    async def step_fused_render_async(self, source_path: Path, audio_path: Path, output_path: Path, bg_music_path: Path, ass_path: Path, template: dict, theme_color: str, progress_callback=None, encoding_profile: Optional[str] = None):
+        """
+        Steps 5-7 in one pass: Trim/Loop (stream copy), Crop, Music Mix and VFX.
+        Cancelling the awaiting task stops the FFmpeg processes.
+        """
+        try:
+            profile = self.encoding_profile(encoding_profile, template)
+            inputs = {
+                "source": source_path, "audio": audio_path, "music": bg_music_path, "subtitles": ass_path,
+                "template": self.render_template(template), "theme": theme_color, "profile": profile,
+                "offset": self.source_offset, "version": STAGE_VERSIONS["render"],
+            }
+            if await asyncio.to_thread(artifacts.validate, output_path, inputs):
+                logger.info(f"Final video already exists: {output_path.name}")
+                return output_path
+
+            logger.info("Rendering final video in a single pass (Crop + Mix + VFX)...")
+            voice_duration = await get_media_probe().get_duration_async(audio_path)
+            target_duration = voice_duration + 8.0 # 4s intro + 4s outro
+
+            render_kwargs = dict(
+                source_path=source_path,
+                voice_path=audio_path,
+                ass_path=ass_path,
+                template=template,
+                base_dir=self.base_dir,
+                target_duration=target_duration,
+                audio_delay=4.0,
+                bg_music_path=bg_music_path,
+                theme_color=theme_color,
+                progress_callback=progress_callback, base_progress=0, weight=100,
+                profile=profile,
+                source_offset=self.source_offset,
+                timeout=self.ffmpeg_timeout
+            )
+            async with artifacts.atomic_output_async(output_path, inputs) as tmp_path:
+                if self.render_segments > 1:
+                    await VideoProcessorFFmpeg.render_fused_segmented_async(output_path=tmp_path, segments=self.render_segments, **render_kwargs)
+                else:
+                    await VideoProcessorFFmpeg.render_fused_async(output_path=tmp_path, **render_kwargs)
+            logger.info(f"Final video rendered successfully: {output_path.name}")
+            return output_path
+        except JobCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Fused render failed: {e}", exc_info=True)
+            raise RuntimeError(f"Final Render Stage Failed: {e}") from e
+
+    def music_path(self, content: dict, template: dict) -> Path:
+        music_file = (content or {}).get("bg_music") or template.get("music", {}).get("file") or "background.mp3"
+        return self.base_dir / "assets" / "music" / Path(music_file).name
+
+    def build_stages(self, slug: str, content: dict, yt_url: Optional[str], template: dict, target: str = "final", fused: bool = True, encoding_profile: Optional[str] = None, progress_callback=None, proxy: bool = False) -> list:
+        """
+        The pipeline as a stage DAG (pruned to what `target` needs):
+
+            content -> audio -> transcribe -> captions ---+
+                         |                                +--> final   (fused)
+            download ----+--------------------------------+
+                         +--> crop -> mix ----------------+--> final   (fused=False, with captions)
+
+        The download runs alongside the TTS/Whisper chain, and the crop only waits for the
+        audio (for its duration) and the source. Resources: network, stt, encode. FFmpeg stages
+        use the async step variants, so cancelling the DAG stops their processes.
+        """
+        audio_path = self.outputs_dir / f"{slug}.mp3"
+        words_path = self.outputs_dir / f"{slug}_words.json"
+        ass_path = self.outputs_dir / f"{slug}_captions.ass"
+        cropped_video = self.outputs_dir / f"{slug}_cropped.mp4"
+        mixed_video = self.outputs_dir / f"{slug}_mixed.mp4"
+        final_video = self.outputs_dir / f"{slug}_final.mp4"
+        bg_music_path = self.music_path(content, template)
+
+        def make_content(results):
+            if content.get("speech"):
+                return content
+            print("   📝 Generating content with Gemini...")
+            content.update(self.llm.generate_content(content.get("topic") or slug))
+            content["slug"] = slug
+            return content
+
+        def make_captions(results):
+            typography = template['text']['typography']
+            generate_ass(results["transcribe"], ass_path, typography['font'].split('.')[0], typography.get('size', 110), time_offset=4.0)
+            return ass_path
+
+        def download(results):
+            if not yt_url:
+                raise ValueError("Source video URL is mandatory")
+            return self.step_video_download(yt_url, slug)
+
+        async def crop(results):
+            return await self.step_video_crop_async(results["download"], results["audio"], cropped_video, progress_callback, encoding_profile, proxy=proxy)
+
+        async def mix(results):
+            return await self.step_music_merge_async(cropped_video, results["audio"], mixed_video, bg_music_path, progress_callback, proxy=proxy)
+
+        async def fused_render(results):
+            return await self.step_fused_render_async(results["download"], results["audio"], final_video, bg_music_path, results["captions"], template, self.theme_color, progress_callback, encoding_profile)
+
+        async def final_render(results):
+            return await self.step_final_render_async(mixed_video, final_video, results["captions"], template, self.theme_color, progress_callback, encoding_profile)
+
+        stages = [
+            Stage("content", make_content, resource="network"),
+            Stage("audio", lambda r: self.step_audio_gen(r["content"], audio_path, words_path), ["content"], "network", [audio_path]),
+            Stage("transcribe", lambda r: self.step_transcribe(r["audio"], words_path, r["content"].get("speech")), ["content", "audio"], "stt", [words_path]),
+            Stage("captions", make_captions, ["transcribe"], outputs=[ass_path]),
+            Stage("download", download, resource="network"),
+            Stage("crop", crop, ["audio", "download"], "encode", [self.proxy_path(cropped_video) if proxy else cropped_video]),
+            Stage("mix", mix, ["crop"], "encode", [self.proxy_path(mixed_video) if proxy else mixed_video]),
+        ]
+        if fused:
+            stages.append(Stage("final", fused_render, ["audio", "download", "captions"], "encode", [final_video]))
+        else:
+            stages.append(Stage("final", final_render, ["mix", "captions"], "encode", [final_video]))
+        return prune(stages, [target])
+
+    async def run_async(self, input_text: str, yt_url: Optional[str] = None, template_name: str = "default", content: Optional[dict] = None, progress_callback=None, fused: bool = True, target: str = "final") -> dict:
+        """Runs the stage DAG up to `target`; independent stages (download vs TTS/Whisper) overlap."""
         print(f"🚀 Starting/Resuming workflow for: {input_text}")
         
         # Determine slug early
         from app.utils.slug import slugify
-        slug = content.get("slug") if content else slugify(input_text)
+        content = content if content is not None else {}
+        content.setdefault("topic", input_text)
+        slug = content.get("slug") or slugify(input_text)
         
         # Load template
         template_path = self.base_dir / "templates" / f"{template_name}.yaml"
         with open(template_path, "r") as f:
             template = yaml.safe_load(f)
 
-        # 1. Content (Keep simple for now)
-        if not content or not content.get("speech"):
-             print("   📝 Generating content with Gemini...")
-             content = self.llm.generate_content(input_text)
-             content["slug"] = slug
-        
-        # 2. Audio
-        audio_path = self.outputs_dir / f"{slug}.mp3"
-        self.step_audio_gen(content, audio_path)
-        
-        # 3. Transcribe
-        subtitle_path = self.outputs_dir / f"{slug}_words.json"
-        words = self.step_transcribe(audio_path, subtitle_path)
-        
-        # 4. Download
-        if not yt_url:
-             raise ValueError("Source video URL is mandatory")
-        source_video_path = self.step_video_download(yt_url, slug)
-        
-        # 5. Crop
-        processed_video = self.outputs_dir / f"{slug}_cropped.mp4"
-        self.step_video_crop(source_video_path, audio_path, processed_video, progress_callback)
-        
-        # 6. Music
-        # Pick music from assets if provided in content, else use template default
-        music_file = content.get("bg_music") or template['music']['file']
-        bg_music_path = self.base_dir / "assets" / music_file
-        mixed_video = self.outputs_dir / f"{slug}_mixed.mp4"
-        self.step_music_merge(processed_video, audio_path, mixed_video, bg_music_path, progress_callback)
-        
-        # 7. Final
-        final_video = self.outputs_dir / f"{slug}_final.mp4"
-        
-        # Prepare ASS (local WhisperService logic)
-        from app.services.stt import WhisperService
-        stt = WhisperService()
-        ass_path = self.outputs_dir / f"{slug}_captions.ass"
-        font_name = template['text']['typography']['font'].split('.')[0]
-        font_size = template['text']['typography'].get('size', 110)
-        
-        stt.generate_ass(words, ass_path, font_name, font_size, time_offset=4.0)
-        
-        self.step_final_render(mixed_video, final_video, ass_path, template, self.theme_color, progress_callback)
-        
-        # Cleanup intermediate temps if desired? (Optionally keep for resumption)
-        
+        stages = self.build_stages(slug, content, yt_url, template, target, fused, content.get("encoding_profile"), progress_callback)
+        scheduler = DagScheduler()
+        results = await scheduler.run(stages)
+        logger.info(f"Stage timings: {scheduler.timings}")
+        return results
+
+    @staticmethod
+    def job_slug(payload: dict) -> str:
+        """Slug (artifact file prefix) of a queued job."""
+        from app.utils.slug import slugify
+        content = payload.get("content") or {}
+        return content.get("slug") or slugify(content.get("topic") or payload.get("topic", ""))
+
+    async def run_job(self, payload: dict, target: str = "final", on_stage=None) -> dict:
+        """
+        Runs a queued job: `payload` carries the job's content, template name and source URL.
+        `on_stage(name, status, percent)` reports progress. Returns what the UI needs back:
+        the updated content and the produced file names.
+        """
+        content = dict(payload.get("content") or {})
+        content.setdefault("topic", payload.get("topic", ""))
+        slug = self.job_slug(payload)
+        content["slug"] = slug
+        template_name = payload.get("template") or content.get("template") or "default"
+        with open(self.base_dir / "templates" / f"{template_name}.yaml", "r") as f:
+            template = yaml.safe_load(f)
+
+        stages = self.build_stages(
+            slug, content, payload.get("youtube_URL") or content.get("youtube_URL"), template, target,
+            encoding_profile=content.get("encoding_profile") if target == "final" else "draft",
+            proxy=target != "final" and self.proxy_previews
+        )
+        finished = []
+
+        def stage_event(name, status):
+            # Reports (stage, status, percent of stages done)
+            if status == "finished":
+                finished.append(name)
+            if on_stage:
+                on_stage(name, status, round(100 * len(finished) / len(stages), 1))
+
+        scheduler = DagScheduler(on_stage=stage_event)
+        results = await scheduler.run(stages)
+        logger.info(f"Stage timings: {scheduler.timings}")
+
+        outputs = {name: Path(results[name]).name for name in ("audio", "download", "crop", "mix", "final") if name in results}
+        content.update({k: v for k, v in {
+            "voice_file": outputs.get("audio"),
+            "video_file": outputs.get("download"),
+            "subtitle_file": f"{slug}_words.json" if "transcribe" in results else None,
+            "processed_video": outputs.get("crop"),
+            "merged_audio": outputs.get("mix"),
+            "output_video": outputs.get("final"),
+        }.items() if v})
+        return {"content": content, "outputs": outputs, "timings": scheduler.timings}
+
+    def run(self, input_text: str, yt_url: Optional[str] = None, template_name: str = "default", content: Optional[dict] = None, progress_callback=None, fused: bool = True):
+        """
+        Synchronous entry point: runs the whole stage DAG (see build_stages).
+        fused=True renders Crop + Mix + VFX in a single FFmpeg pass; False keeps the step-by-step path.
+        """
+        from app.utils.slug import slugify
+        slug = (content or {}).get("slug") or slugify(input_text)
+        results = asyncio.run(self.run_async(input_text, yt_url, template_name, content, progress_callback, fused))
         return {
-            "video": final_video,
-            "subtitles": subtitle_path,
-            "source": source_video_path
+            "video": results["final"],
+            "subtitles": self.outputs_dir / f"{slug}_words.json",
+            "source": results["download"]
         }
 
 if __name__ == "__main__":